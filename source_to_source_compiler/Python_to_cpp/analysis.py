@@ -0,0 +1,338 @@
+"""Whole-program analyses used by the code generator."""
+from ast_nodes import (
+    Node, Number, Float, String, Variable, BinaryOp, UnaryOp, Assignment, List, ListAccess,
+    ListAssignment, FunctionCall, MethodCall, LenCall, Print, FormattedString, ForLoop, RangeCall, Return, Import
+)
+
+def children(node):
+    """The child nodes of node, in field order; statement lists are flattened."""
+    # A stack in reverse order, so long statement lists cost linear time
+    pending = list(vars(node).values()) if isinstance(node, Node) else list(node)
+    pending.reverse()
+    while pending:
+        value = pending.pop()
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, list):
+            pending.extend(reversed(value))
+
+def walk(node, parent=None):
+    """Yield (node, parent) for node and everything below it, in pre-order."""
+    # Iterative, so deep trees neither hit the recursion limit nor pay for nested generators
+    pending = [(node, parent)]
+    while pending:
+        node, parent = pending.pop()
+        if isinstance(node, list):
+            pending.extend((item, parent) for item in reversed(node))
+            continue
+        yield node, parent
+        pending.extend((child, node) for child in reversed(list(children(node))))
+
+def post_order(node):
+    """Yield node and everything below it, each node after all of its children."""
+    pending = [(node, False)]
+    while pending:
+        node, expanded = pending.pop()
+        if expanded:
+            yield node
+            continue
+        pending.append((node, True))
+        pending.extend((child, False) for child in reversed(list(children(node))))
+
+def resolve_module_calls(node):
+    """Turn the calls m.f(...) to the modules m imported anywhere in node into f(...), in place.
+
+    The modules of a program share one namespace in the generated C++, see modules.py.
+    """
+    modules = {module for found, _ in walk(node) if isinstance(found, Import) for module in found.modules}
+
+    def resolved(value):
+        if isinstance(value, MethodCall) and isinstance(value.receiver, Variable) and value.receiver.name in modules:
+            call = FunctionCall(value.method, value.args)
+            call.line, call.column = value.line, value.column
+            return call
+        return value
+
+    if not modules:
+        return
+    for found, _ in walk(node):
+        for field, value in vars(found).items():
+            if not isinstance(value, list):
+                setattr(found, field, resolved(value))
+                continue
+            # Statement lists may hold lists of statements
+            pending = [value]
+            while pending:
+                items = pending.pop()
+                for i, item in enumerate(items):
+                    if isinstance(item, list):
+                        pending.append(item)
+                    else:
+                        items[i] = resolved(item)
+
+def assigned_names(body):
+    """Names assigned anywhere in body, including loop variables."""
+    names = set()
+    for node, _ in walk(body):
+        if isinstance(node, Assignment):
+            names.add(node.name.name if isinstance(node.name, Variable) else node.name)
+        elif isinstance(node, ForLoop):
+            names.add(node.var_name)
+    return names
+
+def is_pure(expr):
+    """Whether expr can be evaluated ahead of time: arithmetic on names, literals and len()."""
+    for node, _ in walk(expr):
+        if isinstance(node, (Number, Float, Variable, BinaryOp, UnaryOp)):
+            continue
+        if isinstance(node, FunctionCall) and node.name == "len" and len(node.args) == 1 and isinstance(node.args[0], Variable):
+            continue
+        if isinstance(node, LenCall) and isinstance(node.arg, Variable):
+            continue
+        return False
+    return True
+
+def is_text(expr):
+    """Whether expr evidently builds a string: a literal, str(), join() or a + of those."""
+    pending = [expr]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, BinaryOp) and node.op == '+':
+            # The parser wraps the other operand of a string + in str()
+            pending.append(node.left)
+        elif not (isinstance(node, (String, FormattedString))
+                  or (isinstance(node, FunctionCall) and node.name == "str")
+                  or (isinstance(node, MethodCall) and node.method == "join")):
+            return False
+    return True
+
+def text_lists(func, nodes=None):
+    """Names of the local lists of func that only ever hold strings.
+
+    Every binding of such a name is a list literal of strings or [], every append()
+    to it adds a string, and at least one string is put in it. It is never passed to a
+    function other than len(), as functions only take lists of ints. nodes is the
+    walk() of func's body when already made.
+    """
+    bindings = {}
+    holds_text = set()
+    for node, parent in nodes if nodes is not None else walk(func.body):
+        if isinstance(node, Assignment):
+            name = node.name.name if isinstance(node.name, Variable) else node.name
+            elements = node.value.elements if isinstance(node.value, List) else None
+            bindings.setdefault(name, []).append(elements is not None and all(map(is_text, elements)))
+            if elements:
+                holds_text.add(name)
+        elif isinstance(node, ForLoop):
+            bindings.setdefault(node.var_name, []).append(False)
+        elif isinstance(node, MethodCall) and node.method == "append" and isinstance(node.receiver, Variable):
+            bindings.setdefault(node.receiver.name, []).append(len(node.args) == 1 and is_text(node.args[0]))
+            holds_text.add(node.receiver.name)
+        elif isinstance(node, Variable) and isinstance(parent, FunctionCall) and parent.name != "len":
+            bindings.setdefault(node.name, []).append(False)
+    return {name for name, texts in bindings.items()
+            if all(texts) and name in holds_text and name not in func.params}
+
+def is_container_use(node, parent):
+    """Whether the name node is used as a container: indexed, iterated, tested with in or receiving a method call."""
+    if isinstance(parent, (ListAccess, ListAssignment)):
+        return parent.list_expr is node
+    if isinstance(parent, MethodCall):
+        return parent.receiver is node
+    if isinstance(parent, BinaryOp):
+        return parent.op in ('in', 'not in') and parent.right is node
+    if isinstance(parent, ForLoop):
+        return parent.iterable is node
+    return False
+
+class FunctionFacts:
+    """What the code generator needs to know about a function, found in one walk of its body."""
+
+    def __init__(self, func):
+        # (node, parent) pairs of the body in pre-order, for the analyses that need them all
+        self.nodes = list(walk(func.body))
+        params = set(func.params)
+        self.assignments = []
+        self.returned_values = []
+        self.container_params = set()
+        for node, parent in self.nodes:
+            if isinstance(node, Assignment):
+                self.assignments.append(node)
+            elif isinstance(node, Return) and node.value is not None:
+                self.returned_values.append(node.value)
+            elif isinstance(node, Variable) and node.name in params and is_container_use(node, parent):
+                self.container_params.add(node.name)
+        self.text_lists = text_lists(func, self.nodes)
+
+def appends_to(stmt):
+    """The list stmt appends one element to, if it is a list.append() call."""
+    if isinstance(stmt, MethodCall) and stmt.method == "append" and isinstance(stmt.receiver, Variable):
+        return stmt.receiver.name
+    return None
+
+def grown_containers(body, grows=appends_to):
+    """Names of the containers that grows() finds an insertion into anywhere in body."""
+    return {grows(node) for node, _ in walk(body)} - {None}
+
+def append_counts(loop, grows=appends_to):
+    """Count how many times a range loop inserts into each container.
+
+    grows(node) names the container node adds one element to, or returns None.
+    Returns {name: terms}; the number of insertions is the sum over terms of the product
+    of the lengths of the RangeCalls in each term. A name maps to None when some insertion
+    is conditional, in a while loop, or in a loop whose bounds change inside the loop.
+    """
+    counts = {}
+    if not isinstance(loop, ForLoop) or not isinstance(loop.iterable, RangeCall):
+        return counts
+    bounds = [loop.iterable.start, loop.iterable.end, loop.iterable.step]
+    if not all(is_pure(bound) for bound in bounds if bound is not None):
+        return counts
+    variant = assigned_names(loop.body) | {loop.var_name}
+    count_appends(loop.body, (loop.iterable,), variant, counts, grows)
+    return counts
+
+def count_appends(body, ranges, variant, counts, grows):
+    for stmt in body:
+        if isinstance(stmt, list):
+            count_appends(stmt, ranges, variant, counts, grows)
+        elif grows(stmt) is not None:
+            name = grows(stmt)
+            if counts.setdefault(name, []) is not None:
+                counts[name].append(ranges)
+        elif isinstance(stmt, ForLoop) and isinstance(stmt.iterable, RangeCall) and is_invariant(stmt.iterable, variant):
+            count_appends(stmt.body, ranges + (stmt.iterable,), variant, counts, grows)
+        else:
+            for name in grown_containers(stmt, grows):
+                counts[name] = None
+
+def is_invariant(range_call, variant):
+    """Whether range_call has the same bounds on every iteration of a loop assigning variant."""
+    for bound in (range_call.start, range_call.end, range_call.step):
+        if bound is None:
+            continue
+        if not is_pure(bound):
+            return False
+        if any(isinstance(node, Variable) and node.name in variant for node, _ in walk(bound)):
+            return False
+    return True
+
+def lower_bound(expr, bounds):
+    """A proven lower bound of an integer expression, or None.
+
+    bounds maps variables, such as range() loop variables, to their known lower bounds.
+    """
+    # Bottom-up over the subexpressions, so deep operator chains need no recursion
+    found = {}
+    for node in post_order(expr):
+        found[node] = node_lower_bound(node, bounds, found)
+    return found[expr]
+
+def node_lower_bound(expr, bounds, found):
+    """lower_bound of expr, given those of its subexpressions in found."""
+    if isinstance(expr, Number):
+        return expr.value
+    if isinstance(expr, Variable):
+        return bounds.get(expr.name)
+    if isinstance(expr, (FunctionCall, LenCall)):
+        return 0 if getattr(expr, 'name', 'len') == 'len' else None
+    if isinstance(expr, BinaryOp):
+        left = found[expr.left]
+        if expr.op == '-' and isinstance(expr.right, Number):
+            return None if left is None else left - expr.right.value
+        right = found[expr.right]
+        if expr.op == '%' and right is not None and right > 0:
+            # Python's % takes the sign of the divisor
+            return 0
+        if left is None or right is None:
+            return None
+        if expr.op == '+':
+            return left + right
+        if expr.op == '*' and left >= 0 and right >= 0:
+            return left * right
+        if expr.op == '//' and left >= 0 and right > 0:
+            return 0
+    return None
+
+def range_lower_bound(loop, bounds):
+    """Lower bound of the variable of a range() loop that counts upwards and never reassigns it."""
+    range_call = loop.iterable
+    if range_call.step is not None and not (isinstance(range_call.step, Number) and range_call.step.value > 0):
+        return None
+    if loop.var_name in assigned_names(loop.body):
+        return None
+    return lower_bound(range_call.start, bounds)
+
+class ListEscapeAnalysis:
+    """Finds the list literals that can live in a fixed-size std::array.
+
+    A list qualifies when it is bound once by `name = [...]`, and every later use of
+    the name only reads or writes elements, takes its len(), iterates or prints it,
+    or passes it to a parameter that is itself only used that way. Such a list is
+    never resized, aliased, returned or kept beyond the function that created it.
+    """
+
+    def __init__(self, function_defs, safe_params=True):
+        self.functions = {func.name: func for func in function_defs}
+        # Whether functions may be generated as templates over their container parameters
+        self.templates = safe_params
+        # Optimistically every parameter is safe; recursion then keeps quick_sort's arr safe.
+        # Without safe_params, lists are never passed on as arrays.
+        self.safe_params = {func.name: set(func.params) if safe_params else set() for func in function_defs}
+        changed = True
+        while changed:
+            changed = False
+            for func in function_defs:
+                safe = {param for param in self.safe_params[func.name]
+                        if self.is_contained(func.body, param)}
+                if safe != self.safe_params[func.name]:
+                    self.safe_params[func.name] = safe
+                    changed = True
+
+    def is_safe_use(self, node, parent):
+        """Whether this use of a list name neither resizes nor leaks the list."""
+        if isinstance(parent, (ListAccess, ListAssignment)):
+            return parent.list_expr is node
+        if isinstance(parent, (LenCall, Print, FormattedString)):
+            return True
+        if isinstance(parent, BinaryOp) and parent.op in ("in", "not in"):
+            return parent.right is node
+        if isinstance(parent, ForLoop):
+            return parent.iterable is node
+        if isinstance(parent, FunctionCall):
+            if parent.name == "len":
+                return True
+            callee = self.functions.get(parent.name)
+            if callee is None:
+                return False
+            positions = [i for i, arg in enumerate(parent.args) if arg is node]
+            return all(i < len(callee.params) and callee.params[i] in self.safe_params[callee.name]
+                       for i in positions)
+        return False
+
+    def is_contained(self, body, name, binding=None):
+        """Whether name, bound by binding (or a parameter), is only used safely in body."""
+        for node, parent in walk(body):
+            if isinstance(node, Assignment):
+                target = node.name.name if isinstance(node.name, Variable) else node.name
+                if target == name and node is not binding:
+                    return False
+            elif isinstance(node, Variable) and node.name == name:
+                if isinstance(parent, Assignment) and parent.name is node:
+                    continue
+                if not self.is_safe_use(node, parent):
+                    return False
+        return True
+
+    def fixed_lists(self, func, nodes=None):
+        """Map the names of func's fixed-size lists to their lengths (nodes: the walk of its body)."""
+        bindings = {}
+        for node, _ in nodes if nodes is not None else walk(func.body):
+            if isinstance(node, Assignment) and isinstance(node.value, List):
+                name = node.name.name if isinstance(node.name, Variable) else node.name
+                bindings.setdefault(name, []).append(node)
+        return {
+            name: len(nodes[0].value.elements)
+            for name, nodes in bindings.items()
+            if len(nodes) == 1 and name not in func.params and self.is_contained(func.body, name, nodes[0])
+        }
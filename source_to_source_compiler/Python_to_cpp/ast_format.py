@@ -0,0 +1,315 @@
+"""Compact binary encoding of Program trees, for passing parsed ASTs between processes.
+
+Layout (all integers are unsigned LEB128 varints):
+
+    MAGIC, VERSION
+    record*           varint length > 0, then one top-level statement
+    0                 end of program
+
+A value is one tag byte followed by its payload:
+
+    NONE, FALSE, TRUE
+    INT               zigzag varint
+    FLOAT             8-byte little-endian double
+    STRING            varint index into the string table
+    NEW_STRING        varint byte length, UTF-8 bytes; appended to the string table
+    LIST              varint count, then the items
+    REF               varint index of a node that occurred earlier in the record
+    NODE_BASE + kind  varint line + 1 and column + 1 (0 when unknown), then the
+                      constructor arguments of NODE_TYPES[kind] in order
+
+Strings are interned in order of first use across the whole stream, so names and
+operators cost one or two bytes after their first occurrence. Nodes are numbered in
+the order their tags occur within a record; a node reachable twice, such as the index
+the parser shares between `a[i] += 1` and its update, is written once and referenced,
+so the decoded tree keeps the sharing codegen relies on. Statements are
+length-prefixed records, so dump() and iter_load() work one statement at a time,
+and loads() reads straight from a memoryview without copying the input. Encoding
+and decoding use explicit stacks, so nesting depth is not limited by recursion.
+Adding, removing or reordering NODE_TYPES (or their constructor arguments) changes
+the format and must bump VERSION.
+"""
+import inspect
+import struct
+
+from ast_nodes import (
+    Program, Number, Float, String, FormattedString, Boolean, Variable, BinaryOp, UnaryOp,
+    Assignment, Print, IfStatement, WhileLoop, ForLoop, RangeCall, FunctionDef, FunctionCall,
+    Return, Import, ImportFrom, List, Dict, Set, ListAccess, ListAssignment, MethodCall, LenCall
+)
+
+MAGIC = b"PYAST"
+VERSION = 1
+
+NONE, FALSE, TRUE, INT, FLOAT, STRING, NEW_STRING, LIST, REF = range(9)
+NODE_BASE = 16
+
+# Node kind -> class; the position in this list is the opcode
+NODE_TYPES = [
+    Number, Float, String, FormattedString, Boolean, Variable, BinaryOp, UnaryOp,
+    Assignment, Print, IfStatement, WhileLoop, ForLoop, RangeCall, FunctionDef, FunctionCall,
+    Return, Import, ImportFrom, List, Dict, Set, ListAccess, ListAssignment, MethodCall, LenCall,
+]
+NODE_KINDS = {node_type: kind for kind, node_type in enumerate(NODE_TYPES)}
+# Constructor arguments of each node kind, which are also its attribute names
+NODE_FIELDS = [tuple(inspect.signature(node_type.__init__).parameters)[1:] for node_type in NODE_TYPES]
+REVERSED_FIELDS = [fields[::-1] for fields in NODE_FIELDS]
+
+DOUBLE = struct.Struct("<d")
+
+class FormatError(Exception):
+    """The data is not a serialized AST of this format version."""
+
+class Encoder:
+    """Encodes values into a bytearray, interning strings across calls."""
+
+    def __init__(self):
+        self.strings = {}
+
+    def encode(self, value, out):
+        """Append the encoding of value (a node, list, str, int, float, bool or None) to out."""
+        strings = self.strings
+        nodes = {}
+        pending = [value]
+        # Checked from the most to the least frequent kind of value
+        while pending:
+            value = pending.pop()
+            kind = NODE_KINDS.get(type(value))
+            if kind is not None:
+                if id(value) in nodes:
+                    out.append(REF)
+                    write_varint(out, nodes[id(value)])
+                    continue
+                nodes[id(value)] = len(nodes)
+                out.append(NODE_BASE + kind)
+                write_varint(out, 0 if value.line is None else value.line + 1)
+                write_varint(out, 0 if value.column is None else value.column + 1)
+                pending.extend([getattr(value, field) for field in REVERSED_FIELDS[kind]])
+            elif type(value) is str:
+                index = strings.get(value)
+                if index is None:
+                    strings[value] = len(strings)
+                    data = value.encode()
+                    out.append(NEW_STRING)
+                    write_varint(out, len(data))
+                    out += data
+                else:
+                    out.append(STRING)
+                    write_varint(out, index)
+            elif type(value) is list:
+                out.append(LIST)
+                write_varint(out, len(value))
+                pending.extend(reversed(value))
+            elif value is None:
+                out.append(NONE)
+            elif value is True or value is False:
+                out.append(TRUE if value else FALSE)
+            elif isinstance(value, int):
+                out.append(INT)
+                write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+            elif isinstance(value, float):
+                out.append(FLOAT)
+                out += DOUBLE.pack(value)
+            else:
+                raise TypeError(f"Cannot serialize {type(value).__name__}")
+        return out
+
+class Decoder:
+    """Decodes values from bytes-like records, keeping the string table across calls."""
+
+    def __init__(self):
+        self.strings = []
+
+    def decode(self, data):
+        """Decode the single value that fills data (a bytes-like object, not copied)."""
+        view = memoryview(data)
+        strings = self.strings
+        size = len(view)
+        pos = 0
+        # Open lists and nodes: [node kind or None for a list, items still to read, items, line, column, number]
+        stack = []
+        # Node number -> node, or None while the node is still open
+        nodes = []
+        while True:
+            if pos >= size:
+                raise FormatError("Truncated record")
+            tag = view[pos]
+            pos += 1
+            if tag >= NODE_BASE:
+                kind = tag - NODE_BASE
+                if kind >= len(NODE_TYPES):
+                    raise FormatError(f"Unknown node kind {kind}")
+                line, pos = read_varint(view, pos)
+                column, pos = read_varint(view, pos)
+                stack.append([kind, len(NODE_FIELDS[kind]), [], line - 1, column - 1, len(nodes)])
+                nodes.append(None)
+                if stack[-1][1]:
+                    continue
+                value = self.build(stack.pop(), nodes)
+            elif tag == LIST:
+                count, pos = read_varint(view, pos)
+                if count:
+                    stack.append([None, count, []])
+                    continue
+                value = []
+            elif tag == REF:
+                index, pos = read_varint(view, pos)
+                if index >= len(nodes) or nodes[index] is None:
+                    raise FormatError(f"Reference to unknown node {index}")
+                value = nodes[index]
+            elif tag == STRING:
+                index, pos = read_varint(view, pos)
+                if index >= len(strings):
+                    raise FormatError(f"Unknown string {index}")
+                value = strings[index]
+            elif tag == NEW_STRING:
+                length, pos = read_varint(view, pos)
+                if pos + length > size:
+                    raise FormatError("Truncated record")
+                value = str(view[pos:pos + length], "utf-8")
+                pos += length
+                strings.append(value)
+            elif tag == INT:
+                value, pos = read_varint(view, pos)
+                value = -(value + 1 >> 1) if value & 1 else value >> 1
+            elif tag == FLOAT:
+                if pos + DOUBLE.size > size:
+                    raise FormatError("Truncated record")
+                value = DOUBLE.unpack_from(view, pos)[0]
+                pos += DOUBLE.size
+            elif tag <= TRUE:
+                value = (None, False, True)[tag]
+            else:
+                raise FormatError(f"Unknown tag {tag}")
+            # Hand the value to the innermost open list or node, closing those it completes
+            while stack:
+                top = stack[-1]
+                top[2].append(value)
+                top[1] -= 1
+                if top[1]:
+                    break
+                stack.pop()
+                value = top[2] if top[0] is None else self.build(top, nodes)
+            else:
+                if pos != size:
+                    raise FormatError("Trailing data in record")
+                return value
+
+    def build(self, frame, nodes):
+        kind, _, values, line, column, number = frame
+        node = NODE_TYPES[kind].__new__(NODE_TYPES[kind])
+        node.__dict__.update(zip(NODE_FIELDS[kind], values))
+        if line >= 0:
+            node.line = line
+            node.column = column
+        nodes[number] = node
+        return node
+
+def write_varint(out, value):
+    if value < 0x80:
+        out.append(value)
+        return
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(view, pos):
+    """Read the varint at pos; returns it and the position after it."""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(view):
+            raise FormatError("Truncated varint")
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def header():
+    out = bytearray(MAGIC)
+    write_varint(out, VERSION)
+    return out
+
+def dump(program, file):
+    """Write program to a binary file object, one statement record at a time."""
+    encoder = Encoder()
+    file.write(header())
+    for statement in program.statements:
+        record = encoder.encode(statement, bytearray())
+        prefix = bytearray()
+        write_varint(prefix, len(record))
+        file.write(prefix)
+        file.write(record)
+    file.write(b"\0")
+
+def dumps(program):
+    """Serialize program to bytes."""
+    encoder = Encoder()
+    out = header()
+    for statement in program.statements:
+        record = encoder.encode(statement, bytearray())
+        write_varint(out, len(record))
+        out += record
+    out.append(0)
+    return bytes(out)
+
+def check_header(view):
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise FormatError("Not a serialized AST")
+    version, pos = read_varint(view, len(MAGIC))
+    if version != VERSION:
+        raise FormatError(f"Unsupported AST format version {version}, expected {VERSION}")
+    return pos
+
+def loads(data):
+    """Deserialize a Program from a bytes-like object; a memoryview is read without copying."""
+    view = memoryview(data)
+    pos = check_header(view)
+    decoder = Decoder()
+    statements = []
+    while True:
+        length, pos = read_varint(view, pos)
+        if not length:
+            break
+        statements.append(decoder.decode(view[pos:pos + length]))
+        pos += length
+    if pos != len(view):
+        raise FormatError("Trailing data after the program")
+    return Program(statements)
+
+def read_exactly(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise FormatError("Truncated stream")
+    return data
+
+def read_stream_varint(file):
+    value = 0
+    shift = 0
+    while True:
+        byte = read_exactly(file, 1)[0]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+def iter_load(file):
+    """Yield the top-level statements serialized in a binary file object as they are read."""
+    if read_exactly(file, len(MAGIC)) != MAGIC:
+        raise FormatError("Not a serialized AST")
+    version = read_stream_varint(file)
+    if version != VERSION:
+        raise FormatError(f"Unsupported AST format version {version}, expected {VERSION}")
+    decoder = Decoder()
+    while True:
+        length = read_stream_varint(file)
+        if not length:
+            return
+        yield decoder.decode(read_exactly(file, length))
+
+def load(file):
+    """Read a Program from a binary file object."""
+    return Program(list(iter_load(file)))
@@ -1,6 +1,8 @@
 class Node:
     """Base class for all AST nodes."""
-    pass
+    # Source position of the node's first token, filled in by the parser
+    line = None
+    column = None
 
 class Expression(Node):
     """Base class for all expressions."""
@@ -38,6 +40,14 @@ class String(Expression):
     def __repr__(self):
         return f"String({self.value})"
 
+class FormattedString(Expression):
+    """Represents an f-string as a sequence of literal String parts and interpolated expressions."""
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __repr__(self):
+        return f"FormattedString({self.parts})"
+
 class Boolean(Expression):
     """Represents a boolean literal."""
     def __init__(self, value):
@@ -156,10 +166,44 @@ class Return(Statement):
     def __repr__(self):
         return f"Return({self.value})"
 
+class Import(Statement):
+    """Represents an import statement."""
+    def __init__(self, modules):
+        self.modules = modules
+
+    def __repr__(self):
+        return f"Import({self.modules})"
+
+class ImportFrom(Statement):
+    """Represents a from ... import statement."""
+    def __init__(self, module, names):
+        self.module = module
+        self.names = names
+
+    def __repr__(self):
+        return f"ImportFrom({self.module}, {self.names})"
+
 class List(Expression):
     def __init__(self, elements):
         self.elements = elements
 
+class Dict(Expression):
+    """Represents a dict literal; indexing and item assignment reuse ListAccess and ListAssignment."""
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    def __repr__(self):
+        return f"Dict({self.keys}, {self.values})"
+
+class Set(Expression):
+    """Represents a set literal."""
+    def __init__(self, elements):
+        self.elements = elements
+
+    def __repr__(self):
+        return f"Set({self.elements})"
+
 class ListAccess(Expression):
     """Represents a list access."""
     def __init__(self, list_expr, index):
@@ -179,6 +223,16 @@ class ListAssignment(Statement):
     def __repr__(self):
         return f"ListAssignment({self.list_expr}, {self.index}, {self.value})"
 
+class MethodCall(Expression):
+    """Represents a method call such as arr.append(x)."""
+    def __init__(self, receiver, method, args):
+        self.receiver = receiver
+        self.method = method
+        self.args = args
+
+    def __repr__(self):
+        return f"MethodCall({self.receiver}, {self.method}, {self.args})"
+
 class LenCall(Expression):
     """Represents a len() function call."""
     def __init__(self, arg):
@@ -186,3 +240,36 @@ class LenCall(Expression):
 
     def __repr__(self):
         return f"LenCall({self.arg})"
+
+class Algorithm(Expression):
+    """A C++ standard algorithm replacing a recognized loop over a list, see idioms.py.
+
+    It runs over the items of source (list_expr when None) from the int index start
+    on and writes list_expr; item names the item in expr, the function of a transform.
+    """
+    def __init__(self, name, list_expr, start, args, source=None, item=None, expr=None):
+        self.name = name
+        self.list_expr = list_expr
+        self.start = start
+        self.args = args
+        self.source = source
+        self.item = item
+        self.expr = expr
+
+    def __repr__(self):
+        return f"Algorithm({self.name}, {self.list_expr}, {self.start}, {self.args}, {self.source}, {self.expr})"
+
+class TaskGroup(Statement):
+    """Independent recursive calls that may run as parallel tasks, see tasks.py.
+
+    statements are call statements or assignments of calls. Tasks are only worth
+    spawning while each sizes expression (one per statement but the last, or None) is
+    large, and only correct while every guards expression is non-negative.
+    """
+    def __init__(self, statements, sizes, guards):
+        self.statements = statements
+        self.sizes = sizes
+        self.guards = guards
+
+    def __repr__(self):
+        return f"TaskGroup({self.statements}, {self.sizes}, {self.guards})"
@@ -0,0 +1,82 @@
+"""Compare the binary AST format (ast_format) with pickle on large parsed programs.
+
+Usage:
+    python bench_ast_format.py [--sizes 1000,10000,100000] [--seed N] [--repeat N] [--nesting N]
+
+For each size a synthetic program of that many lines is generated (program_generator)
+and parsed once; its Program is then serialized and deserialized --repeat times with
+pickle (highest protocol) and with ast_format, reporting the encoded size and the best
+time of each. Decoding reads ast_format from a memoryview. Every ast_format round trip
+must generate the same C++ as the parsed tree, otherwise the script exits non-zero.
+A program nested --nesting levels deep (nested_program) is serialized as well, which
+pickle cannot do within the default recursion limit.
+"""
+import argparse
+import pickle
+import sys
+import time
+
+from lexer import Lexer
+from parser import Parser
+from codegen import CodeGenerator
+from program_generator import ProgramGenerator, nested_program
+import ast_format
+
+def parse(source):
+    return Parser(Lexer(source).tokenize()).parse()
+
+def best_time(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure(program, repeat):
+    """Return {format: (encoded bytes, encode seconds, decode seconds)}; None for a format that fails."""
+    results = {}
+    try:
+        pickled = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+        results["pickle"] = (len(pickled),
+                             best_time(lambda: pickle.dumps(program, pickle.HIGHEST_PROTOCOL), repeat),
+                             best_time(lambda: pickle.loads(pickled), repeat))
+    except RecursionError:
+        results["pickle"] = None
+    encoded = ast_format.dumps(program)
+    view = memoryview(encoded)
+    results["ast_format"] = (len(encoded),
+                             best_time(lambda: ast_format.dumps(program), repeat),
+                             best_time(lambda: ast_format.loads(view), repeat))
+    return results
+
+def report(label, results):
+    for name, result in results.items():
+        if result is None:
+            print(f"{label:>9} {name:>11} {'fails (RecursionError)':>40}")
+            continue
+        size, encode, decode = result
+        print(f"{label:>9} {name:>11} {size / 1024:10.1f} KB {encode * 1000:10.1f}ms {decode * 1000:10.1f}ms")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated program sizes in lines")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=5, help="runs of each measurement; the best is reported")
+    arg_parser.add_argument("--nesting", type=int, default=5000, help="nesting depth of the deep program (0 skips it)")
+    args = arg_parser.parse_args()
+
+    print(f"{'lines':>9} {'format':>11} {'size':>13} {'encode':>12} {'decode':>12}")
+    programs = [(size, ProgramGenerator(args.seed).generate(size)) for size in map(int, args.sizes.split(","))]
+    if args.nesting:
+        programs.append((f"depth {args.nesting}", nested_program(args.nesting)))
+    for label, source in programs:
+        program = parse(source)
+        decoded = ast_format.loads(memoryview(ast_format.dumps(program)))
+        if CodeGenerator().generate(decoded) != CodeGenerator().generate(program):
+            print(f"The decoded AST of {label} generates different C++")
+            sys.exit(1)
+        report(label, measure(program, args.repeat))
+
+if __name__ == "__main__":
+    main()
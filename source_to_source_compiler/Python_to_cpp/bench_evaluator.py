@@ -0,0 +1,73 @@
+"""Check the AST evaluator against CPython and compare their speed.
+
+Usage:
+    python bench_evaluator.py [--repeat N] [files...]
+
+Each program (by default my.py and the Test/ programs) is parsed, compiled by the
+Evaluator and run; its output must match what CPython prints for the same source,
+otherwise the script exits non-zero. Each program is then run --repeat times by
+both, reusing the compiled closures and the compiled code object respectively.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import Evaluator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES = [os.path.join(HERE, "my.py")] + sorted(glob.glob(os.path.join(HERE, "..", "Test", "*.py")))
+
+def parse(source):
+    return Parser(Lexer(source).tokenize()).parse()
+
+def run_cpython(code, output):
+    with contextlib.redirect_stdout(output):
+        exec(code, {"__name__": "__main__"})
+
+def timed(run, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=200, help="runs of each program in the timing")
+    arg_parser.add_argument("files", nargs="*", default=EXAMPLES)
+    args = arg_parser.parse_args()
+
+    print(f"{'program':24} {'compile':>9} {'evaluator':>10} {'cpython':>9} {'ratio':>6}")
+    for path in args.files:
+        name = os.path.relpath(path, HERE)
+        with open(path) as f:
+            source = f.read()
+        start = time.perf_counter()
+        evaluator = Evaluator(parse(source))
+        compile_time = time.perf_counter() - start
+        code = compile(source, path, "exec")
+
+        evaluated = io.StringIO()
+        evaluator.output = evaluated
+        evaluator.run()
+        expected = io.StringIO()
+        run_cpython(code, expected)
+        if evaluated.getvalue() != expected.getvalue():
+            print(f"The evaluator's output differs from CPython's on {name}:")
+            print(f"  evaluator: {evaluated.getvalue()!r}")
+            print(f"  cpython:   {expected.getvalue()!r}")
+            sys.exit(1)
+
+        evaluator.output = io.StringIO()
+        evaluator_time = timed(evaluator.run, args.repeat)
+        cpython_time = timed(lambda: run_cpython(code, io.StringIO()), args.repeat)
+        print(f"{name:24} {compile_time * 1000:7.2f}ms {evaluator_time:9.3f}s {cpython_time:8.3f}s "
+              f"{evaluator_time / cpython_time:5.1f}x")
+
+if __name__ == "__main__":
+    main()
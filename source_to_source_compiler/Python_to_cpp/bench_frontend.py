@@ -0,0 +1,75 @@
+"""Check the parsing frontends against each other and measure their throughput.
+
+Usage:
+    python bench_frontend.py [--programs N] [--lines N] [--repeat N] [--seed N]
+
+Every frontend in FRONTENDS must give the same C++ as the hand-written parser for the
+example programs and for N generated ones (see program_generator.py), and must locate
+every node the hand parser locates at the same line and column; the script exits
+non-zero on the first difference. A generated program of --lines lines is then parsed
+by each frontend, best of --repeat runs.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from analysis import walk
+from codegen import CodeGenerator
+from frontends import FRONTENDS, parse_source
+from program_generator import ProgramGenerator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES = [os.path.join(HERE, "my.py")] + sorted(glob.glob(os.path.join(HERE, "..", "Test", "*.py")))
+
+def positions(program):
+    return [(type(node).__name__, node.line, node.column) for node, _ in walk(program.statements)]
+
+def check_equivalence(sources):
+    for name, source in sources:
+        expected = parse_source(source, "hand")
+        expected_code = CodeGenerator(source_file=name).generate(expected)
+        for frontend in FRONTENDS:
+            program = parse_source(source, frontend)
+            found, wanted = positions(program), positions(expected)
+            # The hand parser leaves some nodes, such as assignment targets, unlocated
+            if len(found) != len(wanted) or any(want != got for got, want in zip(found, wanted) if want[1] is not None):
+                print(f"Frontend '{frontend}' locates the nodes of {name} differently from 'hand'")
+                return False
+            if CodeGenerator(source_file=name).generate(program) != expected_code:
+                print(f"Frontend '{frontend}' generates different code from 'hand' for {name}")
+                return False
+    return True
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--programs", type=int, default=20, help="number of generated programs to compare")
+    arg_parser.add_argument("--lines", type=int, default=20000, help="lines of the timed program")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    examples = []
+    for path in EXAMPLES:
+        with open(path) as f:
+            examples.append((os.path.relpath(path, HERE), f.read()))
+    generated = [(f"generated program {seed}", ProgramGenerator(seed=seed).generate(200))
+                 for seed in range(args.seed, args.seed + args.programs)]
+    if not check_equivalence(examples + generated):
+        sys.exit(1)
+    print(f"All frontends agree on {len(examples)} examples and {len(generated)} generated programs")
+
+    source = ProgramGenerator(seed=args.seed).generate(args.lines)
+    print(f"\nParsing {len(source.splitlines())} lines:")
+    for frontend in FRONTENDS:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            program = parse_source(source, frontend)
+            best = min(best, time.perf_counter() - start)
+        count = sum(1 for _ in walk(program.statements))
+        print(f"  {frontend:8} {count} nodes in {best:.3f}s  ({count / best:,.0f} nodes/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Check the lexer backends against each other and measure their throughput.
+
+Usage:
+    python bench_lexer.py [--fuzz N] [--repeat N] [--seed N]
+
+Every backend in LEXER_BACKENDS must produce the same tokens (type, value, line and
+column) as the regex Lexer on the example programs and on a seeded fuzz corpus of
+random token fragments; the script exits non-zero on the first difference. The
+examples are then repeated into one large input and tokenized by each backend.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+from lexer import Lexer, LEXER_BACKENDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES = [os.path.join(HERE, "my.py")] + sorted(glob.glob(os.path.join(HERE, "..", "Test", "*.py")))
+
+# Fragments biased towards token boundaries: keywords glued to digits, f-prefixes,
+# unterminated strings, escapes, CR/LF and characters no rule matches
+FUZZ_FRAGMENTS = list("abfFxyz_019 \t\n\r.\"'\\#+-*/%=!<>()[]{},:;é١") + [
+    "print", "if", "else", "while", "for", "in", "range", "def", "return",
+    "True", "False", "and", "or", "not", "import", "from", 'f"', "f'", "1.5", ".5", "1.", "a.b(", "==", "!=", "+=",
+]
+
+def token_key(tokens):
+    return [(token.type, token.value, type(token.value), token.line, token.column) for token in tokens]
+
+def fuzz_corpus(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(0, 60)))
+
+def check_equivalence(sources):
+    for name, source in sources:
+        expected = token_key(Lexer(source).tokenize())
+        for backend, lexer_class in LEXER_BACKENDS.items():
+            if token_key(lexer_class(source).tokenize()) != expected:
+                print(f"Backend '{backend}' differs from 'regex' on {name}: {source!r}")
+                return False
+    return True
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--fuzz", type=int, default=20000, help="number of fuzz inputs")
+    arg_parser.add_argument("--repeat", type=int, default=500, help="copies of the examples in the timed input")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    examples = []
+    for path in EXAMPLES:
+        with open(path) as f:
+            examples.append((os.path.relpath(path, HERE), f.read()))
+    fuzz = [(f"fuzz input {i}", source) for i, source in enumerate(fuzz_corpus(args.fuzz, args.seed))]
+    if not check_equivalence(examples + fuzz):
+        sys.exit(1)
+    print(f"All backends agree on {len(examples)} examples and {len(fuzz)} fuzz inputs")
+
+    source = "\n".join(text for _, text in examples) * args.repeat
+    print(f"\nTokenizing {len(source.splitlines())} lines:")
+    for backend, lexer_class in LEXER_BACKENDS.items():
+        start = time.perf_counter()
+        count = len(lexer_class(source).tokenize())
+        elapsed = time.perf_counter() - start
+        print(f"  {backend:8} {count} tokens in {elapsed:.3f}s  ({count / elapsed:,.0f} tokens/s)")
+
+if __name__ == "__main__":
+    main()
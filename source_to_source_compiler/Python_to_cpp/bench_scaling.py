@@ -0,0 +1,103 @@
+"""Measure how the lexer, parser and code generator scale with program size.
+
+Usage:
+    python bench_scaling.py [--sizes 1000,10000,100000] [--seed N] [--max-slowdown X] [--no-memory]
+                            [--nesting 1000,10000,30000]
+
+For each size a synthetic program of that many lines is generated (program_generator)
+and run through the pipeline, reporting tokens/s for the lexer, AST nodes/s for the
+parser and emitted C++ lines/s for the code generator, plus the peak memory of the
+whole pipeline measured in a separate tracemalloc pass. Time per input line should
+stay flat as programs grow; the script exits non-zero if, for some stage, the
+largest size costs more than --max-slowdown times the cheapest size per line.
+Pass --sizes 1000,10000,100000,1000000 for the full range (several minutes).
+
+With --nesting, programs whose expressions nest that many levels deep
+(program_generator.nested_program) are timed as well, with the same check on the
+time per nesting level.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from lexer import Lexer
+from parser import Parser
+from codegen import CodeGenerator
+from analysis import walk
+from program_generator import ProgramGenerator, nested_program
+
+def run_pipeline(source):
+    """Transpile source; returns the timings of each stage and the amount of work done."""
+    timings = {}
+    start = time.perf_counter()
+    tokens = Lexer(source).tokenize()
+    timings["lex"] = time.perf_counter() - start
+    start = time.perf_counter()
+    ast = Parser(tokens).parse()
+    timings["parse"] = time.perf_counter() - start
+    start = time.perf_counter()
+    cpp = CodeGenerator().generate(ast)
+    timings["codegen"] = time.perf_counter() - start
+    counts = {"lex": len(tokens), "parse": sum(1 for _ in walk(ast.statements)), "codegen": cpp.count("\n")}
+    return timings, counts
+
+def peak_memory(source):
+    tracemalloc.start()
+    try:
+        run_pipeline(source)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated program sizes in lines")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--max-slowdown", type=float, default=2.5,
+                            help="allowed growth of the time per line between sizes")
+    arg_parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    arg_parser.add_argument("--nesting", default="", help="comma-separated expression nesting depths to time")
+    args = arg_parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    units = {"lex": "tokens", "parse": "nodes", "codegen": "lines"}
+    per_line = {stage: [] for stage in units}
+    print(f"{'lines':>9} {'lex tokens/s':>14} {'parse nodes/s':>14} {'codegen lines/s':>16} {'peak memory':>12}")
+    for size in sizes:
+        source = ProgramGenerator(args.seed).generate(size)
+        lines = source.count("\n")
+        timings, counts = run_pipeline(source)
+        for stage in units:
+            per_line[stage].append(timings[stage] / lines)
+        memory = "" if args.no_memory else f"{peak_memory(source) / 2 ** 20:9.1f} MB"
+        rates = [f"{counts[stage] / timings[stage]:,.0f}" for stage in units]
+        print(f"{lines:9} {rates[0]:>14} {rates[1]:>14} {rates[2]:>16} {memory:>12}")
+
+    failed = False
+    for stage, costs in per_line.items():
+        slowdown = costs[-1] / min(costs)
+        if slowdown > args.max_slowdown:
+            print(f"{stage} does not scale linearly: {slowdown:.1f}x the time per line at {sizes[-1]} lines")
+            failed = True
+
+    if args.nesting:
+        depths = [int(depth) for depth in args.nesting.split(",")]
+        per_level = {stage: [] for stage in units}
+        print(f"\n{'depth':>9} {'lex s':>10} {'parse s':>10} {'codegen s':>10}")
+        for depth in depths:
+            timings, _ = run_pipeline(nested_program(depth))
+            for stage in units:
+                per_level[stage].append(timings[stage] / depth)
+            print(f"{depth:9} {timings['lex']:10.3f} {timings['parse']:10.3f} {timings['codegen']:10.3f}")
+        for stage, costs in per_level.items():
+            slowdown = costs[-1] / min(costs)
+            if slowdown > args.max_slowdown:
+                print(f"{stage} does not scale linearly with nesting: {slowdown:.1f}x the time per level at depth {depths[-1]}")
+                failed = True
+    if failed:
+        sys.exit(1)
+    print(f"\nAll stages scale linearly within {args.max_slowdown}x")
+
+if __name__ == "__main__":
+    main()
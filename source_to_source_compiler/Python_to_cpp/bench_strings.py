@@ -0,0 +1,75 @@
+"""Check that transpiled string-building loops take time linear in the string length.
+
+Usage:
+    python bench_strings.py [--sizes 100000,400000,1600000] [--max-slowdown X] [--cxx g++]
+
+A report generator (rows built with +, appended to a report string with s = s + ...,
+collected in a list and joined) is transpiled for each number of rows, compiled with
+-O2 and run; its output must match CPython's for the smallest size. Appending in
+place keeps the time per row flat, where copying the report on every row would make
+it grow with the size; the script exits non-zero if the largest size costs more than
+--max-slowdown times the cheapest one per row.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from main import transpile
+
+PROGRAM = """
+def report(n):
+    s = ""
+    for i in range(n):
+        s = s + "row " + str(i) + ": " + str(i * 3 % 7) + "\\n"
+    cells = []
+    for i in range(n):
+        cells.append(str(i % 10))
+    line = ",".join(cells)
+    return len(s) + len(line)
+
+def main():
+    print(report(ROWS))
+
+if __name__ == "__main__":
+    main()
+"""
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", default="100000,400000,1600000", help="comma-separated numbers of rows")
+    arg_parser.add_argument("--max-slowdown", type=float, default=3.0)
+    arg_parser.add_argument("--cxx", default="g++")
+    args = arg_parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    per_row = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            source = PROGRAM.replace("ROWS", str(size))
+            code, _ = transpile(source, source_file="report.py")
+            cpp = os.path.join(workdir, "report.cpp")
+            binary = os.path.join(workdir, f"report_{size}")
+            with open(cpp, "w") as f:
+                f.write(code)
+            subprocess.run([args.cxx, "-std=c++17", "-O2", cpp, "-o", binary], check=True)
+            start = time.perf_counter()
+            output = subprocess.run([binary], check=True, capture_output=True, text=True).stdout
+            seconds = time.perf_counter() - start
+            if size == min(sizes):
+                expected = subprocess.run([sys.executable, "-c", source], check=True, capture_output=True,
+                                          text=True).stdout
+                if output != expected:
+                    print(f"{size} rows print {output!r} instead of {expected!r}")
+                    sys.exit(1)
+            per_row.append(seconds / size)
+            print(f"{size} rows: {seconds:.3f}s ({seconds / size * 1e9:.1f} ns/row)")
+    slowdown = per_row[-1] / min(per_row)
+    print(f"slowdown per row: {slowdown:.2f}x")
+    if slowdown > args.max_slowdown:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compare divide-and-conquer programs built with and without --parallel-calls.
+
+Usage:
+    python bench_tasks.py [--depths 1,2,4] [--cutoff N] [--cxx g++] [files...]
+
+Each program (by default a quick sort of three million ints, a tree sum over the
+sorted list and a recursive Fibonacci of 36) is transpiled once without task
+groups and once per task depth, compiled with -O2 -pthread and run. Every parallel
+build must print what the sequential one prints, otherwise the script exits
+non-zero. The speedup is bounded by the number of cores: 2**depth tasks run at most.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from main import transpile
+
+PROGRAM = """
+def partition(arr, low, high):
+    pivot = arr[high]
+    i = low - 1
+    for j in range(low, high):
+        if arr[j] <= pivot:
+            i += 1
+            arr[i], arr[j] = arr[j], arr[i]
+    arr[i + 1], arr[high] = arr[high], arr[i + 1]
+    return i + 1
+
+def quick_sort(arr, low, high):
+    if low < high:
+        pi = partition(arr, low, high)
+        quick_sort(arr, low, pi - 1)
+        quick_sort(arr, pi + 1, high)
+
+def total(arr, lo, hi):
+    if hi - lo < 16:
+        s = 0
+        for k in range(lo, hi):
+            s += arr[k] % 1000
+        return s
+    mid = (lo + hi) // 2
+    return total(arr, lo, mid) + total(arr, mid, hi)
+
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+def main():
+    n = 3000000
+    arr = []
+    x = 12345
+    for i in range(n):
+        x = (x * 1103515245 + 12345) % 2147483648
+        arr.append(x % 1000000)
+    quick_sort(arr, 0, len(arr) - 1)
+    print(arr[0], arr[n // 2], arr[n - 1])
+    print(total(arr, 0, n))
+    # Not constant, so the call is not folded at transpile time
+    print(fib(arr[n - 1] // 30000 + 3))
+
+if __name__ == "__main__":
+    main()
+"""
+
+def build(source, name, workdir, cxx, **options):
+    """Transpile and compile source; returns the path of the binary."""
+    code, _ = transpile(source, source_file=name, **options)
+    cpp = os.path.join(workdir, "program.cpp")
+    binary = os.path.join(workdir, f"program_{len(os.listdir(workdir))}")
+    with open(cpp, "w") as f:
+        f.write(code)
+    subprocess.run([cxx, "-std=c++17", "-O2", "-pthread", cpp, "-o", binary], check=True)
+    return binary
+
+def run(binary):
+    start = time.perf_counter()
+    output = subprocess.run([binary], check=True, capture_output=True, text=True).stdout
+    return output, time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--depths", default="1,2,4", help="comma-separated task depths to build")
+    arg_parser.add_argument("--cutoff", type=int, default=1000, help="task cutoff in list items")
+    arg_parser.add_argument("--cxx", default="g++")
+    arg_parser.add_argument("files", nargs="*")
+    args = arg_parser.parse_args()
+    depths = [int(depth) for depth in args.depths.split(",")]
+
+    programs = [("divide and conquer", PROGRAM)]
+    for path in args.files:
+        with open(path) as f:
+            programs.append((os.path.basename(path), f.read()))
+    print(f"{os.cpu_count()} cores")
+    for name, source in programs:
+        with tempfile.TemporaryDirectory() as workdir:
+            expected, sequential = run(build(source, name, workdir, args.cxx))
+            print(f"{name}: sequential {sequential:.3f}s")
+            for depth in depths:
+                binary = build(source, name, workdir, args.cxx, parallel_calls=True,
+                               task_cutoff=args.cutoff, task_depth=depth)
+                output, seconds = run(binary)
+                if output != expected:
+                    print(f"  task depth {depth} prints {output!r} instead of {expected!r}")
+                    sys.exit(1)
+                print(f"  task depth {depth}: {seconds:.3f}s ({sequential / seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
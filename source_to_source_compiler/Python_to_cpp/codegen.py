@@ -1,88 +1,485 @@
 from ast_nodes import (
-    Program, Print, BinaryOp, Number, String, Boolean, Variable,
+    Program, Print, BinaryOp, Number, String, FormattedString, Boolean, Variable,
     Assignment, IfStatement, WhileLoop, ForLoop, RangeCall,
     FunctionDef, FunctionCall, Return, List, ListAccess,
-    ListAssignment, LenCall, UnaryOp, Float
+    ListAssignment, LenCall, MethodCall, UnaryOp, Float, Import, ImportFrom, Dict, Set, Algorithm,
+    TaskGroup
 )
+from analysis import (
+    ListEscapeAnalysis, append_counts, grown_containers, walk, children, post_order, lower_bound, range_lower_bound,
+    assigned_names, resolve_module_calls, FunctionFacts
+)
+from consteval import ConstEvaluator, NotConstant, pure_functions, constant_names
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import ast_format
+import idioms
+import ir
+import tasks
+
+# Marks the Python position of the following generated lines; resolved in generate()
+LINE_MARKER = "//@line "
+
+# A profiled branch is hinted once it was evaluated this often and went one way at least this often
+BRANCH_HINT_MIN_SAMPLES = 16
+BRANCH_HINT_RATIO = 0.8
+
+def is_map_type(type_):
+    return type_.startswith(('unordered_map<', 'py_flat_map<'))
+
+def is_set_type(type_):
+    return type_.startswith('unordered_set<')
+
+def type_arguments(type_):
+    """Split the template arguments of a type like unordered_map<int, vector<int>>."""
+    inner = type_[type_.index('<') + 1:-1]
+    arguments = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(inner):
+        if char == '<':
+            depth += 1
+        elif char == '>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            arguments.append(inner[start:i].strip())
+            start = i + 1
+    arguments.append(inner[start:].strip())
+    return arguments
 
 class CodeGenerator:
     """Generates C++ code from an AST."""
     
-    def __init__(self):
+    def __init__(self, source_file="input.py", generated_file="output.cpp", line_directives=False,
+                 instrument=False, branch_profile=None, external_functions=None, flat_int_maps=False,
+                 mode="release", const_eval_budget=100000, workers=1, use_ir=True, std_sort=False,
+                 parallel_calls=False, task_cutoff=1000, task_depth=4):
+        # Everything a worker process needs to rebuild this generator, see start_worker()
+        self.options = {
+            "source_file": source_file, "generated_file": generated_file, "line_directives": line_directives,
+            "instrument": instrument, "branch_profile": branch_profile, "external_functions": external_functions,
+            "flat_int_maps": flat_int_maps, "mode": mode, "const_eval_budget": const_eval_budget,
+            "use_ir": use_ir, "std_sort": std_sort, "parallel_calls": parallel_calls,
+            "task_cutoff": task_cutoff, "task_depth": task_depth,
+        }
+        # Processes generating function definitions in parallel; 1 generates them in this process
+        self.workers = workers
+        self.single_unit = True
+        self.source_file = source_file
+        self.generated_file = generated_file
+        self.line_directives = line_directives
+        self.instrument = instrument
+        # Use the open-addressing py_flat_map instead of unordered_map for dicts with int keys
+        self.flat_int_maps = flat_int_maps
+        # "debug" checks every list index like Python's IndexError; "release" indexes raw
+        if mode not in ("debug", "release"):
+            raise Exception(f"Unknown codegen mode: {mode}")
+        self.mode = mode
+        # Replace recognized sorting loops by std::sort, see idioms.py
+        self.std_sort = std_sort
+        # Run independent recursive calls as std::async tasks, see tasks.py: only while
+        # fewer than task_depth groups are nested and each call covers task_cutoff items
+        self.parallel_calls = parallel_calls
+        self.task_cutoff = task_cutoff
+        self.task_depth = task_depth
+        self.task_analysis = None
+        # Lower bounds of the range() loop variables in scope
+        self.index_bounds = {}
+        # Steps the transpile-time evaluator may spend on one call; 0 disables folding
+        self.const_eval_budget = const_eval_budget
+        self.pure_functions = set()
+        self.constexpr_functions = set()
+        self.const_evaluator = None
+        # Locals of the function being generated that always hold one integer literal
+        self.constants = {}
+        # (line, column) of an if statement -> (times evaluated, times taken)
+        self.branch_profile = branch_profile or {}
+        self.profile_sites = []
+        self.source_map = None
+        # Return types of the functions callable from this module, including imported ones
+        self.function_types = dict(external_functions or {})
+        # Function name -> FunctionFacts of its body
+        self.function_facts = {}
+        # Function name -> the types return_type() gave its locals
+        self.function_locals = {}
+        # Those of the function being generated
+        self.local_types = {}
         self.indent_level = 0
         self.variables = set()
+        self.variable_types = {}
         self.functions = set()
+        self.uses_format = False
+        self.list_analysis = None
+        # Fixed-size lists of the function being generated, name -> length
+        self.fixed_lists = {}
+        # Lists of the function being generated that hold strings rather than ints
+        self.text_lists = set()
+        # Containers grown by the loops being generated; only the outermost one reserves
+        self.growing_containers = set()
+        self.uses_list_helpers = False
+        self.uses_container_helpers = False
+        self.uses_arithmetic_helpers = False
+        self.uses_task_helpers = False
+        self.uses_string_helpers = False
+        # Temporaries introduced by tuple assignments
+        self.temporary_count = 0
+        # Code and types of the subexpressions of the expression being generated, see bottom_up()
+        self.expression_code = None
+        self.expression_types = None
+        # Emit the functions the IR can express from it (see ir.py) rather than from the AST
+        self.use_ir = use_ir
+        self.pass_manager = ir.PassManager()
+        # IR pass name -> seconds spent in it on the functions generated so far
+        self.pass_timings = {}
     
     def generate(self, ast):
         """Main function to generate C++ code."""
         if isinstance(ast, Program):
-            return self.generate_program(ast)
+            return self.resolve_line_markers(self.generate_program(ast))
         else:
             raise Exception(f"Expected Program node, got {type(ast)}")
     
-    def generate_program(self, ast):
-        """Generate code for the entire program."""
+    def line_marker(self, node):
+        """Return the marker line recording the Python position of node, if it has one."""
+        if getattr(node, 'line', None) is None:
+            return []
+        return [f"{LINE_MARKER}{node.line}:{node.column}"]
+
+    def resolve_line_markers(self, code):
+        """Strip position markers, building the source map and optional #line directives."""
+        lines = []
+        mappings = []
+        position = None
+        resume_generated = False
+        for line in code.split("\n"):
+            stripped = line.strip()
+            if stripped.startswith(LINE_MARKER):
+                marker = stripped[len(LINE_MARKER):]
+                if marker == "end":
+                    position = None
+                    resume_generated = self.line_directives
+                    continue
+                new_position = [int(part) for part in marker.split(":")]
+                if new_position != position:
+                    position = new_position
+                    resume_generated = False
+                    if self.line_directives:
+                        lines.append(f'#line {position[0]} "{self.source_file}"')
+                continue
+            if resume_generated:
+                # Point the compiler back at the generated file itself
+                lines.append(f'#line {len(lines) + 2} "{self.generated_file}"')
+                resume_generated = False
+            lines.append(line)
+            if position is not None:
+                mappings.append([len(lines)] + position)
+        self.source_map["mappings"] = mappings
+        return "\n".join(lines)
+
+    def start_source_map(self):
+        self.source_map = {
+            "version": 1,
+            "source": self.source_file,
+            "generated": self.generated_file,
+            "functions": {},
+            "mappings": [],
+        }
+
+    def generate_prelude(self, inline=False):
+        """Generate the includes and the list printing support every program uses."""
         code = []
         code.append("#include <bits/stdc++.h>")
         code.append("using namespace std;")
         code.append("")
-        code.append("void print_array(const vector<int>& arr) {")
-        code.append("    cout << '[';")
+        code.append("template <typename List>")
+        code.append("ostream& py_print_list(ostream& os, const List& arr) {")
+        code.append("    os << '[';")
         code.append("    for (size_t i = 0; i < arr.size(); ++i) {")
-        code.append("        cout << arr[i];")
-        code.append("        if (i < arr.size() - 1) cout << \", \";")
+        code.append("        if (i) os << \", \";")
+        code.append("        os << arr[i];")
         code.append("    }")
-        code.append("    cout << ']';")
+        code.append("    return os << ']';")
         code.append("}")
+        code.append(f"{'inline ' if inline else ''}ostream& operator<<(ostream& os, const vector<int>& arr) {{ return py_print_list(os, arr); }}")
+        code.append("template <size_t N>")
+        code.append("ostream& operator<<(ostream& os, const array<int, N>& arr) { return py_print_list(os, arr); }")
         code.append("")
-        # Collect function definitions and other statements
-        function_defs = []
-        other_stmts = []
-        for stmt in ast.statements:
-            if isinstance(stmt, FunctionDef):
-                function_defs.append(stmt)
+        return code
+
+    def collect_functions(self, ast, single_unit=True):
+        """Return the module's function definitions, recording their return types.
+
+        With single_unit, every caller sees the function definitions: functions whose
+        list parameters never resize or leak them are generated as templates, so callers
+        can pass them fixed-size arrays, and pure functions are generated as constexpr.
+        """
+        resolve_module_calls(ast)
+        function_defs = [stmt for stmt in ast.statements if isinstance(stmt, FunctionDef)]
+        self.single_unit = single_unit
+        self.function_facts = {func.name: FunctionFacts(func) for func in function_defs}
+        # A function returning the result of another one has its type, whichever comes first
+        changed = True
+        while changed:
+            changed = False
+            for func in function_defs:
+                return_type = self.return_type(func)
+                changed |= self.function_types.get(func.name) != return_type
+                self.function_types[func.name] = return_type
+        self.list_analysis = ListEscapeAnalysis(function_defs, safe_params=single_unit)
+        if not self.instrument:
+            # Folding calls away would also drop their profile counts
+            self.pure_functions = pure_functions(function_defs, self.function_types)
+            self.const_evaluator = ConstEvaluator(function_defs, self.pure_functions, self.const_eval_budget)
+        self.constexpr_functions = self.pure_functions if single_unit else set()
+        if self.parallel_calls and not self.instrument:
+            # The profile counters are not thread-safe
+            self.task_analysis = tasks.TaskAnalysis(function_defs, self.list_analysis.safe_params,
+                                                    self.is_container_param)
+            # Spawning threads is not allowed in constant expressions
+            self.constexpr_functions = self.constexpr_functions - self.task_analysis.parallel_functions
+        return function_defs
+
+    def generate_signature(self, func):
+        """Return the template header (if any) and parameter list of a function.
+
+        Besides arr, parameters used as containers (indexed, iterated, tested with in or
+        receiving method calls) take their type from the call site as template parameters.
+        """
+        params = []
+        type_params = []
+        for param in func.params:
+            if param == "arr":
+                if param in self.list_analysis.safe_params[func.name]:
+                    type_params.append("List")
+                    params.append("List& arr")
+                else:
+                    params.append("vector<int>& arr")
+            elif self.list_analysis.templates and self.is_container_param(func, param):
+                type_params.append(f"T_{param}")
+                params.append(f"T_{param}& {param}")
             else:
-                other_stmts.append(stmt)
-        # Generate function declarations
+                params.append(f"int {param}")
+        template = f"template <{', '.join(f'typename {name}' for name in type_params)}> " if type_params else ""
+        return template, ", ".join(params)
+
+    def specifiers(self, func):
+        return "constexpr " if func.name in self.constexpr_functions else ""
+
+    def fold_call(self, call):
+        """Evaluate a call of a pure function with constant arguments at transpile time.
+
+        Returns the C++ literal of the result, or None when the call cannot be folded.
+        """
+        if call.name not in self.pure_functions or not self.const_eval_budget:
+            return None
+        args = []
+        for arg in call.args:
+            if isinstance(arg, Number):
+                args.append(arg.value)
+            elif isinstance(arg, UnaryOp) and arg.operator == '-' and isinstance(arg.operand, Number):
+                args.append(-arg.operand.value)
+            elif isinstance(arg, Variable) and arg.name in self.constants:
+                args.append(self.constants[arg.name])
+            else:
+                return None
+        try:
+            value = self.const_evaluator.call(call.name, args)
+        except NotConstant:
+            return None
+        return f"{int(value)} /* {call.name}({', '.join(map(str, args))}) */"
+
+    def is_container_param(self, func, param):
+        return param in self.function_facts[func.name].container_params
+
+    def generate_prototypes(self, function_defs):
+        """Generate declarations for every function except main."""
+        code = []
         for func in function_defs:
             if func.name != "main":
-                params = []
-                for param in func.params:
-                    if param == "arr":
-                        params.append("vector<int>& arr")
-                    else:
-                        params.append(f"int {param}")
-                code.append(f"{'int' if func.name == 'partition' else 'void'} {func.name}({', '.join(params)});")
+                template, params = self.generate_signature(func)
+                code.append(f"{template}{self.specifiers(func)}{self.function_types[func.name]} {func.name}({params});")
+        return code
+
+    def generate_definitions(self, function_defs):
+        """Generate the definitions of every function except main, in source order.
+
+        Each function is generated in its own function_context(), so the output does not
+        depend on the order functions are generated in. With several workers they are
+        generated in a process pool; instrumented builds number their profile sites
+        across the module and are always generated here, in order.
+        """
+        functions = [func for func in function_defs if func.name != "main"]
+        for func in functions:
+            self.source_map["functions"][func.name] = func.line
+        if self.workers > 1 and len(functions) > 1 and not self.instrument:
+            encoded = ast_format.dumps(Program(function_defs))
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=start_worker,
+                                     initargs=(self.options, encoded, self.single_unit)) as pool:
+                indices = [function_defs.index(func) for func in functions]
+                chunk_size = max(1, len(indices) // (self.workers * 4))
+                results = list(pool.map(generate_in_worker, indices, chunksize=chunk_size))
+        else:
+            results = [self.generate_isolated(func) for func in functions]
+        code = []
+        for function_code, helper_uses, pass_timings in results:
+            self.merge_helper_uses(helper_uses)
+            self.merge_pass_timings(pass_timings)
+            code.append(function_code)
+            code.append("")
+        return code
+
+    def function_context(self):
+        """A generator for one function, with fresh per-function state.
+
+        The module-wide state (options, function types and the analyses made by
+        collect_functions) is shared with this generator and only read.
+        """
+        context = copy.copy(self)
+        context.indent_level = 0
+        context.index_bounds = {}
+        context.growing_containers = set()
+        context.temporary_count = 0
+        context.uses_format = False
+        context.uses_list_helpers = False
+        context.uses_container_helpers = False
+        context.uses_arithmetic_helpers = False
+        context.uses_task_helpers = False
+        context.uses_string_helpers = False
+        context.expression_code = None
+        context.expression_types = None
+        context.pass_timings = {}
+        return context
+
+    def helper_uses(self):
+        return (self.uses_format, self.uses_list_helpers, self.uses_container_helpers, self.uses_arithmetic_helpers,
+                self.uses_task_helpers, self.uses_string_helpers)
+
+    def merge_helper_uses(self, helper_uses):
+        """Record the runtime helpers a function generated elsewhere needs."""
+        (uses_format, uses_list_helpers, uses_container_helpers, uses_arithmetic_helpers, uses_task_helpers,
+         uses_string_helpers) = helper_uses
+        self.uses_format |= uses_format
+        self.uses_list_helpers |= uses_list_helpers
+        self.uses_container_helpers |= uses_container_helpers
+        self.uses_arithmetic_helpers |= uses_arithmetic_helpers
+        self.uses_task_helpers |= uses_task_helpers
+        self.uses_string_helpers |= uses_string_helpers
+
+    def merge_pass_timings(self, pass_timings):
+        for name, seconds in pass_timings.items():
+            self.pass_timings[name] = self.pass_timings.get(name, 0.0) + seconds
+
+    def generate_isolated(self, func):
+        """Return the code of func, the runtime helpers it needs and the time its IR passes took."""
+        context = self.function_context()
+        return context.generate_function(func), context.helper_uses(), context.pass_timings
+
+    def generate_program(self, ast):
+        """Generate code for the entire program."""
+        self.start_source_map()
+        code = self.generate_prelude()
+        helpers_index = len(code)
+        # Collect function definitions; other top-level statements are not emitted
+        function_defs = self.collect_functions(ast)
+        # Generate function declarations
+        code.extend(self.generate_prototypes(function_defs))
         code.append("")
         # Generate function definitions
-        for func in function_defs:
-            if func.name != "main":
-                code.append(self.generate_function(func))
-                code.append("")
+        code.extend(self.generate_definitions(function_defs))
         # Generate main function
-        code.append("int main() {")
         main_func = next((fd for fd in function_defs if fd.name == "main"), None)
+        code.extend(self.generate_main_isolated(main_func))
+        if self.instrument:
+            code[helpers_index:helpers_index] = self.generate_profile_runtime()
+        if self.uses_format:
+            code[helpers_index:helpers_index] = self.generate_format_helpers()
+        if self.uses_list_helpers:
+            code[helpers_index:helpers_index] = self.generate_list_helpers()
+        if self.uses_container_helpers:
+            code[helpers_index:helpers_index] = self.generate_container_helpers()
+        if self.uses_arithmetic_helpers:
+            code[helpers_index:helpers_index] = self.generate_arithmetic_helpers()
+        if self.uses_task_helpers:
+            code[helpers_index:helpers_index] = self.generate_task_helpers()
+        if self.uses_string_helpers:
+            code[helpers_index:helpers_index] = self.generate_string_helpers()
+        return "\n".join(code)
+
+    def generate_runtime_header(self):
+        """Generate py_runtime.h, the support code shared by all modules of a multi-module build."""
+        return "\n".join(["#pragma once"] + self.generate_prelude(inline=True) + self.generate_arithmetic_helpers()
+                         + self.generate_list_helpers()
+                         + self.generate_container_helpers(flat_map=True) + self.generate_format_helpers()
+                         + self.generate_task_helpers() + self.generate_string_helpers())
+
+    def generate_module(self, ast, module_name, imports, is_entry=False):
+        """Generate the header and translation unit of one module of a multi-module build.
+
+        The header declares the module's functions; the translation unit includes it and
+        the headers of the imported modules, defines the functions and, for the entry
+        module, main().
+        """
+        if self.instrument:
+            raise Exception("Instrumented builds support single-file programs only")
+        self.start_source_map()
+        # Templates would have to be defined in the header, so lists cross modules as vectors
+        function_defs = self.collect_functions(ast, single_unit=False)
+        header = ["#pragma once", '#include "py_runtime.h"', ""] + self.generate_prototypes(function_defs)
+        code = [f'#include "{module_name}.h"']
+        code.extend(f'#include "{module}.h"' for module in imports)
+        code.append("")
+        code.extend(self.generate_definitions(function_defs))
+        if is_entry:
+            main_func = next((fd for fd in function_defs if fd.name == "main"), None)
+            code.extend(self.generate_main_isolated(main_func))
+        return "\n".join(header) + "\n", self.resolve_line_markers("\n".join(code))
+
+    def generate_main_isolated(self, main_func):
+        context = self.function_context()
+        code = context.generate_main(main_func)
+        self.merge_helper_uses(context.helper_uses())
+        return code
+
+    def generate_main(self, main_func):
+        """Generate int main() from the body of the Python main function."""
+        code = []
+        code.extend(self.line_marker(main_func))
+        code.append("int main() {")
+        # Unsynchronised, untied cout: prints are buffered and only flushed at exit
+        code.append("    ios::sync_with_stdio(false);")
+        code.append("    cin.tie(nullptr);")
+        if self.mode == "debug":
+            # A failed bounds check still shows the buffered output printed before it
+            code.append("    set_terminate([] {")
+            code.append("        cout.flush();")
+            code.append("        try { throw; } catch (const exception& e) { cerr << \"Error: \" << e.what() << '\\n'; } catch (...) {}")
+            code.append("        abort();")
+            code.append("    });")
+        if self.instrument:
+            code.append(f"    PyProfileScope py_scope(py_profile_sites[{self.profile_site('function', 'main', main_func)}]);")
+        self.variables = set()
+        self.variable_types = {}
         if main_func:
-            for stmt in main_func.body:
+            self.source_map["functions"]["main"] = main_func.line
+            self.fixed_lists = self.list_analysis.fixed_lists(main_func, self.function_facts[main_func.name].nodes)
+            self.text_lists = self.function_facts[main_func.name].text_lists
+            self.local_types = self.function_locals[main_func.name]
+            self.constants = constant_names(main_func, self.function_facts[main_func.name].nodes)
+            for stmt in self.recognize_idioms(main_func).body:
                 # Skip the if __name__ == "__main__" block
                 if isinstance(stmt, IfStatement):
                     if (isinstance(stmt.condition, BinaryOp) and 
                         isinstance(stmt.condition.left, Variable) and 
                         stmt.condition.left.name == "__name__"):
                         continue
+                code.extend([f"    {line}" for line in self.line_marker(stmt)])
                 if isinstance(stmt, Assignment) and isinstance(stmt.value, List):
                     elements = [self.generate_expression(e) for e in stmt.value.elements]
-                    code.append(f"    vector<int> {stmt.name.name} = {{{', '.join(elements)}}};")
+                    code.append(f"    {self.list_type(stmt.name.name)} {stmt.name.name} = {{{', '.join(elements)}}};")
+                    self.variables.add(stmt.name.name)
+                    self.variable_types[stmt.name.name] = f"vector<{self.element_type(stmt.name.name)}>"
                 elif isinstance(stmt, Print):
-                    exprs = stmt.expressions
-                    if len(exprs) == 2 and isinstance(exprs[0], String) and isinstance(exprs[1], Variable):
-                        # Print string first
-                        code.append(f"    cout << {self.generate_expression(exprs[0])} << \" \";")
-                        # Then print array
-                        code.append(f"    print_array({exprs[1].name});")
-                        code.append("    cout << endl;")
-                    else:
-                        code.extend([f"    {line}" for line in self.generate_print(stmt)])
+                    code.extend([f"    {line}" for line in self.generate_print(stmt)])
                 elif isinstance(stmt, FunctionCall):
                     if stmt.name == "quick_sort":
                         # Generate arguments without brace initialization
@@ -99,14 +496,559 @@ class CodeGenerator:
                         code.append(f"    {self.generate_expression(stmt)};")
                 else:
                     code.extend([f"    {line}" for line in self.generate_statement(stmt)])
+        code.append("    cout.flush();")
         code.append("    return 0;")
         code.append("}")
-        return "\n".join(code)
+        code.append(f"{LINE_MARKER}end")
+        return code
+
+    def list_type(self, name):
+        """C++ type of a list variable: a stack array when its size is fixed, else a vector."""
+        if name in self.fixed_lists:
+            return f"array<{self.element_type(name)}, {self.fixed_lists[name]}>"
+        return f"vector<{self.element_type(name)}>"
+
+    def element_type(self, name):
+        return 'string' if name in self.text_lists else 'int'
+
+    def profile_site(self, kind, name, node):
+        """Register an instrumented function or loop and return its counter index."""
+        self.profile_sites.append((kind, name, getattr(node, 'line', None) or 0, getattr(node, 'column', None) or 0))
+        return len(self.profile_sites) - 1
+
+    def generate_profile_runtime(self):
+        """Generate the counter table and the JSON dump used by instrumented builds."""
+        code = []
+        code.append("struct PyProfileSite {")
+        code.append("    const char* kind;")
+        code.append("    const char* name;")
+        code.append("    int line;")
+        code.append("    int column;")
+        code.append("    unsigned long long calls;")
+        code.append("    unsigned long long iterations;")
+        code.append("    unsigned long long taken;")
+        code.append("    long long nanoseconds;")
+        code.append("    int depth;")
+        code.append("};")
+        code.append("")
+        code.append("PyProfileSite py_profile_sites[] = {")
+        for kind, name, line, column in self.profile_sites:
+            code.append(f'    {{"{kind}", "{name}", {line}, {column}, 0, 0, 0, 0, 0}},')
+        code.append("};")
+        code.append("")
+        code.append("// Counts an entry and, for the outermost active entry only, its inclusive wall time")
+        code.append("struct PyProfileScope {")
+        code.append("    PyProfileSite& site;")
+        code.append("    chrono::steady_clock::time_point start;")
+        code.append("    explicit PyProfileScope(PyProfileSite& site) : site(site) {")
+        code.append("        ++site.calls;")
+        code.append("        if (site.depth++ == 0) start = chrono::steady_clock::now();")
+        code.append("    }")
+        code.append("    ~PyProfileScope() {")
+        code.append("        if (--site.depth == 0) site.nanoseconds += chrono::duration_cast<chrono::nanoseconds>(chrono::steady_clock::now() - start).count();")
+        code.append("    }")
+        code.append("};")
+        code.append("")
+        code.append("inline bool py_profile_branch(PyProfileSite& site, bool condition) {")
+        code.append("    ++site.calls;")
+        code.append("    site.taken += condition;")
+        code.append("    return condition;")
+        code.append("}")
+        code.append("")
+        code.append("struct PyProfileDump {")
+        code.append("    ~PyProfileDump() {")
+        code.append("        const char* path = getenv(\"PY_PROFILE_OUTPUT\");")
+        code.append("        FILE* out = fopen(path ? path : \"py_profile.json\", \"w\");")
+        code.append("        if (!out) return;")
+        code.append(f"        fprintf(out, \"{{\\\"source\\\": \\\"{self.source_file}\\\", \\\"sites\\\": [\");")
+        code.append("        size_t count = sizeof(py_profile_sites) / sizeof(py_profile_sites[0]);")
+        code.append("        for (size_t i = 0; i < count; ++i) {")
+        code.append("            const PyProfileSite& s = py_profile_sites[i];")
+        code.append("            fprintf(out, \"%s\\n  {\\\"kind\\\": \\\"%s\\\", \\\"name\\\": \\\"%s\\\", \\\"line\\\": %d, \\\"column\\\": %d, \\\"calls\\\": %llu, \\\"iterations\\\": %llu, \\\"taken\\\": %llu, \\\"nanoseconds\\\": %lld}\",")
+        code.append("                    i ? \",\" : \"\", s.kind, s.name, s.line, s.column, s.calls, s.iterations, s.taken, s.nanoseconds);")
+        code.append("        }")
+        code.append("        fprintf(out, \"\\n]}\\n\");")
+        code.append("        fclose(out);")
+        code.append("    }")
+        code.append("} py_profile_dump;")
+        code.append("")
+        return code
+
+    def instrument_loop(self, loop, generate):
+        """Generate a loop, wrapped in a scope that times it and counts its iterations when instrumenting."""
+        if not self.instrument:
+            return generate(loop)
+        indent = "    " * self.indent_level
+        name = f"for {loop.var_name}" if isinstance(loop, ForLoop) else "while"
+        site = self.profile_site('loop', name, loop)
+        self.indent_level += 1
+        code = generate(loop)
+        self.indent_level -= 1
+        code.insert(1, f"{indent}        ++py_profile_sites[{site}].iterations;")
+        return [f"{indent}{{", f"{indent}    PyProfileScope py_scope(py_profile_sites[{site}]);"] + code + [f"{indent}}}"]
+
+    def generate_list_helpers(self):
+        """Generate the runtime used by list.pop() and preallocated list-building loops."""
+        code = []
+        code.append("template <typename T>")
+        code.append("T py_pop(vector<T>& list, long long index = -1) {")
+        code.append("    if (index < 0) index += list.size();")
+        code.append("    T value = list[index];")
+        code.append("    list.erase(list.begin() + index);")
+        code.append("    return value;")
+        code.append("}")
+        code.append("")
+        code.append("// Python index semantics: negative indices count from the end")
+        code.append("template <typename C>")
+        code.append("size_t py_index(const C& list, long long index) { return index < 0 ? index + list.size() : index; }")
+        code.append("")
+        code.append("// Number of iterations of range(start, stop, step)")
+        code.append("inline long long py_range_length(long long start, long long stop, long long step = 1) {")
+        code.append("    if (step > 0) return start < stop ? (stop - start + step - 1) / step : 0;")
+        code.append("    return start > stop ? (start - stop - step - 1) / -step : 0;")
+        code.append("}")
+        code.append("")
+        return code
+
+    def generate_arithmetic_helpers(self):
+        """Generate /, // and % with Python's semantics, for operands not proven non-negative."""
+        code = []
+        code.append("// Python division: // and % round towards negative infinity, / of ints is exact")
+        code.append("template <typename A, typename B, enable_if_t<is_integral_v<A> && is_integral_v<B>, int> = 0>")
+        code.append("constexpr auto py_floordiv(A a, B b) {")
+        code.append("    long long x = a, y = b;")
+        code.append("    return static_cast<make_signed_t<decltype(a / b)>>(x / y - (x % y != 0 && (x < 0) != (y < 0)));")
+        code.append("}")
+        code.append("template <typename A, typename B, enable_if_t<is_integral_v<A> && is_integral_v<B>, int> = 0>")
+        code.append("constexpr auto py_mod(A a, B b) {")
+        code.append("    long long x = a, y = b, r = x % y;")
+        code.append("    return static_cast<make_signed_t<decltype(a % b)>>(r != 0 && (r < 0) != (y < 0) ? r + y : r);")
+        code.append("}")
+        code.append("inline double py_mod(double a, double b) {")
+        code.append("    double r = fmod(a, b);")
+        code.append("    return r != 0 && (r < 0) != (b < 0) ? r + b : r;")
+        code.append("}")
+        code.append("inline double py_floordiv(double a, double b) {")
+        code.append("    double q = (a - py_mod(a, b)) / b, floored = floor(q);")
+        code.append("    return q - floored > 0.5 ? floored + 1 : floored;")
+        code.append("}")
+        code.append("template <typename A, typename B>")
+        code.append("constexpr double py_truediv(A a, B b) { return static_cast<double>(a) / static_cast<double>(b); }")
+        code.append("")
+        return code
+
+    def generate_task_helpers(self):
+        """Generate the task depth bookkeeping of task groups, see generate_task_group()."""
+        code = []
+        code.append("// Number of task groups running on this thread, nested; a task starts inside its group")
+        code.append("inline thread_local int py_task_depth = 0;")
+        code.append("struct PyTaskScope {")
+        code.append("    int saved;")
+        code.append("    explicit PyTaskScope(int depth) : saved(py_task_depth) { py_task_depth = depth; }")
+        code.append("    ~PyTaskScope() { py_task_depth = saved; }")
+        code.append("};")
+        code.append("")
+        return code
+
+    def generate_string_helpers(self):
+        """Generate str() and a str.join() that allocates its result once."""
+        code = []
+        code.append("// str() of a value, spelled as Python spells it")
+        code.append("inline string py_str(const string& value) { return value; }")
+        code.append("inline string py_str(const char* value) { return value; }")
+        code.append("inline string py_str(bool value) { return value ? \"True\" : \"False\"; }")
+        code.append("template <typename T, enable_if_t<is_integral_v<T>, int> = 0>")
+        code.append("string py_str(T value) { return to_string(value); }")
+        code.append("inline string py_str(double value) {")
+        code.append("    // The shortest digits that read back as value, like repr()")
+        code.append("    char digits[32];")
+        code.append("    for (int precision = 1; precision <= 17; ++precision) {")
+        code.append("        snprintf(digits, sizeof digits, \"%.*g\", precision, value);")
+        code.append("        if (strtod(digits, nullptr) == value) break;")
+        code.append("    }")
+        code.append("    string out = digits;")
+        code.append("    if (out.find_first_of(\".ein\") == string::npos) out += \".0\";")
+        code.append("    return out;")
+        code.append("}")
+        code.append("")
+        code.append("// sep.join(items): the length of the result is summed first, so it is allocated once")
+        code.append("template <typename Items>")
+        code.append("string py_join(string_view sep, const Items& items) {")
+        code.append("    size_t size = 0, count = 0;")
+        code.append("    for (const auto& item : items) size += string_view(item).size(), ++count;")
+        code.append("    string out;")
+        code.append("    out.reserve(size + (count ? (count - 1) * sep.size() : 0));")
+        code.append("    bool first = true;")
+        code.append("    for (const auto& item : items) {")
+        code.append("        if (!first) out += sep;")
+        code.append("        out += string_view(item);")
+        code.append("        first = false;")
+        code.append("    }")
+        code.append("    return out;")
+        code.append("}")
+        code.append("inline string py_join(string_view sep, initializer_list<string_view> items) {")
+        code.append("    return py_join<initializer_list<string_view>>(sep, items);")
+        code.append("}")
+        code.append("")
+        return code
+
+    def generate_loop(self, loop, generate):
+        """Generate a loop, reserving room first in the containers it inserts a countable number of items into."""
+        code = self.reserve_growth(loop)
+        grown = grown_containers(loop.body, self.growth_target) - self.growing_containers
+        self.growing_containers |= grown
+        code.extend(self.instrument_loop(loop, generate))
+        self.growing_containers -= grown
+        return code
+
+    def growth_target(self, node):
+        """Name of the list, set or dict node inserts one element into, or of the string it appends to, if any."""
+        if isinstance(node, MethodCall) and isinstance(node.receiver, Variable):
+            type_ = self.variable_types.get(node.receiver.name, '')
+            if ((node.method == "append" and type_ in ('vector<int>', 'vector<string>')
+                 and node.receiver.name not in self.fixed_lists)
+                    or (node.method == "add" and is_set_type(type_))):
+                return node.receiver.name
+        elif isinstance(node, ListAssignment) and isinstance(node.list_expr, Variable):
+            if is_map_type(self.variable_types.get(node.list_expr.name, '')):
+                return node.list_expr.name
+        elif self.appended_strings(node) is not None:
+            return node.name.name if isinstance(node.name, Variable) else node.name
+        return None
+
+    def reserve_growth(self, loop):
+        code = []
+        indent = "    " * self.indent_level
+        for name, terms in append_counts(loop, self.growth_target).items():
+            # An enclosing loop growing the container would re-reserve on every iteration
+            if terms is None or name in self.growing_containers:
+                continue
+            width = 1
+            if self.variable_types.get(name) == 'string':
+                # Characters appended per append at least; the string may still grow past them
+                width = min(sum(map(self.text_width, self.appended_strings(node)))
+                            for node, _ in walk(loop.body) if self.growth_target(node) == name)
+                if width == 0:
+                    continue
+            self.uses_list_helpers = True
+            sums = []
+            for term in dict.fromkeys(terms):
+                lengths = []
+                for range_call in term:
+                    bounds = [range_call.start, range_call.end] + ([range_call.step] if range_call.step is not None else [])
+                    lengths.append(f"py_range_length({', '.join(self.generate_expression(bound) for bound in bounds)})")
+                multiplicity = terms.count(term) * width
+                sums.append(" * ".join(lengths + ([str(multiplicity)] if multiplicity > 1 else [])))
+            code.append(f"{indent}{name}.reserve({name}.size() + {' + '.join(sums)});")
+        return code
+
+    def text_width(self, expr):
+        """A lower bound on the length of the string expr."""
+        if isinstance(expr, String):
+            # An escape sequence such as \n is one character
+            return len(expr.value) - expr.value.count('\\')
+        if isinstance(expr, FormattedString):
+            return sum(self.text_width(part) for part in expr.parts if isinstance(part, String))
+        if isinstance(expr, FunctionCall) and expr.name == 'str':
+            # str() of a number or a bool is never empty
+            return int(self.infer_type(expr.args[0]) in ('int', 'double', 'bool'))
+        return 0
+
+    def generate_container_helpers(self, flat_map=None):
+        """Generate membership tests, dict.get(), dict/set printing and, if used, py_flat_map."""
+        code = []
+        if flat_map if flat_map is not None else self.flat_int_maps:
+            code.extend(self.generate_flat_map())
+        code.append("template <typename C, typename K>")
+        code.append("bool py_contains(const C& container, const K& key) { return container.find(key) != container.end(); }")
+        code.append("template <typename T, typename K>")
+        code.append("bool py_contains(const vector<T>& list, const K& key) { return find(list.begin(), list.end(), key) != list.end(); }")
+        code.append("template <typename T, size_t N, typename K>")
+        code.append("bool py_contains(const array<T, N>& list, const K& key) { return find(list.begin(), list.end(), key) != list.end(); }")
+        code.append("template <typename K>")
+        code.append("bool py_contains(const string& text, const K& part) { return text.find(part) != string::npos; }")
+        code.append("template <typename C, typename K, typename V>")
+        code.append("typename C::mapped_type py_get(const C& map, const K& key, const V& fallback) {")
+        code.append("    auto it = map.find(key);")
+        code.append("    return it != map.end() ? it->second : fallback;")
+        code.append("}")
+        code.append("template <typename K, typename V>")
+        code.append("ostream& operator<<(ostream& os, const unordered_map<K, V>& map) {")
+        code.append("    os << '{';")
+        code.append("    const char* separator = \"\";")
+        code.append("    for (const auto& [key, value] : map) {")
+        code.append("        os << separator << key << \": \" << value;")
+        code.append("        separator = \", \";")
+        code.append("    }")
+        code.append("    return os << '}';")
+        code.append("}")
+        code.append("template <typename K>")
+        code.append("ostream& operator<<(ostream& os, const unordered_set<K>& set) {")
+        code.append("    os << '{';")
+        code.append("    const char* separator = \"\";")
+        code.append("    for (const auto& key : set) {")
+        code.append("        os << separator << key;")
+        code.append("        separator = \", \";")
+        code.append("    }")
+        code.append("    return os << '}';")
+        code.append("}")
+        code.append("")
+        return code
+
+    def generate_flat_map(self):
+        """Generate py_flat_map, an open-addressing hash map for integer keys.
+
+        All entries live in one power-of-two slot array probed linearly from a
+        Fibonacci hash of the key, kept at most half full.
+        """
+        code = []
+        code.append("template <typename V>")
+        code.append("class py_flat_map {")
+        code.append("public:")
+        code.append("    using value_type = pair<long long, V>;")
+        code.append("")
+        code.append("    class iterator {")
+        code.append("    public:")
+        code.append("        iterator(py_flat_map* map, size_t index) : map(map), index(index) { skip(); }")
+        code.append("        value_type& operator*() const { return map->slots[index]; }")
+        code.append("        value_type* operator->() const { return &map->slots[index]; }")
+        code.append("        iterator& operator++() { ++index; skip(); return *this; }")
+        code.append("        bool operator==(const iterator& other) const { return index == other.index; }")
+        code.append("        bool operator!=(const iterator& other) const { return index != other.index; }")
+        code.append("    private:")
+        code.append("        void skip() { while (index < map->slots.size() && !map->used[index]) ++index; }")
+        code.append("        py_flat_map* map;")
+        code.append("        size_t index;")
+        code.append("    };")
+        code.append("")
+        code.append("    py_flat_map() { rehash(16); }")
+        code.append("    py_flat_map(initializer_list<value_type> items) : py_flat_map() {")
+        code.append("        reserve(items.size());")
+        code.append("        for (const value_type& item : items) (*this)[item.first] = item.second;")
+        code.append("    }")
+        code.append("")
+        code.append("    size_t size() const { return count; }")
+        code.append("    void reserve(size_t n) {")
+        code.append("        size_t capacity = slots.size();")
+        code.append("        while (capacity < 2 * n) capacity *= 2;")
+        code.append("        if (capacity != slots.size()) rehash(capacity);")
+        code.append("    }")
+        code.append("    iterator begin() { return iterator(this, 0); }")
+        code.append("    iterator end() { return iterator(this, slots.size()); }")
+        code.append("    bool contains(long long key) const { return used[probe(key)]; }")
+        code.append("    const V* lookup(long long key) const {")
+        code.append("        size_t i = probe(key);")
+        code.append("        return used[i] ? &slots[i].second : nullptr;")
+        code.append("    }")
+        code.append("    V& at(long long key) {")
+        code.append("        size_t i = probe(key);")
+        code.append("        if (!used[i]) throw out_of_range(\"KeyError: \" + to_string(key));")
+        code.append("        return slots[i].second;")
+        code.append("    }")
+        code.append("    V& operator[](long long key) {")
+        code.append("        size_t i = probe(key);")
+        code.append("        if (!used[i]) {")
+        code.append("            if (2 * (count + 1) > slots.size()) {")
+        code.append("                rehash(2 * slots.size());")
+        code.append("                i = probe(key);")
+        code.append("            }")
+        code.append("            used[i] = 1;")
+        code.append("            slots[i] = {key, V()};")
+        code.append("            ++count;")
+        code.append("        }")
+        code.append("        return slots[i].second;")
+        code.append("    }")
+        code.append("")
+        code.append("private:")
+        code.append("    size_t probe(long long key) const {")
+        code.append("        size_t mask = slots.size() - 1;")
+        code.append("        size_t i = (size_t)((unsigned long long)key * 0x9E3779B97F4A7C15ull >> shift);")
+        code.append("        while (used[i] && slots[i].first != key) i = (i + 1) & mask;")
+        code.append("        return i;")
+        code.append("    }")
+        code.append("    void rehash(size_t capacity) {")
+        code.append("        vector<value_type> old_slots(capacity);")
+        code.append("        vector<unsigned char> old_used(capacity);")
+        code.append("        old_slots.swap(slots);")
+        code.append("        old_used.swap(used);")
+        code.append("        shift = 64 - __builtin_ctzll(capacity);")
+        code.append("        for (size_t i = 0; i < old_slots.size(); ++i) {")
+        code.append("            if (old_used[i]) {")
+        code.append("                size_t j = probe(old_slots[i].first);")
+        code.append("                used[j] = 1;")
+        code.append("                slots[j] = std::move(old_slots[i]);")
+        code.append("            }")
+        code.append("        }")
+        code.append("    }")
+        code.append("")
+        code.append("    vector<value_type> slots;")
+        code.append("    vector<unsigned char> used;")
+        code.append("    size_t count = 0;")
+        code.append("    int shift = 64;")
+        code.append("};")
+        code.append("")
+        code.append("template <typename V, typename K>")
+        code.append("bool py_contains(const py_flat_map<V>& map, const K& key) { return map.contains(key); }")
+        code.append("template <typename V, typename K, typename D>")
+        code.append("V py_get(const py_flat_map<V>& map, const K& key, const D& fallback) {")
+        code.append("    const V* value = map.lookup(key);")
+        code.append("    return value ? *value : fallback;")
+        code.append("}")
+        code.append("")
+        return code
+
+    def container_type(self, expr):
+        """C++ type of a dict or set built by a literal or by dict()/set()."""
+        if isinstance(expr, Set) or (isinstance(expr, FunctionCall) and expr.name == 'set'):
+            elements = expr.elements if isinstance(expr, Set) else []
+            return f"unordered_set<{self.infer_type(elements[0]) if elements else 'int'}>"
+        key_type = self.infer_type(expr.keys[0]) if isinstance(expr, Dict) and expr.keys else 'int'
+        value_type = self.infer_type(expr.values[0]) if isinstance(expr, Dict) and expr.values else 'int'
+        if self.flat_int_maps and key_type == 'int':
+            return f"py_flat_map<{value_type}>"
+        return f"unordered_map<{key_type}, {value_type}>"
+
+    def generate_format_helpers(self):
+        """Generate the runtime used by f-strings outside of print()."""
+        code = []
+        code.append("#ifdef __cpp_lib_format")
+        code.append("#define PY_FORMAT(fmt, cfmt, ...) std::format(fmt, __VA_ARGS__)")
+        code.append("template <typename T> const T& py_arg(const T& value) { return value; }")
+        code.append("#else")
+        code.append("#define PY_FORMAT(fmt, cfmt, ...) py_snprintf(cfmt, __VA_ARGS__)")
+        code.append("template <typename T> long long py_arg(T value) { return value; }")
+        code.append("inline double py_arg(double value) { return value; }")
+        code.append("inline const char* py_arg(const char* value) { return value; }")
+        code.append("inline const char* py_arg(const string& value) { return value.c_str(); }")
+        code.append("template <typename... Args>")
+        code.append("string py_snprintf(const char* fmt, Args... args) {")
+        code.append("    string out(snprintf(nullptr, 0, fmt, args...), '\\0');")
+        code.append("    snprintf(out.data(), out.size() + 1, fmt, args...);")
+        code.append("    return out;")
+        code.append("}")
+        code.append("#endif")
+        code.append("inline const char* py_arg(bool value) { return value ? \"True\" : \"False\"; }")
+        code.append("")
+        return code
+
+    def return_type(self, func):
+        """Infer the C++ return type of a function from the values it returns.
+
+        The locals are typed from their assignments first, a name becoming double once
+        any of them assigns it a double; those types are kept in function_locals for
+        declaring the locals. Returned ints, bools and doubles are promoted to a common
+        type; other mixed types are an error.
+        """
+        facts = self.function_facts[func.name]
+        saved = self.variable_types, self.expression_types
+        self.variable_types = {param: 'vector<int>' if param == 'arr' else 'int' for param in func.params}
+        self.expression_types = None
+        try:
+            for node in facts.assignments:
+                name = node.name.name if isinstance(node.name, Variable) else node.name
+                if isinstance(node.value, List):
+                    self.variable_types[name] = 'vector<string>' if name in facts.text_lists else 'vector<int>'
+                elif self.variable_types.get(name) != 'double':
+                    self.variable_types[name] = self.infer_type(node.value)
+            types = set()
+            for value in facts.returned_values:
+                type_ = self.infer_type(value)
+                if type_.startswith('array<'):
+                    # Only lists that do not escape are fixed-size arrays; a returned one is a vector
+                    type_ = f"vector<{type_arguments(type_)[0]}>"
+                types.add(type_)
+            self.function_locals[func.name] = self.variable_types
+        finally:
+            self.variable_types, self.expression_types = saved
+        if not types:
+            return 'void'
+        if len(types) > 1 and types <= {'int', 'bool', 'double'}:
+            return 'double' if 'double' in types else 'int'
+        if len(types) > 1:
+            raise Exception(f"Function {func.name} returns values of different types: {', '.join(sorted(types))}")
+        return types.pop()
+
+    def bottom_up(self, expr, attribute, compute):
+        """Return compute(expr), having computed it for every subexpression of expr first.
+
+        The results are kept in the dict named by attribute while the outermost call
+        runs, so compute() finds those of the subexpressions it asks for there instead
+        of recursing, and deeply nested expressions do not hit the recursion limit.
+        """
+        cache = getattr(self, attribute)
+        if cache is None:
+            setattr(self, attribute, {})
+            try:
+                return self.bottom_up(expr, attribute, compute)
+            finally:
+                setattr(self, attribute, None)
+        if expr not in cache:
+            for node in post_order(expr):
+                if node not in cache:
+                    cache[node] = compute(node)
+                    # Only the parent reads these; kept, the code of a nested chain adds up quadratically
+                    for child in children(node):
+                        cache.pop(child, None)
+        return cache[expr]
+
+    def infer_type(self, expr):
+        """Best-effort C++ type of an expression; unknown values are assumed to be int."""
+        return self.bottom_up(expr, 'expression_types', self.infer_node_type)
+
+    def infer_node_type(self, expr):
+        if isinstance(expr, Float):
+            return 'double'
+        elif isinstance(expr, (String, FormattedString)):
+            return 'string'
+        elif isinstance(expr, Boolean):
+            return 'bool'
+        elif isinstance(expr, List):
+            return 'vector<int>'
+        elif isinstance(expr, (Dict, Set)):
+            return self.container_type(expr)
+        elif isinstance(expr, Variable):
+            return self.variable_types.get(expr.name, 'int')
+        elif isinstance(expr, ListAccess):
+            container = self.infer_type(expr.list_expr)
+            if is_map_type(container) or container == 'vector<string>':
+                return type_arguments(container)[-1]
+            return 'int'
+        elif isinstance(expr, MethodCall):
+            container = self.infer_type(expr.receiver)
+            if expr.method == 'get' and is_map_type(container):
+                return type_arguments(container)[-1]
+            if expr.method == 'join':
+                return 'string'
+            if expr.method == 'pop' and container == 'vector<string>':
+                return 'string'
+            return 'int'
+        elif isinstance(expr, UnaryOp):
+            return 'bool' if expr.operator == 'not' else self.infer_type(expr.operand)
+        elif isinstance(expr, BinaryOp):
+            if expr.op in ('==', '!=', '<', '>', '<=', '>=', 'and', 'or', 'in', 'not in'):
+                return 'bool'
+            types = (self.infer_type(expr.left), self.infer_type(expr.right))
+            if 'string' in types:
+                return 'string'
+            if 'double' in types or expr.op == '/':
+                return 'double'
+            return 'int'
+        elif isinstance(expr, FunctionCall):
+            if expr.name == 'str':
+                return 'string'
+            if expr.name in ('set', 'dict'):
+                return self.container_type(expr)
+            return self.function_types.get(expr.name, 'int')
+        return 'int'
     
     def generate_statement(self, statement):
         """Generate code for a statement."""
-        if isinstance(statement, list):
-            code = []
+        marker = self.line_marker(statement)
+        if isinstance(statement, list) and len(statement) > 1 and all(
+                isinstance(stmt, (Assignment, ListAssignment)) for stmt in statement):
+            return marker + self.generate_parallel_assignment(statement)
+        elif isinstance(statement, list):
+            code = list(marker)
             for stmt in statement:
                 if isinstance(stmt, FunctionDef):
                     # Skip nested function definitions
@@ -114,29 +1056,36 @@ class CodeGenerator:
                 code.extend(self.generate_statement(stmt))
             return code
         elif isinstance(statement, Print):
-            return self.generate_print(statement)
+            return marker + self.generate_print(statement)
         elif isinstance(statement, Assignment):
-            return self.generate_assignment(statement)
+            return marker + self.generate_assignment(statement)
         elif isinstance(statement, IfStatement):
-            return self.generate_if(statement)
+            return marker + self.generate_if(statement)
         elif isinstance(statement, WhileLoop):
-            return self.generate_while(statement)
+            return marker + self.generate_loop(statement, self.generate_while)
         elif isinstance(statement, ForLoop):
-            return self.generate_for(statement)
+            return marker + self.generate_loop(statement, self.generate_for)
         elif isinstance(statement, Return):
-            return self.generate_return(statement)
+            return marker + self.generate_return(statement)
         elif isinstance(statement, ListAssignment):
-            code = []
+            code = list(marker)
             indent = "    " * self.indent_level
-            if isinstance(statement.value, ListAccess):
-                # Handle swap operation
-                code.append(f"{indent}swap({self.generate_expression(statement.list_expr)}[{self.generate_expression(statement.index)}], {self.generate_expression(statement.value.list_expr)}[{self.generate_expression(statement.value.index)}]);")
+            container = self.infer_type(statement.list_expr)
+            value = statement.value
+            if (isinstance(value, BinaryOp) and isinstance(value.left, ListAccess)
+                    and value.left.index is statement.index
+                    and (value.op not in ('//', '%') or self.division_operator(value))):
+                # Augmented item assignment: a single lookup of the item, updated in place
+                operator = self.division_operator(value) if value.op in ('//', '%') else value.op
+                code.append(f"{indent}{self.generate_expression(value.left)} {operator}= {self.generate_expression(value.right)};")
+            elif is_map_type(container):
+                code.append(f"{indent}{self.generate_expression(statement.list_expr)}[{self.generate_expression(statement.index)}] = {self.generate_expression(value)};")
             else:
                 # Regular assignment
-                code.append(f"{indent}{self.generate_expression(statement.list_expr)}[{self.generate_expression(statement.index)}] = {self.generate_expression(statement.value)};")
+                code.append(f"{indent}{self.generate_subscript(statement.list_expr, statement.index)} = {self.generate_expression(statement.value)};")
             return code
         elif isinstance(statement, FunctionCall):
-            code = []
+            code = list(marker)
             indent = "    " * self.indent_level
             if statement.name == "len":
                 code.append(f"{indent}{self.generate_expression(statement.args[0])}.size();")
@@ -150,6 +1099,19 @@ class CodeGenerator:
                         args.append(self.generate_expression(arg))
                 code.append(f"{indent}{statement.name}({', '.join(args)});")
             return code
+        elif isinstance(statement, Algorithm):
+            return marker + ["    " * self.indent_level + f"{self.generate_expression(statement)};"]
+        elif isinstance(statement, TaskGroup):
+            return marker + self.generate_task_group(statement)
+        elif isinstance(statement, MethodCall):
+            indent = "    " * self.indent_level
+            if statement.method == "pop" and not statement.args:
+                # The popped value is unused, so no copy is needed
+                return marker + [f"{indent}{self.generate_expression(statement.receiver)}.pop_back();"]
+            return marker + [f"{indent}{self.generate_expression(statement)};"]
+        elif isinstance(statement, (Import, ImportFrom)):
+            # Imports are resolved by the module build, see modules.py
+            return []
         elif isinstance(statement, FunctionDef):
             # Skip function definitions in statement generation
             # They are handled in generate_program
@@ -157,23 +1119,83 @@ class CodeGenerator:
         else:
             raise Exception(f"Unknown statement type: {type(statement)}")
     
-    def generate_print(self, print_stmt):
-        """Generate code for a print statement."""
+    def generate_parallel_assignment(self, group):
+        """Generate a tuple assignment such as a, b = b, a + b.
+
+        Every value is computed before any target is assigned, as in Python; a crossed
+        pair of list items (arr[i], arr[j] = arr[j], arr[i]) becomes a single swap.
+        """
+        indent = "    " * self.indent_level
+        if len(group) == 2 and all(isinstance(stmt, ListAssignment) and isinstance(stmt.value, ListAccess)
+                                   for stmt in group):
+            targets = [self.generate_subscript(stmt.list_expr, stmt.index) for stmt in group]
+            values = [self.generate_subscript(stmt.value.list_expr, stmt.value.index) for stmt in group]
+            if targets == values[::-1]:
+                return [f"{indent}swap({targets[0]}, {targets[1]});"]
         code = []
+        temporaries = []
+        for stmt in group:
+            temporary = f"py_tmp{self.temporary_count}"
+            self.temporary_count += 1
+            code.append(f"{indent}auto {temporary} = {self.generate_expression(stmt.value)};")
+            self.variable_types[temporary] = self.infer_type(stmt.value)
+            temporaries.append(Variable(temporary))
+        for stmt, temporary in zip(group, temporaries):
+            if isinstance(stmt, Assignment):
+                code.extend(self.generate_assignment(Assignment(stmt.name, temporary)))
+            else:
+                code.extend(self.generate_statement(ListAssignment(stmt.list_expr, stmt.index, temporary)))
+        return code
+
+    def generate_print(self, print_stmt):
+        """Generate code for a print statement as a single buffered write."""
         indent = "    " * self.indent_level
-        
-        for expr in print_stmt.expressions:
+        # Python's print separates arguments with a space and ends with a newline.
+        # Adjacent literal pieces are merged so each print is one `cout <<` chain.
+        pieces = []
+        for i, expr in enumerate(print_stmt.expressions):
+            if i > 0:
+                pieces.append((True, " "))
             if isinstance(expr, String):
-                code.append(f"{indent}cout << {self.generate_expression(expr)};")
+                pieces.append((True, expr.value))
+            elif isinstance(expr, FormattedString):
+                # Interpolated values are written straight into the stream
+                for part in expr.parts:
+                    if isinstance(part, String):
+                        pieces.append((True, part.value))
+                    else:
+                        pieces.append(self.print_piece(part))
             elif isinstance(expr, List):
-                # Don't pass the list directly to print_array
-                code.append(f"{indent}print_array({self.generate_expression(expr)});")
+                pieces.append((False, f"array<int, {len(expr.elements)}>{self.generate_expression(expr)}"))
             else:
-                code.append(f"{indent}cout << {self.generate_expression(expr)};")
-            code.append(f"{indent}cout << \" \";")  # Add space between expressions
-        
-        code.append(f"{indent}cout << endl;")
-        return code
+                pieces.append(self.print_piece(expr))
+        pieces.append((True, "\\n"))
+
+        parts = []
+        for is_literal, text in pieces:
+            if is_literal and parts and parts[-1][0]:
+                parts[-1] = (True, parts[-1][1] + text)
+            else:
+                parts.append((is_literal, text))
+
+        operands = []
+        for is_literal, text in parts:
+            if not is_literal:
+                operands.append(text)
+            elif text == "\\n":
+                operands.append("'\\n'")
+            else:
+                operands.append(f'"{text}"')
+        return [f"{indent}cout << {' << '.join(operands)};"]
+
+    def print_piece(self, expr):
+        """The (is_literal, text) piece printing expr; bools print as True and False, like Python."""
+        if isinstance(expr, Boolean):
+            return True, str(expr.value)
+        code = self.generate_expression(expr)
+        if self.infer_type(expr) == 'bool':
+            return False, f'({code} ? "True" : "False")'
+        return False, code
     
     def generate_assignment(self, assignment):
         """Generate code for a variable assignment."""
@@ -184,27 +1206,77 @@ class CodeGenerator:
         if var_name not in self.variables:
             value = self.generate_expression(assignment.value)
             if isinstance(assignment.value, List):
-                code.append(f"{indent}vector<int> {var_name} = {value};")
+                code.append(f"{indent}{self.list_type(var_name)} {var_name} = {value};")
             elif isinstance(assignment.value, String):
                 code.append(f"{indent}string {var_name} = {value};")
-            elif isinstance(assignment.value, Float):
+            elif isinstance(assignment.value, Float) or (
+                    self.local_types.get(var_name) == 'double' and self.infer_type(assignment.value) != 'double'):
+                # A later assignment makes the name a float
                 code.append(f"{indent}double {var_name} = {value};")
             elif isinstance(assignment.value, Number):
                 code.append(f"{indent}int {var_name} = {value};")
+            elif isinstance(assignment.value, (Dict, Set)) or (
+                    isinstance(assignment.value, FunctionCall) and assignment.value.name in ('set', 'dict')):
+                # Initializer-list construction already sizes the table for the literal
+                self.uses_container_helpers = True
+                code.append(f"{indent}{self.container_type(assignment.value)} {var_name} = {value};")
             else:
                 code.append(f"{indent}auto {var_name} = {value};")
             self.variables.add(var_name)
+            self.variable_types[var_name] = self.infer_type(assignment.value)
+            if self.local_types.get(var_name) == 'double':
+                self.variable_types[var_name] = 'double'
+            if isinstance(assignment.value, List):
+                self.variable_types[var_name] = f"vector<{self.element_type(var_name)}>"
+        elif self.appended_strings(assignment) is not None:
+            # s = s + a + b appends in place instead of copying s, which is quadratic in a loop
+            for part in self.appended_strings(assignment):
+                code.append(f"{indent}{var_name} += {self.generate_expression(part)};")
         else:
             code.append(f"{indent}{var_name} = {self.generate_expression(assignment.value)};")
         
         return code
+
+    def concatenated(self, expr):
+        """The operands of a chain of string +, without the str() the parser puts around strings."""
+        parts = []
+        pending = [expr]
+        while pending:
+            node = pending.pop()
+            if (isinstance(node, FunctionCall) and node.name == 'str' and len(node.args) == 1
+                    and self.infer_type(node.args[0]) == 'string'):
+                pending.append(node.args[0])
+            elif isinstance(node, BinaryOp) and node.op == '+' and self.infer_type(node) == 'string':
+                pending.extend([node.right, node.left])
+            else:
+                parts.append(node)
+        return parts
+
+    def appended_strings(self, node):
+        """The parts a + b + ... when node is the assignment s = s + a + b + ... of a string s, else None."""
+        if not isinstance(node, Assignment):
+            return None
+        name = node.name.name if isinstance(node.name, Variable) else node.name
+        if name not in self.variables or self.variable_types.get(name) != 'string':
+            return None
+        first, *rest = self.concatenated(node.value)
+        if not rest or not isinstance(first, Variable) or first.name != name:
+            return None
+        if any(isinstance(child, Variable) and child.name == name for child, _ in walk(rest)):
+            return None
+        return rest
     
     def generate_if(self, if_stmt):
         """Generate code for an if statement."""
         code = []
         indent = "    " * self.indent_level
         
-        code.append(f"{indent}if ({self.generate_expression(if_stmt.condition)}) {{")
+        condition = self.generate_expression(if_stmt.condition)
+        if self.instrument:
+            site = self.profile_site('branch', 'if', if_stmt)
+            condition = f"py_profile_branch(py_profile_sites[{site}], {condition})"
+        then_hint, else_hint = self.branch_hints(if_stmt)
+        code.append(f"{indent}if ({condition}){then_hint} {{")
         self.indent_level += 1
         
         for statement in if_stmt.body:
@@ -214,7 +1286,7 @@ class CodeGenerator:
         code.append(f"{indent}}}")
         
         if if_stmt.else_body:
-            code.append(f"{indent}else {{")
+            code.append(f"{indent}else{else_hint} {{")
             self.indent_level += 1
             
             for statement in if_stmt.else_body:
@@ -225,6 +1297,17 @@ class CodeGenerator:
         
         return code
     
+    def branch_hints(self, if_stmt):
+        """Return the [[likely]]/[[unlikely]] attributes for the two arms of a profiled if statement."""
+        evaluations, taken = self.branch_profile.get((if_stmt.line, if_stmt.column), (0, 0))
+        if evaluations < BRANCH_HINT_MIN_SAMPLES:
+            return "", ""
+        if taken >= evaluations * BRANCH_HINT_RATIO:
+            return " [[likely]]", " [[unlikely]]"
+        if evaluations - taken >= evaluations * BRANCH_HINT_RATIO:
+            return " [[unlikely]]", " [[likely]]"
+        return "", ""
+
     def generate_while(self, while_stmt):
         """Generate code for a while loop."""
         code = []
@@ -242,7 +1325,20 @@ class CodeGenerator:
         return code
     
     def generate_for(self, for_stmt):
-        """Generate code for a for loop."""
+        """Generate code for a for loop, recording the lower bound of a range() loop variable for its body."""
+        outer_bounds = self.index_bounds
+        self.index_bounds = dict(outer_bounds)
+        self.index_bounds.pop(for_stmt.var_name, None)
+        if isinstance(for_stmt.iterable, RangeCall):
+            bound = range_lower_bound(for_stmt, outer_bounds)
+            if bound is not None:
+                self.index_bounds[for_stmt.var_name] = bound
+        try:
+            return self.generate_for_loop(for_stmt)
+        finally:
+            self.index_bounds = outer_bounds
+
+    def generate_for_loop(self, for_stmt):
         code = []
         indent = "    " * self.indent_level
         
@@ -276,17 +1372,75 @@ class CodeGenerator:
             self.indent_level -= 1
             code.append(f"{indent}}}")
         else:
-            # Handle other types of for loops
+            # Handle other types of for loops; iterating a dict yields its keys
             iterable = self.generate_expression(for_stmt.iterable)
-            code.append(f"{indent}for (auto {for_stmt.var_name} : {iterable}) {{")
+            iterable_type = self.infer_type(for_stmt.iterable)
+            if is_map_type(iterable_type):
+                code.append(f"{indent}for (const auto& [{for_stmt.var_name}, py_value] : {iterable}) {{")
+            elif iterable_type == 'vector<string>':
+                # Strings are not copied unless the body assigns the loop variable
+                item_type = 'string' if for_stmt.var_name in assigned_names(for_stmt.body) else 'const string&'
+                code.append(f"{indent}for ({item_type} {for_stmt.var_name} : {iterable}) {{")
+            else:
+                code.append(f"{indent}for (auto {for_stmt.var_name} : {iterable}) {{")
+            saved_type = self.variable_types.get(for_stmt.var_name)
+            if iterable_type == 'vector<string>':
+                self.variable_types[for_stmt.var_name] = 'string'
             self.indent_level += 1
             for statement in for_stmt.body:
                 code.extend(self.generate_statement(statement))
             self.indent_level -= 1
             code.append(f"{indent}}}")
+            if iterable_type == 'vector<string>':
+                if saved_type is None:
+                    del self.variable_types[for_stmt.var_name]
+                else:
+                    self.variable_types[for_stmt.var_name] = saved_type
         
         return code
     
+    def generate_task_group(self, group):
+        """Generate independent calls, all but the last as std::async tasks, see tasks.py.
+
+        The calls run in order instead when task_depth groups are already nested on
+        this thread, when a spawned call covers fewer than task_cutoff items, or when a
+        guard of the group fails. Each task starts inside its group, one level deeper.
+        """
+        self.uses_task_helpers = True
+        indent = "    " * self.indent_level
+        code = []
+        for stmt in group.statements:
+            if isinstance(stmt, Assignment) and stmt.name.name not in self.variables:
+                # Assigned in the tasks, so declared outside them
+                value_type = self.infer_type(stmt.value)
+                code.append(f"{indent}{value_type} {stmt.name.name};")
+                self.variables.add(stmt.name.name)
+                self.variable_types[stmt.name.name] = value_type
+        conditions = [f"py_task_depth < {self.task_depth}"]
+        conditions.extend(f"{self.generate_expression(size)} >= {self.task_cutoff}" for size in group.sizes if size is not None)
+        conditions.extend(f"{self.generate_expression(guard)} >= 0" for guard in group.guards)
+        code.append(f"{indent}if ({' && '.join(conditions)}) {{")
+        code.append(f"{indent}    int py_depth = py_task_depth + 1;")
+        self.indent_level += 2
+        for number, stmt in enumerate(group.statements[:-1]):
+            code.append(f"{indent}    auto py_future{number} = async(launch::async, [&, py_depth] {{")
+            code.append(f"{indent}        PyTaskScope py_scope(py_depth);")
+            code.extend(self.generate_statement(stmt))
+            code.append(f"{indent}    }});")
+        code.append(f"{indent}    {{")
+        code.append(f"{indent}        PyTaskScope py_scope(py_depth);")
+        code.extend(self.generate_statement(group.statements[-1]))
+        code.append(f"{indent}    }}")
+        self.indent_level -= 1
+        for number in range(len(group.statements) - 1):
+            code.append(f"{indent}    py_future{number}.get();")
+        code.append(f"{indent}}} else {{")
+        for stmt in group.statements:
+            code.extend(self.generate_statement(stmt))
+        self.indent_level -= 1
+        code.append(f"{indent}}}")
+        return code
+
     def generate_return(self, return_stmt):
         """Generate code for a return statement."""
         code = []
@@ -301,10 +1455,15 @@ class CodeGenerator:
     
     def generate_expression(self, expr):
         """Generate code for an expression."""
-        if isinstance(expr, Number):
+        return self.bottom_up(expr, 'expression_code', self.generate_node)
+
+    def generate_node(self, expr):
+        if isinstance(expr, (Number, Float)):
             return str(expr.value)
         elif isinstance(expr, String):
             return f'"{expr.value}"'
+        elif isinstance(expr, FormattedString):
+            return self.generate_formatted_string(expr)
         elif isinstance(expr, Boolean):
             return str(expr.value).lower()
         elif isinstance(expr, Variable):
@@ -312,20 +1471,61 @@ class CodeGenerator:
         elif isinstance(expr, BinaryOp):
             left = self.generate_expression(expr.left)
             right = self.generate_expression(expr.right)
+            if expr.op in ('in', 'not in'):
+                # One hash lookup (or linear scan for lists) per membership test
+                self.uses_container_helpers = True
+                if isinstance(expr.right, (Dict, Set)):
+                    right = f"{self.container_type(expr.right)}{right}"
+                elif isinstance(expr.right, List):
+                    right = f"array<int, {len(expr.right.elements)}>{right}"
+                negation = "!" if expr.op == 'not in' else ""
+                return f"{negation}py_contains({right}, {left})"
+            if expr.op in ('/', '//', '%'):
+                return self.generate_division(expr, left, right)
+            if expr.op == '+' and left.startswith('"') and self.infer_type(expr) == 'string':
+                # Two character array literals cannot be added
+                left = f"string({left})"
             return f"({left} {expr.op} {right})"
         elif isinstance(expr, UnaryOp):
             operand = self.generate_expression(expr.operand)
-            return f"{expr.op}{operand}"
+            if expr.operator == 'not':
+                return f"!{operand}"
+            if operand.startswith(('+', '-')):
+                # - -x must not become the decrement --x
+                operand = f"({operand})"
+            return f"{expr.operator}{operand}"
         elif isinstance(expr, List):
             elements = [self.generate_expression(e) for e in expr.elements]
             return f"{{{', '.join(elements)}}}"
+        elif isinstance(expr, Dict):
+            items = [f"{{{self.generate_expression(key)}, {self.generate_expression(value)}}}"
+                     for key, value in zip(expr.keys, expr.values)]
+            return f"{{{', '.join(items)}}}"
+        elif isinstance(expr, Set):
+            elements = [self.generate_expression(e) for e in expr.elements]
+            return f"{{{', '.join(elements)}}}"
         elif isinstance(expr, ListAccess):
-            list_expr = self.generate_expression(expr.list_expr)
-            index = self.generate_expression(expr.index)
-            return f"{list_expr}[{index}]"
+            if is_map_type(self.infer_type(expr.list_expr)):
+                # Like Python, reading a missing key is an error rather than an insertion
+                return f"{self.generate_expression(expr.list_expr)}.at({self.generate_expression(expr.index)})"
+            return self.generate_subscript(expr.list_expr, expr.index)
         elif isinstance(expr, FunctionCall):
             if expr.name == "len":
-                return f"{self.generate_expression(expr.args[0])}.size()"
+                return f"(long long){self.generate_expression(expr.args[0])}.size()"
+            if expr.name == "str" and len(expr.args) == 1:
+                if self.infer_type(expr.args[0]) == 'string':
+                    return self.generate_expression(expr.args[0])
+                self.uses_string_helpers = True
+                return f"py_str({self.generate_expression(expr.args[0])})"
+            folded = self.fold_call(expr)
+            if folded is not None:
+                return folded
+            if expr.name in ("set", "dict"):
+                self.uses_container_helpers = True
+                if expr.args:
+                    source = self.generate_expression(expr.args[0])
+                    return f"{self.container_type(expr)}({source}.begin(), {source}.end())"
+                return f"{self.container_type(expr)}()"
             # Generate arguments without brace initialization
             args = []
             for arg in expr.args:
@@ -335,35 +1535,177 @@ class CodeGenerator:
                     args.append(self.generate_expression(arg))
             return f"{expr.name}({', '.join(args)})"
         elif isinstance(expr, LenCall):
-            return f"{self.generate_expression(expr.arg)}.size()"
+            return f"(long long){self.generate_expression(expr.arg)}.size()"
+        elif isinstance(expr, MethodCall):
+            return self.generate_method_call(expr)
+        elif isinstance(expr, Algorithm):
+            target = self.generate_expression(expr.list_expr)
+            source = target if expr.source is None else self.generate_expression(expr.source)
+            function = None
+            if expr.expr is not None:
+                function = f"[&](int {expr.item}) {{ return {self.generate_expression(expr.expr)}; }}"
+            args = [self.generate_expression(arg) for arg in expr.args]
+            return idioms.algorithm_code(expr.name, expr.start, target, source, args, function)
         else:
             raise Exception(f"Unsupported expression type: {type(expr)}")
     
+    def generate_subscript(self, list_expr, index):
+        """Generate list[index] for the codegen mode.
+
+        Debug builds bounds-check with at() after normalizing negative indices. Release
+        builds index raw and only normalize indices not proven non-negative.
+        """
+        receiver = self.generate_expression(list_expr)
+        index_code = self.generate_expression(index)
+        if self.mode == "debug":
+            self.uses_list_helpers = True
+            return f"{receiver}.at(py_index({receiver}, {index_code}))"
+        bound = lower_bound(index, self.index_bounds)
+        if bound is not None and bound >= 0:
+            return f"{receiver}[{index_code}]"
+        self.uses_list_helpers = True
+        return f"{receiver}[py_index({receiver}, {index_code})]"
+
+    def division_operator(self, expr):
+        """The C++ operator computing the // or % BinaryOp expr as Python does, or None.
+
+        Python rounds towards negative infinity and C++ towards zero; the two agree for
+        ints when the left operand is proven non-negative and the right one positive.
+        """
+        if 'double' in (self.infer_type(expr.left), self.infer_type(expr.right)):
+            return None
+        left = lower_bound(expr.left, self.index_bounds)
+        right = lower_bound(expr.right, self.index_bounds)
+        if left is None or left < 0 or right is None or right < 1:
+            return None
+        return '/' if expr.op == '//' else '%'
+
+    def generate_division(self, expr, left, right):
+        """Generate /, // or %, using the py_ helpers unless the C++ operator gives Python's result."""
+        if expr.op == '/':
+            if 'double' in (self.infer_type(expr.left), self.infer_type(expr.right)):
+                return f"({left} / {right})"
+            self.uses_arithmetic_helpers = True
+            return f"py_truediv({left}, {right})"
+        operator = self.division_operator(expr)
+        if operator is not None:
+            return f"({left} {operator} {right})"
+        self.uses_arithmetic_helpers = True
+        return f"py_{'floordiv' if expr.op == '//' else 'mod'}({left}, {right})"
+
+    def generate_method_call(self, call):
+        """Generate code for the list methods append()/pop(), set add()/remove()/discard(), dict get() and str.join()."""
+        receiver = self.generate_expression(call.receiver)
+        args = [self.generate_expression(arg) for arg in call.args]
+        if call.method == "append" and len(args) == 1:
+            return f"{receiver}.push_back({args[0]})"
+        if call.method == "join" and len(args) == 1:
+            # A list literal becomes an initializer_list of string_views, so no vector is built
+            self.uses_string_helpers = True
+            return f"py_join({receiver}, {args[0]})"
+        container = self.infer_type(call.receiver)
+        if call.method == "pop" and len(args) <= 1 and not is_map_type(container):
+            self.uses_list_helpers = True
+            return f"py_pop({', '.join([receiver] + args)})"
+        if call.method == "get" and len(args) == 2:
+            # A single find() instead of a membership test followed by a lookup
+            self.uses_container_helpers = True
+            return f"py_get({receiver}, {args[0]}, {args[1]})"
+        if call.method == "add" and len(args) == 1:
+            return f"{receiver}.insert({args[0]})"
+        if call.method in ("remove", "discard") and len(args) == 1:
+            return f"{receiver}.erase({args[0]})"
+        raise Exception(f"Unsupported method call: {call.method}() with {len(args)} arguments")
+
+    def generate_formatted_string(self, fstring):
+        """Generate a single formatted write for an f-string used as a value.
+
+        Both a std::format and a printf-style format string are computed here, so
+        the generated code formats in one pass whichever library is available.
+        """
+        self.uses_format = True
+        fmt = ""
+        cfmt = ""
+        args = []
+        for part in fstring.parts:
+            if isinstance(part, String):
+                fmt += part.value.replace("{", "{{").replace("}", "}}")
+                cfmt += part.value.replace("%", "%%")
+                continue
+            value_type = self.infer_type(part)
+            if value_type.startswith('vector<'):
+                raise Exception("Lists cannot be interpolated into an f-string outside of print()")
+            fmt += "{}"
+            cfmt += {'double': '%g', 'string': '%s', 'bool': '%s'}.get(value_type, '%lld')
+            args.append(f"py_arg({self.generate_expression(part)})")
+        if not args:
+            return f'string("{"".join(part.value for part in fstring.parts)}")'
+        return f'PY_FORMAT("{fmt}", "{cfmt}", {", ".join(args)})'
+
     def generate_function(self, func):
         """Generate code for a function definition."""
-        params = []
-        for param in func.params:
-            if param == 'arr':
-                params.append('vector<int>& arr')
-            else:
-                params.append(f'int {param}')
-        return_type = 'int' if func.name == 'partition' else 'void'
-        code = [f'{return_type} {func.name}({", ".join(params)}) {{']
-        indent = "    "
-        if func.name == 'partition':
-            # Manually emit the correct logic for partition
-            code.append(f'{indent}auto pivot = arr[high];')
-            code.append(f'{indent}auto i = (low - 1);')
-            code.append(f'{indent}for (int j = low; j < high; j++) {{')
-            code.append(f'{indent*2}if ((arr[j] <= pivot)) {{')
-            code.append(f'{indent*3}i = (i + 1);')
-            code.append(f'{indent*3}swap(arr[i], arr[j]);')
-            code.append(f'{indent*2}}}')
-            code.append(f'{indent}}}')
-            code.append(f'{indent}swap(arr[i + 1], arr[high]);')
-            code.append(f'{indent}return (i + 1);')
+        template, params = self.generate_signature(func)
+        return_type = self.function_types[func.name]
+        self.local_types = self.function_locals[func.name]
+        self.fixed_lists = self.list_analysis.fixed_lists(func, self.function_facts[func.name].nodes)
+        self.text_lists = self.function_facts[func.name].text_lists
+        self.constants = constant_names(func, self.function_facts[func.name].nodes)
+        self.variables = set(func.params)
+        self.variable_types = {param: 'vector<int>' if param == 'arr' else 'int' for param in func.params}
+        code = self.line_marker(func)
+        code.append(f'{template}{self.specifiers(func)}{return_type} {func.name}({params}) {{')
+        if self.instrument:
+            code.append(f'    PyProfileScope py_scope(py_profile_sites[{self.profile_site("function", func.name, func)}]);')
+        if self.task_analysis is not None:
+            # Task groups are emitted from the AST; the IR has no threads
+            func = self.task_analysis.rewrite(func)
+        func = self.recognize_idioms(func)
+        body = self.generate_ir_body(func)
+        if body is not None:
+            code.extend(body)
         else:
+            # The body is indented one level, like the IR emission and main
+            self.indent_level = 1
             for stmt in func.body:
                 code.extend(self.generate_statement(stmt))
+            self.indent_level = 0
         code.append('}')
-        return '\n'.join(code)
\ No newline at end of file
+        code.append(f"{LINE_MARKER}end")
+        return '\n'.join(code)
+
+    def recognize_idioms(self, func):
+        """func with the loops standard algorithms implement replaced by them, see idioms.py."""
+        if self.instrument:
+            # The profile counts the iterations of every loop
+            return func
+        return idioms.rewrite(func, sort=self.std_sort, checked=self.mode == "debug")
+
+    def generate_ir_body(self, func):
+        """The body of func emitted from its optimized IR, or None when the IR cannot express it.
+
+        Instrumented builds keep the AST emission, which places the profile counters.
+        """
+        if not self.use_ir or self.instrument:
+            return None
+        try:
+            function = ir.lower_function(self, func)
+        except ir.Unsupported:
+            return None
+        self.merge_pass_timings(self.pass_manager.run(function))
+        return ir.emit_body(self, function)
+
+# The module-wide generator and function definitions of a codegen worker process
+worker_generator = None
+worker_functions = None
+
+def start_worker(options, encoded_functions, single_unit):
+    """Pool initializer: rebuild the module-wide state of the parent's CodeGenerator."""
+    global worker_generator, worker_functions
+    worker_generator = CodeGenerator(**options)
+    worker_generator.start_source_map()
+    worker_functions = worker_generator.collect_functions(ast_format.loads(encoded_functions), single_unit)
+
+def generate_in_worker(index):
+    """Worker entry point: the code of the function at index and the runtime helpers it needs."""
+    return worker_generator.generate_isolated(worker_functions[index])
+
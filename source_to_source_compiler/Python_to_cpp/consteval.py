@@ -0,0 +1,213 @@
+"""Transpile-time evaluation of pure functions called with constant arguments."""
+from ast_nodes import (
+    Number, Boolean, Variable, BinaryOp, UnaryOp, Assignment, IfStatement, WhileLoop,
+    ForLoop, RangeCall, Return, FunctionCall
+)
+from analysis import walk
+
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+# Operators on ints the evaluator reproduces exactly; '/' is left out because it yields a double
+PURE_OPERATORS = {'+', '-', '*', '//', '%', '==', '!=', '<', '>', '<=', '>=', 'and', 'or'}
+
+class NotConstant(Exception):
+    """The call cannot be folded: it is not pure, overflows, or exceeds the step budget."""
+
+def is_pure_expression(expr, pure_functions):
+    for node, _ in walk(expr):
+        if isinstance(node, (Number, Boolean, Variable, UnaryOp)):
+            continue
+        if isinstance(node, BinaryOp) and node.op in PURE_OPERATORS:
+            continue
+        if isinstance(node, FunctionCall) and node.name in pure_functions:
+            continue
+        return False
+    return True
+
+def is_pure_body(body, pure_functions):
+    for stmt in body:
+        if isinstance(stmt, list):
+            # Tuple assignment to locals
+            if not all(isinstance(item, Assignment) for item in stmt) or not is_pure_body(stmt, pure_functions):
+                return False
+        elif isinstance(stmt, Assignment):
+            if not (isinstance(stmt.name, Variable) and is_pure_expression(stmt.value, pure_functions)):
+                return False
+        elif isinstance(stmt, Return):
+            if stmt.value is None or not is_pure_expression(stmt.value, pure_functions):
+                return False
+        elif isinstance(stmt, IfStatement):
+            if not (is_pure_expression(stmt.condition, pure_functions) and is_pure_body(stmt.body, pure_functions)
+                    and is_pure_body(stmt.else_body or [], pure_functions)):
+                return False
+        elif isinstance(stmt, WhileLoop):
+            if not (is_pure_expression(stmt.condition, pure_functions) and is_pure_body(stmt.body, pure_functions)):
+                return False
+        elif isinstance(stmt, ForLoop):
+            bounds = [stmt.iterable.start, stmt.iterable.end, stmt.iterable.step] if isinstance(stmt.iterable, RangeCall) else [None]
+            if not (isinstance(stmt.iterable, RangeCall)
+                    and all(bound is None or is_pure_expression(bound, pure_functions) for bound in bounds)
+                    and is_pure_body(stmt.body, pure_functions)):
+                return False
+        else:
+            return False
+    return True
+
+def pure_functions(function_defs, return_types):
+    """Names of the functions computing an int from int parameters without side effects.
+
+    Such a function only assigns locals, branches, loops over range() and calls other
+    pure functions; its result depends on nothing but its arguments.
+    """
+    # Start from every candidate and drop the impure ones until nothing changes, so
+    # (mutually) recursive functions stay pure
+    pure = {func.name for func in function_defs
+            if func.name != 'main' and 'arr' not in func.params and return_types.get(func.name) == 'int'}
+    functions = {func.name: func for func in function_defs}
+    changed = True
+    while changed:
+        changed = False
+        for name in sorted(pure):
+            if not is_pure_body(functions[name].body, pure):
+                pure.discard(name)
+                changed = True
+    return pure
+
+def constant_names(func, nodes=None):
+    """Locals of func assigned exactly once, to an integer literal (nodes: the walk of its body)."""
+    assignments = {}
+    for node, _ in nodes if nodes is not None else walk(func.body):
+        if isinstance(node, Assignment):
+            name = node.name.name if isinstance(node.name, Variable) else node.name
+            assignments.setdefault(name, []).append(node)
+        elif isinstance(node, ForLoop):
+            assignments.setdefault(node.var_name, []).append(node)
+    return {
+        name: nodes[0].value.value
+        for name, nodes in assignments.items()
+        if len(nodes) == 1 and isinstance(nodes[0], Assignment) and name not in func.params
+        and isinstance(nodes[0].value, Number)
+    }
+
+class ReturnValue(Exception):
+    """Unwinds the evaluation of a function body to its return statement."""
+    def __init__(self, value):
+        self.value = value
+
+class ConstEvaluator:
+    """Evaluates calls of pure functions with the semantics of the generated C++ code.
+
+    Every evaluated node costs one step; a call that needs more than budget steps,
+    overflows a C++ int or recurses too deeply is not constant. Results are memoized,
+    which is sound because the functions are pure.
+    """
+
+    def __init__(self, function_defs, pure, budget):
+        self.functions = {func.name: func for func in function_defs if func.name in pure}
+        self.budget = budget
+        self.steps = 0
+        self.memo = {}
+
+    def call(self, name, args):
+        """Return the value of name(*args), or raise NotConstant."""
+        self.steps = 0
+        try:
+            return self.invoke(name, args)
+        except RecursionError:
+            raise NotConstant(f"{name} recurses too deeply")
+
+    def invoke(self, name, args):
+        key = (name, tuple(args))
+        if key in self.memo:
+            return self.memo[key]
+        func = self.functions[name]
+        if len(args) != len(func.params):
+            raise NotConstant(f"{name} takes {len(func.params)} arguments")
+        frame = dict(zip(func.params, args))
+        try:
+            self.execute(func.body, frame)
+        except ReturnValue as result:
+            self.memo[key] = result.value
+            return result.value
+        raise NotConstant(f"{name} ends without returning a value")
+
+    def step(self):
+        self.steps += 1
+        if self.steps > self.budget:
+            raise NotConstant("step budget exceeded")
+
+    def execute(self, body, frame):
+        for stmt in body:
+            self.step()
+            if isinstance(stmt, list):
+                # Tuple assignment: every value is computed before any name is assigned
+                values = [self.evaluate(assignment.value, frame) for assignment in stmt]
+                for assignment, value in zip(stmt, values):
+                    frame[assignment.name.name] = value
+            elif isinstance(stmt, Assignment):
+                frame[stmt.name.name] = self.evaluate(stmt.value, frame)
+            elif isinstance(stmt, Return):
+                raise ReturnValue(self.evaluate(stmt.value, frame))
+            elif isinstance(stmt, IfStatement):
+                if self.evaluate(stmt.condition, frame):
+                    self.execute(stmt.body, frame)
+                elif stmt.else_body:
+                    self.execute(stmt.else_body, frame)
+            elif isinstance(stmt, WhileLoop):
+                while self.evaluate(stmt.condition, frame):
+                    self.step()
+                    self.execute(stmt.body, frame)
+            elif isinstance(stmt, ForLoop):
+                start = self.evaluate(stmt.iterable.start, frame)
+                end = self.evaluate(stmt.iterable.end, frame)
+                step = self.evaluate(stmt.iterable.step, frame) if stmt.iterable.step is not None else 1
+                # The generated loop is `for (int i = start; i < end; i += step)`
+                frame[stmt.var_name] = start
+                while frame[stmt.var_name] < end:
+                    self.step()
+                    self.execute(stmt.body, frame)
+                    frame[stmt.var_name] = self.check(frame[stmt.var_name] + step)
+
+    def check(self, value):
+        if isinstance(value, bool):
+            return value
+        if not INT_MIN <= value <= INT_MAX:
+            raise NotConstant("int overflow")
+        return value
+
+    def evaluate(self, expr, frame):
+        self.step()
+        if isinstance(expr, (Number, Boolean)):
+            return expr.value
+        if isinstance(expr, Variable):
+            if expr.name not in frame:
+                raise NotConstant(f"{expr.name} is not a local")
+            return frame[expr.name]
+        if isinstance(expr, UnaryOp):
+            value = self.evaluate(expr.operand, frame)
+            if expr.operator == 'not':
+                return not value
+            return self.check(-value if expr.operator == '-' else value)
+        if isinstance(expr, FunctionCall):
+            return self.invoke(expr.name, [self.evaluate(arg, frame) for arg in expr.args])
+        op = expr.op
+        if op == 'and':
+            return bool(self.evaluate(expr.left, frame)) and bool(self.evaluate(expr.right, frame))
+        if op == 'or':
+            return bool(self.evaluate(expr.left, frame)) or bool(self.evaluate(expr.right, frame))
+        left = self.evaluate(expr.left, frame)
+        right = self.evaluate(expr.right, frame)
+        if op == '+':
+            return self.check(left + right)
+        if op == '-':
+            return self.check(left - right)
+        if op == '*':
+            return self.check(left * right)
+        if op in ('//', '%'):
+            if right == 0:
+                raise NotConstant("division by zero")
+            # The generated code rounds like Python, see CodeGenerator.generate_division()
+            return self.check(left // right if op == '//' else left % right)
+        return {'==': left == right, '!=': left != right, '<': left < right,
+                '>': left > right, '<=': left <= right, '>=': left >= right}[op]
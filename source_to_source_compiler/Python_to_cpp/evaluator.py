@@ -0,0 +1,421 @@
+"""Reference evaluator running the AST directly, with Python semantics.
+
+Every node is compiled once into a nested Python closure, so running a program does
+no isinstance dispatch: an expression becomes a function of the current frame that
+returns its value, and a statement becomes a function of the frame that returns
+True when it executed a return. Function locals live in a list indexed by slots
+assigned at compile time; module-level names live in a dict, like CPython globals.
+
+The evaluator is the quick way to check what a program means without compiling C++,
+e.g. to compare the output of a transformed AST with the original:
+
+    output = io.StringIO()
+    Evaluator(program, output).run()
+"""
+import operator
+import sys
+
+from ast_nodes import (
+    Number, Float, String, FormattedString, Boolean, Variable, BinaryOp, UnaryOp, Assignment,
+    Print, IfStatement, WhileLoop, ForLoop, RangeCall, FunctionDef, FunctionCall, Return,
+    Import, ImportFrom, List, Dict, Set, ListAccess, ListAssignment, MethodCall, LenCall
+)
+from analysis import assigned_names
+
+BINARY_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': operator.floordiv, '%': operator.mod,
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '>': operator.gt,
+    '<=': operator.le, '>=': operator.ge,
+    'in': lambda item, container: item in container,
+    'not in': lambda item, container: item not in container,
+}
+
+BUILTINS = {function.__name__: function for function in (
+    len, str, int, float, bool, abs, min, max, sum, sorted, list, dict, set, range, round
+)}
+
+# Value of a local that has not been assigned yet
+UNBOUND = object()
+
+class Evaluator:
+    """Compiles a Program into closures and runs it, printing to output (default stdout)."""
+
+    def __init__(self, program, output=None):
+        self.output = output
+        self.globals = {}
+        self.statement_compilers = {
+            Assignment: self.compile_assignment,
+            ListAssignment: self.compile_item_assignment,
+            Print: self.compile_print,
+            IfStatement: self.compile_if,
+            WhileLoop: self.compile_while,
+            ForLoop: self.compile_for,
+            FunctionDef: self.compile_function_def,
+            Return: self.compile_return,
+            Import: self.compile_import,
+            ImportFrom: self.compile_import,
+        }
+        self.expression_compilers = {
+            Number: self.compile_constant,
+            Float: self.compile_constant,
+            String: self.compile_constant,
+            Boolean: self.compile_constant,
+            FormattedString: self.compile_formatted_string,
+            Variable: self.compile_variable,
+            BinaryOp: self.compile_binary_op,
+            UnaryOp: self.compile_unary_op,
+            FunctionCall: self.compile_call,
+            MethodCall: self.compile_method_call,
+            LenCall: self.compile_len,
+            RangeCall: self.compile_range,
+            List: self.compile_list,
+            Dict: self.compile_dict,
+            Set: self.compile_set,
+            ListAccess: self.compile_subscript,
+        }
+        self.body = self.compile_block(program.statements, None)
+
+    def run(self):
+        """Execute the program from a fresh module namespace."""
+        self.globals.clear()
+        self.globals['__name__'] = '__main__'
+        # Every Python-level call costs a few closure frames
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 20000))
+        try:
+            self.body([None])
+        finally:
+            sys.setrecursionlimit(limit)
+
+    # Statements; scope maps local names to frame slots, or is None at module level
+
+    def compile_block(self, statements, scope):
+        runs = tuple(self.compile_statement(stmt, scope) for stmt in statements)
+        if len(runs) == 1:
+            return runs[0]
+
+        def block(frame):
+            for run in runs:
+                if run(frame):
+                    return True
+            return False
+        return block
+
+    def compile_statement(self, stmt, scope):
+        if isinstance(stmt, list):
+            if len(stmt) > 1 and all(isinstance(item, (Assignment, ListAssignment)) for item in stmt):
+                return self.compile_parallel_assignment(stmt, scope)
+            return self.compile_block(stmt, scope)
+        compiler = self.statement_compilers.get(type(stmt))
+        if compiler is not None:
+            return compiler(stmt, scope)
+        # Expression statement, such as a call
+        value = self.compile_expression(stmt, scope)
+
+        def expression_statement(frame):
+            value(frame)
+        return expression_statement
+
+    def compile_store(self, target, scope):
+        """A function (frame, value) assigning value to the name target."""
+        name = target.name if isinstance(target, Variable) else target
+        if scope is None:
+            namespace = self.globals
+
+            def store_global(frame, value):
+                namespace[name] = value
+            return store_global
+        slot = scope[name]
+
+        def store_local(frame, value):
+            frame[slot] = value
+        return store_local
+
+    def compile_assignment(self, stmt, scope):
+        value = self.compile_expression(stmt.value, scope)
+        name = stmt.name.name if isinstance(stmt.name, Variable) else stmt.name
+        if scope is None:
+            namespace = self.globals
+
+            def assign_global(frame):
+                namespace[name] = value(frame)
+            return assign_global
+        slot = scope[name]
+
+        def assign_local(frame):
+            frame[slot] = value(frame)
+        return assign_local
+
+    def compile_item_assignment(self, stmt, scope):
+        container = self.compile_expression(stmt.list_expr, scope)
+        index = self.compile_expression(stmt.index, scope)
+        value = self.compile_expression(stmt.value, scope)
+
+        def assign_item(frame):
+            container(frame)[index(frame)] = value(frame)
+        return assign_item
+
+    def compile_parallel_assignment(self, group, scope):
+        """a, b = x, y: every value is computed before any target is assigned."""
+        values = tuple(self.compile_expression(stmt.value, scope) for stmt in group)
+        stores = []
+        for stmt in group:
+            if isinstance(stmt, Assignment):
+                stores.append(self.compile_store(stmt.name, scope))
+            else:
+                stores.append(self.compile_item_store(stmt, scope))
+        stores = tuple(stores)
+
+        def assign_parallel(frame):
+            results = [value(frame) for value in values]
+            for store, result in zip(stores, results):
+                store(frame, result)
+        return assign_parallel
+
+    def compile_item_store(self, stmt, scope):
+        container = self.compile_expression(stmt.list_expr, scope)
+        index = self.compile_expression(stmt.index, scope)
+
+        def store_item(frame, value):
+            container(frame)[index(frame)] = value
+        return store_item
+
+    def compile_print(self, stmt, scope):
+        values = tuple(self.compile_expression(expr, scope) for expr in stmt.expressions)
+
+        def print_(frame):
+            print(*[value(frame) for value in values], file=self.output)
+        return print_
+
+    def compile_if(self, stmt, scope):
+        condition = self.compile_expression(stmt.condition, scope)
+        body = self.compile_block(stmt.body, scope)
+        if not stmt.else_body:
+            def if_(frame):
+                if condition(frame):
+                    return body(frame)
+                return False
+            return if_
+        else_body = self.compile_block(stmt.else_body, scope)
+
+        def if_else(frame):
+            if condition(frame):
+                return body(frame)
+            return else_body(frame)
+        return if_else
+
+    def compile_while(self, stmt, scope):
+        condition = self.compile_expression(stmt.condition, scope)
+        body = self.compile_block(stmt.body, scope)
+
+        def while_(frame):
+            while condition(frame):
+                if body(frame):
+                    return True
+            return False
+        return while_
+
+    def compile_for(self, stmt, scope):
+        iterable = self.compile_expression(stmt.iterable, scope)
+        store = self.compile_store(stmt.var_name, scope)
+        body = self.compile_block(stmt.body, scope)
+
+        def for_(frame):
+            for item in iterable(frame):
+                store(frame, item)
+                if body(frame):
+                    return True
+            return False
+        return for_
+
+    def compile_function_def(self, stmt, scope):
+        if scope is not None:
+            raise Exception(f"Nested function '{stmt.name}' is not supported")
+        # Slot 0 holds the return value, then come the parameters and the other locals
+        names = list(stmt.params) + sorted(assigned_names(stmt.body) - set(stmt.params))
+        local_scope = {name: slot for slot, name in enumerate(names, 1)}
+        body = self.compile_block(stmt.body, local_scope)
+        name = stmt.name
+        arity = len(stmt.params)
+        unbound = [UNBOUND] * (len(names) - arity)
+
+        def function(*args):
+            if len(args) != arity:
+                raise TypeError(f"{name}() takes {arity} positional arguments but {len(args)} were given")
+            frame = [None, *args, *unbound]
+            body(frame)
+            return frame[0]
+        function.__name__ = name
+        namespace = self.globals
+
+        def define(frame):
+            namespace[name] = function
+        return define
+
+    def compile_return(self, stmt, scope):
+        if scope is None:
+            raise SyntaxError("'return' outside function")
+        if stmt.value is None:
+            def return_none(frame):
+                return True
+            return return_none
+        value = self.compile_expression(stmt.value, scope)
+
+        def return_(frame):
+            frame[0] = value(frame)
+            return True
+        return return_
+
+    def compile_import(self, stmt, scope):
+        raise Exception("The evaluator runs single-module programs; imports are not supported")
+
+    # Expressions
+
+    def compile_expression(self, expr, scope):
+        compiler = self.expression_compilers.get(type(expr))
+        if compiler is None:
+            raise Exception(f"Cannot evaluate {type(expr).__name__}")
+        return compiler(expr, scope)
+
+    def compile_constant(self, expr, scope):
+        constant = expr.value
+
+        def constant_(frame):
+            return constant
+        return constant_
+
+    def compile_formatted_string(self, expr, scope):
+        parts = tuple(self.compile_expression(part, scope) for part in expr.parts)
+
+        def formatted_string(frame):
+            return "".join([format(part(frame)) for part in parts])
+        return formatted_string
+
+    def compile_variable(self, expr, scope):
+        name = expr.name
+        if scope is not None and name in scope:
+            slot = scope[name]
+
+            def local(frame):
+                value = frame[slot]
+                if value is UNBOUND:
+                    raise UnboundLocalError(f"local variable '{name}' referenced before assignment")
+                return value
+            return local
+        namespace = self.globals
+
+        def global_(frame):
+            try:
+                return namespace[name]
+            except KeyError:
+                if name in BUILTINS:
+                    return BUILTINS[name]
+                raise NameError(f"name '{name}' is not defined") from None
+        return global_
+
+    def compile_binary_op(self, expr, scope):
+        left = self.compile_expression(expr.left, scope)
+        right = self.compile_expression(expr.right, scope)
+        if expr.op == 'and':
+            def and_(frame):
+                return left(frame) and right(frame)
+            return and_
+        if expr.op == 'or':
+            def or_(frame):
+                return left(frame) or right(frame)
+            return or_
+        if expr.op not in BINARY_OPERATORS:
+            raise Exception(f"Unsupported operator '{expr.op}'")
+        apply = BINARY_OPERATORS[expr.op]
+        # Specialize the common `name op constant` shape, e.g. n - 1 or i < 10
+        if isinstance(expr.right, (Number, Float)):
+            constant = expr.right.value
+
+            def binary_op_constant(frame):
+                return apply(left(frame), constant)
+            return binary_op_constant
+
+        def binary_op(frame):
+            return apply(left(frame), right(frame))
+        return binary_op
+
+    def compile_unary_op(self, expr, scope):
+        operand = self.compile_expression(expr.operand, scope)
+        if expr.operator == '-':
+            def negate(frame):
+                return -operand(frame)
+            return negate
+        if expr.operator == 'not':
+            def not_(frame):
+                return not operand(frame)
+            return not_
+        return operand
+
+    def compile_call(self, expr, scope):
+        args = tuple(self.compile_expression(arg, scope) for arg in expr.args)
+        function = self.compile_variable(Variable(expr.name), scope)
+        if len(args) == 1:
+            (arg,) = args
+
+            def call_1(frame):
+                return function(frame)(arg(frame))
+            return call_1
+
+        def call(frame):
+            return function(frame)(*[arg(frame) for arg in args])
+        return call
+
+    def compile_method_call(self, expr, scope):
+        receiver = self.compile_expression(expr.receiver, scope)
+        args = tuple(self.compile_expression(arg, scope) for arg in expr.args)
+        method = expr.method
+
+        def method_call(frame):
+            return getattr(receiver(frame), method)(*[arg(frame) for arg in args])
+        return method_call
+
+    def compile_len(self, expr, scope):
+        arg = self.compile_expression(expr.arg, scope)
+
+        def len_(frame):
+            return len(arg(frame))
+        return len_
+
+    def compile_range(self, expr, scope):
+        bounds = tuple(self.compile_expression(bound, scope)
+                       for bound in (expr.start, expr.end, expr.step) if bound is not None)
+
+        def range_(frame):
+            return range(*[bound(frame) for bound in bounds])
+        return range_
+
+    def compile_list(self, expr, scope):
+        elements = tuple(self.compile_expression(element, scope) for element in expr.elements)
+
+        def list_(frame):
+            return [element(frame) for element in elements]
+        return list_
+
+    def compile_dict(self, expr, scope):
+        items = tuple((self.compile_expression(key, scope), self.compile_expression(value, scope))
+                      for key, value in zip(expr.keys, expr.values))
+
+        def dict_(frame):
+            return {key(frame): value(frame) for key, value in items}
+        return dict_
+
+    def compile_set(self, expr, scope):
+        elements = tuple(self.compile_expression(element, scope) for element in expr.elements)
+
+        def set_(frame):
+            return {element(frame) for element in elements}
+        return set_
+
+    def compile_subscript(self, expr, scope):
+        container = self.compile_expression(expr.list_expr, scope)
+        index = self.compile_expression(expr.index, scope)
+
+        def subscript(frame):
+            return container(frame)[index(frame)]
+        return subscript
@@ -0,0 +1,349 @@
+"""Frontends that turn Python source into the AST of ast_nodes.py.
+
+    hand     the hand-written Lexer and Parser of lexer.py and parser.py
+    cpython  CPython's own parser, ast.parse(), with its tree converted node by node
+
+Both frontends produce the same node shapes, so everything after parsing is shared.
+The cpython frontend accepts exactly the Python grammar and locates every node at the
+start of the CPython node it came from, with 1-based lines and columns counted in
+characters, like the hand lexer. Constructs the code generator has no node for are
+rejected with a SyntaxError giving their position.
+"""
+import ast
+import copy
+import re
+
+from lexer import LEXER_BACKENDS
+from parser import Parser
+from ast_nodes import (
+    Assignment, Variable, BinaryOp, Number, Print, Float, String, FormattedString, Boolean,
+    UnaryOp, IfStatement, WhileLoop, ForLoop, RangeCall, FunctionDef, FunctionCall, Return,
+    List, Dict, Set, ListAccess, ListAssignment, MethodCall, Import, ImportFrom, Program
+)
+
+BINARY_OPERATORS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.FloorDiv: '//', ast.Mod: '%'}
+BOOLEAN_OPERATORS = {ast.And: 'and', ast.Or: 'or'}
+UNARY_OPERATORS = {ast.UAdd: '+', ast.USub: '-', ast.Not: 'not'}
+COMPARISON_OPERATORS = {
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+    ast.In: 'in', ast.NotIn: 'not in',
+}
+
+# C++ escapes for the characters a string literal cannot hold as they are
+CPP_ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t', '\r': '\\r'}
+
+def cpp_string(value):
+    """The body of a C++ string literal holding value, the text String nodes carry."""
+    def escape(match):
+        char = match.group()
+        # Octal escapes stop after three digits, unlike \x ones
+        return CPP_ESCAPES.get(char) or f"\\{ord(char):03o}"
+    return re.sub(r'[\\"\x00-\x1f\x7f]', escape, value)
+
+def is_text(node):
+    """Whether node is a string operand of +: a literal or a str() call."""
+    return isinstance(node, String) or (isinstance(node, FunctionCall) and node.name == 'str')
+
+class CPythonConverter:
+    """Converts a tree from ast.parse() into ast_nodes."""
+
+    def __init__(self, source):
+        # Lines as CPython counts them, to turn UTF-8 byte offsets into character columns
+        self.lines = re.split(r'\r\n|\r|\n', source)
+        self.statements = {
+            ast.FunctionDef: self.function_def,
+            ast.Return: self.return_statement,
+            ast.Assign: self.assign,
+            ast.AnnAssign: self.annotated_assign,
+            ast.AugAssign: self.augmented_assign,
+            ast.For: self.for_loop,
+            ast.While: self.while_loop,
+            ast.If: self.if_statement,
+            ast.Expr: self.expression_statement,
+            ast.Import: self.import_statement,
+            ast.ImportFrom: self.import_from,
+            ast.Pass: lambda node: None,
+        }
+
+    def position(self, node):
+        line = self.lines[node.lineno - 1]
+        if line.isascii():
+            return node.lineno, node.col_offset + 1
+        return node.lineno, len(line.encode('utf-8')[:node.col_offset].decode('utf-8')) + 1
+
+    def locate(self, converted, node):
+        """Record the position of the CPython node on converted (or each node of a list) unless already set."""
+        if isinstance(converted, list):
+            for item in converted:
+                self.locate(item, node)
+        elif converted.line is None:
+            converted.line, converted.column = self.position(node)
+        return converted
+
+    def unsupported(self, what, node):
+        line, column = self.position(node)
+        return SyntaxError(f"Unsupported {what} at line {line}, column {column}")
+
+    def convert(self, tree):
+        return Program(self.block(tree.body, top_level=True))
+
+    def block(self, statements, top_level=False):
+        converted = []
+        for node in statements:
+            if isinstance(node, ast.FunctionDef) and not top_level:
+                raise self.unsupported("nested function definition", node)
+            handler = self.statements.get(type(node))
+            if handler is None:
+                raise self.unsupported(f"statement '{type(node).__name__}'", node)
+            result = handler(node)
+            # None for statements that do nothing, such as pass and docstrings
+            if result is not None:
+                converted.append(self.locate(result, node))
+        return converted
+
+    def function_def(self, node):
+        args = node.args
+        if (node.decorator_list or args.posonlyargs or args.vararg or args.kwonlyargs
+                or args.kwarg or args.defaults):
+            raise self.unsupported(f"signature of function '{node.name}'", node)
+        return FunctionDef(node.name, [arg.arg for arg in args.args], self.block(node.body))
+
+    def return_statement(self, node):
+        return Return(None if node.value is None else self.expression(node.value))
+
+    def target(self, node, value):
+        """The assignment of value to the name or item node."""
+        if isinstance(node, ast.Name):
+            return Assignment(self.locate(Variable(node.id), node), value)
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+            return ListAssignment(self.locate(Variable(node.value.id), node.value), self.index(node), value)
+        raise self.unsupported("assignment target", node)
+
+    def assign(self, node):
+        if len(node.targets) != 1:
+            raise self.unsupported("chained assignment", node)
+        target = node.targets[0]
+        if not isinstance(target, ast.Tuple):
+            return self.target(target, self.expression(node.value))
+        # a, b = b, a + b: a list of assignments that take effect together
+        if not isinstance(node.value, ast.Tuple) or len(node.value.elts) != len(target.elts):
+            raise self.unsupported("unpacking assignment", node)
+        values = [self.expression(value) for value in node.value.elts]
+        return self.locate([self.target(name, value) for name, value in zip(target.elts, values)], node)
+
+    def annotated_assign(self, node):
+        if node.value is None:
+            return None
+        return self.target(node.target, self.expression(node.value))
+
+    def augmented_assign(self, node):
+        operator = BINARY_OPERATORS.get(type(node.op))
+        if operator is None:
+            raise self.unsupported(f"operator '{type(node.op).__name__}='", node)
+        value = self.expression(node.value)
+        if isinstance(node.target, ast.Name):
+            current = self.locate(Variable(node.target.id), node.target)
+            return self.target(node.target, self.locate(BinaryOp(current, operator, value), node))
+        # counts[k] += 1 reads and writes the same index node
+        assignment = self.target(node.target, None)
+        receiver = self.locate(Variable(assignment.list_expr.name), node.target.value)
+        item = self.locate(ListAccess(receiver, assignment.index), node.target)
+        assignment.value = self.locate(BinaryOp(item, operator, value), node)
+        return assignment
+
+    def for_loop(self, node):
+        if not isinstance(node.target, ast.Name) or node.orelse:
+            raise self.unsupported("for loop form", node)
+        iterable = node.iter
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id == 'range':
+            bounds = [self.expression(arg) for arg in self.arguments(iterable)]
+            if not 1 <= len(bounds) <= 3:
+                raise self.unsupported("range() call", iterable)
+            if len(bounds) == 1:
+                bounds.insert(0, self.locate(Number(0), iterable))
+            converted = self.locate(RangeCall(*bounds), iterable)
+        else:
+            converted = self.expression(iterable)
+        return ForLoop(node.target.id, converted, self.block(node.body))
+
+    def while_loop(self, node):
+        if node.orelse:
+            raise self.unsupported("while loop with else", node)
+        return WhileLoop(self.expression(node.test), self.block(node.body))
+
+    def if_statement(self, node):
+        # An elif is an if statement alone in the else body
+        else_body = self.block(node.orelse) if node.orelse else None
+        return IfStatement(self.expression(node.test), self.block(node.body), else_body)
+
+    def expression_statement(self, node):
+        value = node.value
+        if isinstance(value, ast.Constant):
+            # Docstrings and other bare literals do nothing
+            return None
+        if not isinstance(value, ast.Call):
+            raise self.unsupported("expression statement", node)
+        if isinstance(value.func, ast.Name) and value.func.id == 'print':
+            return Print([self.expression(arg) for arg in self.arguments(value)])
+        return self.expression(value)
+
+    def import_statement(self, node):
+        for alias in node.names:
+            if alias.asname or '.' in alias.name:
+                raise self.unsupported(f"import of '{alias.name}'", node)
+        return Import([alias.name for alias in node.names])
+
+    def import_from(self, node):
+        if node.level or '.' in (node.module or '.') or any(alias.asname or alias.name == '*' for alias in node.names):
+            raise self.unsupported("from import", node)
+        return ImportFrom(node.module, [alias.name for alias in node.names])
+
+    def arguments(self, call):
+        if call.keywords or any(isinstance(arg, ast.Starred) for arg in call.args):
+            raise self.unsupported("call with keyword or unpacked arguments", call)
+        return call.args
+
+    def index(self, subscript):
+        if isinstance(subscript.slice, (ast.Slice, ast.Tuple)):
+            raise self.unsupported("slice", subscript)
+        return self.expression(subscript.slice)
+
+    def operands(self, node):
+        """The CPython subexpressions of node converted before it, checking that node is supported."""
+        if isinstance(node, (ast.Constant, ast.Name)):
+            return []
+        if isinstance(node, ast.BinOp):
+            return [node.left, node.right]
+        if isinstance(node, (ast.BoolOp, ast.List, ast.Set)):
+            return node.values if isinstance(node, ast.BoolOp) else node.elts
+        if isinstance(node, ast.Compare):
+            if any(not isinstance(middle, (ast.Name, ast.Constant)) for middle in node.comparators[:-1]):
+                raise self.unsupported("chained comparison", node)
+            return [node.left] + node.comparators
+        if isinstance(node, ast.UnaryOp):
+            return [node.operand]
+        if isinstance(node, ast.Call):
+            args = list(self.arguments(node))
+            if isinstance(node.func, ast.Name):
+                if node.func.id in ('range', 'print'):
+                    raise self.unsupported(f"{node.func.id}() in an expression", node)
+                return args
+            if isinstance(node.func, ast.Attribute):
+                return [node.func.value] + args
+            raise self.unsupported("call of an expression", node)
+        if isinstance(node, ast.Subscript):
+            if isinstance(node.slice, (ast.Slice, ast.Tuple)):
+                raise self.unsupported("slice", node)
+            return [node.value, node.slice]
+        if isinstance(node, ast.Dict):
+            if None in node.keys:
+                raise self.unsupported("dict unpacking", node)
+            return node.keys + node.values
+        if isinstance(node, ast.JoinedStr):
+            return node.values
+        if isinstance(node, ast.FormattedValue):
+            if node.conversion != -1 or node.format_spec is not None:
+                raise self.unsupported("f-string conversion or format spec", node)
+            return [node.value]
+        raise self.unsupported(f"expression '{type(node).__name__}'", node)
+
+    def expression(self, node):
+        """Convert an expression.
+
+        An explicit stack instead of recursion, like Parser.parse_expression(), so long
+        operator chains are not limited by the recursion limit.
+        """
+        values = []
+        pending = [(node, None)]
+        while pending:
+            node, operands = pending.pop()
+            if operands is None:
+                operands = self.operands(node)
+                pending.append((node, operands))
+                pending.extend((operand, None) for operand in reversed(operands))
+                continue
+            split = len(values) - len(operands)
+            args = values[split:]
+            del values[split:]
+            values.append(self.locate(self.build(node, args), node))
+        return values[0]
+
+    def build(self, node, args):
+        """The ast_nodes node for the CPython node, given its converted operands."""
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, bool):
+                return Boolean(value)
+            if isinstance(value, int):
+                return Number(value)
+            if isinstance(value, float):
+                return Float(value)
+            if isinstance(value, str):
+                return String(cpp_string(value))
+            raise self.unsupported(f"constant {value!r}", node)
+        if isinstance(node, ast.Name):
+            return Variable(node.id)
+        if isinstance(node, ast.BinOp):
+            operator = BINARY_OPERATORS.get(type(node.op))
+            if operator is None:
+                raise self.unsupported(f"operator '{type(node.op).__name__}'", node)
+            left, right = args
+            if operator == '+' and (is_text(left) or is_text(right)):
+                # The same string concatenation rule as Parser.reduce()
+                left = left if is_text(left) else self.locate(FunctionCall('str', [left]), node.left)
+                right = right if is_text(right) else self.locate(FunctionCall('str', [right]), node.right)
+            return BinaryOp(left, operator, right)
+        if isinstance(node, ast.BoolOp):
+            result = args[0]
+            for value in args[1:]:
+                result = self.locate(BinaryOp(result, BOOLEAN_OPERATORS[type(node.op)], value), node)
+            return result
+        if isinstance(node, ast.Compare):
+            comparisons = []
+            for i, op in enumerate(node.ops):
+                operator = COMPARISON_OPERATORS.get(type(op))
+                if operator is None:
+                    raise self.unsupported(f"comparison '{type(op).__name__}'", node)
+                # The middle operands of a < b < c are names or literals, so copying them is safe
+                left = copy.deepcopy(args[i]) if i else args[i]
+                comparisons.append(self.locate(BinaryOp(left, operator, args[i + 1]), node))
+            result = comparisons[0]
+            for comparison in comparisons[1:]:
+                result = self.locate(BinaryOp(result, 'and', comparison), node)
+            return result
+        if isinstance(node, ast.UnaryOp):
+            operator = UNARY_OPERATORS.get(type(node.op))
+            if operator is None:
+                raise self.unsupported(f"operator '{type(node.op).__name__}'", node)
+            return UnaryOp(operator, args[0])
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name):
+                return FunctionCall(node.func.id, args)
+            return MethodCall(args[0], node.func.attr, args[1:])
+        if isinstance(node, ast.Subscript):
+            return ListAccess(args[0], args[1])
+        if isinstance(node, ast.List):
+            return List(args)
+        if isinstance(node, ast.Set):
+            return Set(args)
+        if isinstance(node, ast.Dict):
+            return Dict(args[:len(node.keys)], args[len(node.keys):])
+        if isinstance(node, ast.JoinedStr):
+            return FormattedString(args)
+        # A replacement field of an f-string is its expression
+        return args[0]
+
+def parse_hand(source, lexer="regex", filename="<unknown>"):
+    return Parser(LEXER_BACKENDS[lexer](source).tokenize()).parse()
+
+def parse_cpython(source, lexer=None, filename="<unknown>"):
+    return CPythonConverter(source).convert(ast.parse(source, filename))
+
+FRONTENDS = {
+    'hand': parse_hand,
+    'cpython': parse_cpython,
+}
+
+def parse_source(source, frontend="hand", lexer="regex", filename="<unknown>"):
+    """Parse source into a Program with a FRONTENDS entry; lexer only matters to the hand frontend."""
+    return FRONTENDS[frontend](source, lexer, filename)
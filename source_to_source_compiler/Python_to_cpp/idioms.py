@@ -0,0 +1,459 @@
+"""Recognition of loop idioms that C++ standard algorithms implement.
+
+rewrite() replaces loops over range(c, len(a)), for a list a and an int literal
+c >= 0, by Algorithm nodes (see ast_nodes.py):
+
+    for i in range(len(a)):                   i_found = find x in a, len(a) if absent
+        if a[i] == x:                   ->    if i_found < len(a):
+            <body ending with return>             <body, reading i_found for i>
+    s += a[i]                                 s = accumulate a[c:] from s
+    if a[i] < m: m = a[i]                     m = min(m, min_element of a[c:]); > for max
+    a[i] = x                                  fill a[c:] with x
+    b[i] = a[i]                               copy a[c:] to b[c:]
+    b[i] = f(a[i])                            transform a[c:] into b[c:] with f
+
+and, with sort=True, bubble and insertion sorts of a whole list by std::sort. A
+loop starting at c > 0 is guarded by len(a) > c. libstdc++ unrolls or vectorizes
+these loops, which the element-by-element Python loops keep the C++ compiler from
+doing as often. Only the parameter arr and names bound to a list literal are known
+to be lists here; in debug builds, copies and transforms between two lists stay
+loops, which bounds-check the list they do not iterate over.
+"""
+from ast_nodes import (
+    Node, Number, Float, Boolean, Variable, BinaryOp, Assignment, IfStatement, WhileLoop, ForLoop, RangeCall,
+    FunctionDef, FunctionCall, Return, List, ListAccess, ListAssignment, LenCall, Algorithm
+)
+from analysis import walk, is_pure, is_text
+
+# Algorithms that write their list; the others compute a value
+WRITING_ALGORITHMS = ('fill', 'copy', 'transform', 'sort')
+# Comparison of an item with the accumulator that makes the item the new minimum
+MIN_COMPARISONS = {'<': 'min_element', '<=': 'min_element', '>': 'max_element', '>=': 'max_element'}
+MIRRORED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+def same(first, second):
+    """Whether two expressions are structurally equal."""
+    pending = [(first, second)]
+    while pending:
+        first, second = pending.pop()
+        if type(first) is not type(second):
+            return False
+        if isinstance(first, Node):
+            fields, other = vars(first), vars(second)
+            pending.extend((value, other.get(name)) for name, value in fields.items()
+                           if name not in ('line', 'column'))
+        elif isinstance(first, list):
+            if len(first) != len(second):
+                return False
+            pending.extend(zip(first, second))
+        elif first != second:
+            return False
+    return True
+
+def names(node):
+    return {child.name for child, _ in walk(node) if isinstance(child, Variable)}
+
+def len_of(expr):
+    """The name of the list expr takes the len() of, if it does."""
+    if isinstance(expr, LenCall) and isinstance(expr.arg, Variable):
+        return expr.arg.name
+    if (isinstance(expr, FunctionCall) and expr.name == 'len' and len(expr.args) == 1
+            and isinstance(expr.args[0], Variable)):
+        return expr.args[0].name
+    return None
+
+def is_item(expr, name, index):
+    """Whether expr is name[index] for the loop variable index."""
+    return (isinstance(expr, ListAccess) and isinstance(expr.list_expr, Variable)
+            and expr.list_expr.name == name and isinstance(expr.index, Variable) and expr.index.name == index)
+
+def locate(node, origin):
+    node.line, node.column = origin.line, origin.column
+    return node
+
+def float_names(func, nodes=None):
+    """Names assigned a float literal or a true division somewhere in func (nodes: its walk)."""
+    found = set()
+    for node, _ in nodes if nodes is not None else walk(func.body):
+        if isinstance(node, Assignment) and isinstance(node.name, Variable):
+            if any(isinstance(child, Float) or (isinstance(child, BinaryOp) and child.op == '/')
+                   for child, _ in walk(node.value)):
+                found.add(node.name.name)
+    return found
+
+def text_names(func, nodes=None):
+    """Names assigned a string somewhere in func."""
+    return {node.name.name for node, _ in (nodes if nodes is not None else walk(func.body))
+            if isinstance(node, Assignment) and isinstance(node.name, Variable) and is_text(node.value)}
+
+def list_names(func, nodes=None):
+    """Names in func known to hold a list: arr, and names only ever bound to a list literal."""
+    bindings = {}
+    for node, _ in nodes if nodes is not None else walk(func.body):
+        if isinstance(node, Assignment):
+            name = node.name.name if isinstance(node.name, Variable) else node.name
+            bindings.setdefault(name, []).append(isinstance(node.value, List))
+        elif isinstance(node, ForLoop):
+            bindings.setdefault(node.var_name, []).append(False)
+    lists = {name for name, literals in bindings.items() if all(literals) and name not in func.params}
+    if 'arr' in func.params and 'arr' not in bindings:
+        lists.add('arr')
+    return lists
+
+class IdiomRewriter:
+    """Rewrites the idiomatic loops of one function, see rewrite()."""
+
+    def __init__(self, func, sort=False, checked=False):
+        self.func = func
+        self.sort = sort
+        self.checked = checked
+        # One walk of the body serves all the analyses below
+        nodes = list(walk(func.body))
+        self.lists = list_names(func, nodes)
+        self.floats = float_names(func, nodes)
+        # std::accumulate copies a string accumulator on every item before C++20
+        self.texts = text_names(func, nodes)
+        # Names given to the values of the rewritten code
+        self.fresh_names = set()
+        # name -> number of uses in func, to tell names local to a loop
+        self.uses = {}
+        for node, _ in nodes:
+            if isinstance(node, Variable):
+                self.uses[node.name] = self.uses.get(node.name, 0) + 1
+
+    def fresh(self, name):
+        base = name
+        count = 0
+        while name in self.uses or name in self.fresh_names:
+            count += 1
+            name = f"{base}{count}"
+        self.fresh_names.add(name)
+        return name
+
+    def rewrite_block(self, statements):
+        """statements with their loops rewritten, or statements itself when none is."""
+        result = []
+        changed = False
+        for position, stmt in enumerate(statements):
+            replacement = None
+            if isinstance(stmt, ForLoop):
+                previous = statements[position - 1] if position else None
+                replacement = self.sort_loop(stmt, previous) or self.loop(stmt)
+            if replacement is None:
+                replacement = [self.rewrite_nested(stmt)]
+            changed |= len(replacement) != 1 or replacement[0] is not stmt
+            result.extend(replacement)
+        return result if changed else statements
+
+    def rewrite_nested(self, stmt):
+        """stmt with the blocks nested in it rewritten."""
+        if isinstance(stmt, IfStatement):
+            body = self.rewrite_block(stmt.body)
+            else_body = self.rewrite_block(stmt.else_body) if stmt.else_body else stmt.else_body
+            if body is stmt.body and else_body is stmt.else_body:
+                return stmt
+            return locate(IfStatement(stmt.condition, body, else_body), stmt)
+        if isinstance(stmt, (WhileLoop, ForLoop)):
+            body = self.rewrite_block(stmt.body)
+            if body is stmt.body:
+                return stmt
+            if isinstance(stmt, WhileLoop):
+                return locate(WhileLoop(stmt.condition, body), stmt)
+            return locate(ForLoop(stmt.var_name, stmt.iterable, body), stmt)
+        return stmt
+
+    def range_of(self, loop):
+        """(list name, start) of a loop over range(start, len(list)), else None."""
+        iterable = loop.iterable
+        if not isinstance(iterable, RangeCall) or iterable.step is not None:
+            return None
+        name = len_of(iterable.end)
+        start = iterable.start
+        if name not in self.lists or not isinstance(start, Number) or type(start.value) is not int:
+            return None
+        if start.value < 0:
+            return None
+        return name, start.value
+
+    def loop(self, loop):
+        """The statements replacing a loop with a one-statement body, or None."""
+        found = self.range_of(loop)
+        if found is None or len(loop.body) != 1:
+            return None
+        name, start = found
+        index = loop.var_name
+        stmt = loop.body[0]
+        a = Variable(name)
+        if isinstance(stmt, IfStatement):
+            return self.search(loop, stmt, name, start) or self.extremum(loop, stmt, name, start)
+        if isinstance(stmt, Assignment) and isinstance(stmt.name, Variable):
+            total = stmt.name.name
+            value = stmt.value
+            if (total in self.lists or total in self.texts or total == index or not isinstance(value, BinaryOp) or value.op != '+'
+                    or not any(isinstance(side, Variable) and side.name == total for side in (value.left, value.right))):
+                return None
+            other = value.right if isinstance(value.left, Variable) and value.left.name == total else value.left
+            if not is_item(other, name, index):
+                return None
+            algorithm = Algorithm('accumulate', a, start, [Variable(total)])
+            return self.guarded(loop, name, start, Assignment(Variable(total), algorithm))
+        if isinstance(stmt, ListAssignment) and isinstance(stmt.list_expr, Variable):
+            target = stmt.list_expr.name
+            if (target not in self.lists or not isinstance(stmt.index, Variable)
+                    or stmt.index.name != index):
+                return None
+            value = stmt.value
+            if not (names(value) & {index, target}) and is_pure(value):
+                return self.guarded(loop, name, start, Algorithm('fill', Variable(target), start, [value]))
+            return self.transform(loop, stmt, name, start)
+        return None
+
+    def guarded(self, loop, name, start, stmt):
+        """stmt in place of loop, run only when the range of loop is not empty if it starts past 0."""
+        locate(stmt, loop)
+        if start == 0:
+            return [stmt]
+        guard = BinaryOp(LenCall(Variable(name)), '>', Number(start))
+        return [locate(IfStatement(guard, [stmt]), loop)]
+
+    def search(self, loop, stmt, name, start):
+        """for i in range(len(a)): if a[i] == x: ... return."""
+        condition = stmt.condition
+        index = loop.var_name
+        if start != 0 or stmt.else_body or not isinstance(condition, BinaryOp) or condition.op != '==':
+            return None
+        if not stmt.body or not isinstance(stmt.body[-1], Return):
+            return None
+        if is_item(condition.left, name, index):
+            value = condition.right
+        elif is_item(condition.right, name, index):
+            value = condition.left
+        else:
+            return None
+        if index in names(value) or not is_pure(value):
+            return None
+        if any(isinstance(node, ForLoop) and node.var_name == index for node, _ in walk(stmt.body)):
+            return None
+        # A name of its own, as the loop variable was scoped to the loop
+        result = self.fresh(f"{index}_found")
+        body = substitute(stmt.body, lambda node: Variable(result) if (
+            isinstance(node, Variable) and node.name == index) else None)
+        found = locate(Assignment(Variable(result), Algorithm('find', Variable(name), 0, [value])), loop)
+        test = BinaryOp(Variable(result), '<', LenCall(Variable(name)))
+        return [found, locate(IfStatement(test, body), stmt)]
+
+    def extremum(self, loop, stmt, name, start):
+        """for i in range(len(a)): if a[i] < m: m = a[i], and the max alike."""
+        condition = stmt.condition
+        index = loop.var_name
+        if stmt.else_body or len(stmt.body) != 1 or not isinstance(condition, BinaryOp):
+            return None
+        assignment = stmt.body[0]
+        if not (isinstance(assignment, Assignment) and isinstance(assignment.name, Variable)
+                and is_item(assignment.value, name, index)):
+            return None
+        best = assignment.name.name
+        if best in self.lists or best in self.floats or best == index:
+            return None
+        op = condition.op
+        if is_item(condition.right, name, index):
+            op = MIRRORED.get(op)
+            condition = BinaryOp(condition.right, op, condition.left)
+        if (op not in MIN_COMPARISONS or not is_item(condition.left, name, index)
+                or not isinstance(condition.right, Variable) or condition.right.name != best):
+            return None
+        algorithm = Algorithm(MIN_COMPARISONS[op], Variable(name), start, [Variable(best)])
+        # min_element() needs at least one item
+        guard = BinaryOp(LenCall(Variable(name)), '>', Number(start))
+        return [locate(IfStatement(guard, [locate(Assignment(Variable(best), algorithm), loop)]), loop)]
+
+    def transform(self, loop, stmt, name, start):
+        """for i in range(len(a)): b[i] = f(a[i]), with a copy for b[i] = a[i]."""
+        index = loop.var_name
+        target = stmt.list_expr.name
+        if self.checked and target != name:
+            return None
+        if is_item(stmt.value, name, index):
+            if target == name:
+                # a[i] = a[i]
+                return []
+            return self.guarded(loop, name, start, Algorithm('copy', Variable(target), start, [],
+                                                             source=Variable(name)))
+        items = 0
+        for node, parent in walk(stmt.value):
+            if is_item(node, name, index):
+                items += 1
+            elif isinstance(node, Variable) and not isinstance(parent, ListAccess) and node.name in (index, target, name):
+                return None
+            elif isinstance(node, ListAccess) and not is_item(node, name, index):
+                return None
+        if not items:
+            return None
+        item = self.fresh(f"{name}_item")
+        expr = substitute(stmt.value, lambda node: Variable(item) if is_item(node, name, index) else None)
+        if not is_pure(expr):
+            return None
+        return self.guarded(loop, name, start, Algorithm('transform', Variable(target), start, [],
+                                                         source=Variable(name), item=item, expr=expr))
+
+    def sort_loop(self, loop, previous):
+        """A bubble or insertion sort of a whole list, when sort is on."""
+        if not self.sort or not isinstance(loop.iterable, RangeCall) or loop.iterable.step is not None:
+            return None
+        iterable = loop.iterable
+        name = len_of(iterable.end)
+        if name is None and isinstance(iterable.end, Variable) and isinstance(previous, Assignment):
+            # n = len(a) right before the loop
+            if isinstance(previous.name, Variable) and previous.name.name == iterable.end.name:
+                name = len_of(previous.value)
+        if name not in self.lists or not isinstance(iterable.start, Number):
+            return None
+        descending = self.bubble_sort(loop, name)
+        if descending is None:
+            descending = self.insertion_sort(loop, name)
+        if descending is None:
+            return None
+        return [locate(Algorithm('sort', Variable(name), 0, [Boolean(descending)]), loop)]
+
+    def bubble_sort(self, loop, name):
+        """Whether the bubble sort loop sorts descending; None when loop is not one.
+
+            for i in range(n):
+                for j in range(0, n - i - 1):
+                    if a[j] > a[j + 1]:
+                        a[j], a[j + 1] = a[j + 1], a[j]
+        """
+        i = loop.var_name
+        if loop.iterable.start.value != 0 or len(loop.body) != 1 or not isinstance(loop.body[0], ForLoop):
+            return None
+        inner = loop.body[0]
+        j = inner.var_name
+        iterable = inner.iterable
+        end = BinaryOp(BinaryOp(loop.iterable.end, '-', Variable(i)), '-', Number(1))
+        if (not isinstance(iterable, RangeCall) or iterable.step is not None or not same(iterable.start, Number(0))
+                or not same(iterable.end, end) or len(inner.body) != 1):
+            return None
+        stmt = inner.body[0]
+        if not isinstance(stmt, IfStatement) or stmt.else_body or len(stmt.body) != 1:
+            return None
+        after = BinaryOp(Variable(j), '+', Number(1))
+        first = ListAccess(Variable(name), Variable(j))
+        second = ListAccess(Variable(name), after)
+        swap = [ListAssignment(Variable(name), Variable(j), second), ListAssignment(Variable(name), after, first)]
+        if not same(stmt.body[0], swap):
+            return None
+        return self.order(stmt.condition, first, second)
+
+    def insertion_sort(self, loop, name):
+        """Whether the insertion sort loop sorts descending; None when loop is not one.
+
+            for i in range(1, len(a)):
+                key = a[i]
+                j = i - 1
+                while j >= 0 and a[j] > key:
+                    a[j + 1] = a[j]
+                    j -= 1
+                a[j + 1] = key
+        """
+        i = loop.var_name
+        body = loop.body
+        if loop.iterable.start.value not in (0, 1) or len(body) != 4:
+            return None
+        if not (isinstance(body[0], Assignment) and isinstance(body[0].name, Variable)
+                and isinstance(body[1], Assignment) and isinstance(body[1].name, Variable)):
+            return None
+        key, j = body[0].name.name, body[1].name.name
+        if len({i, key, j, name}) != 4:
+            return None
+        # key and j must not be read after the loop, where the sort leaves them unbound
+        inside = {}
+        for node, _ in walk(loop):
+            if isinstance(node, Variable):
+                inside[node.name] = inside.get(node.name, 0) + 1
+        if any(self.uses.get(local) != inside.get(local) for local in (key, j)):
+            return None
+        item = ListAccess(Variable(name), Variable(j))
+        after = BinaryOp(Variable(j), '+', Number(1))
+        while_loop = body[2]
+        expected = [
+            Assignment(Variable(key), ListAccess(Variable(name), Variable(i))),
+            Assignment(Variable(j), BinaryOp(Variable(i), '-', Number(1))),
+        ]
+        if not same(body[:2], expected) or not same(body[3], ListAssignment(Variable(name), after, Variable(key))):
+            return None
+        if not isinstance(while_loop, WhileLoop) or not same(while_loop.body, [
+                ListAssignment(Variable(name), after, item),
+                Assignment(Variable(j), BinaryOp(Variable(j), '-', Number(1)))]):
+            return None
+        condition = while_loop.condition
+        if not (isinstance(condition, BinaryOp) and condition.op == 'and'
+                and same(condition.left, BinaryOp(Variable(j), '>=', Number(0)))):
+            return None
+        return self.order(condition.right, item, Variable(key))
+
+    def order(self, condition, first, second):
+        """Whether condition, which moves first after second, sorts descending; None otherwise."""
+        if not isinstance(condition, BinaryOp):
+            return None
+        if same(condition.left, second) and same(condition.right, first):
+            op = MIRRORED.get(condition.op)
+        elif same(condition.left, first) and same(condition.right, second):
+            op = condition.op
+        else:
+            return None
+        if op in ('>', '>='):
+            return False
+        if op in ('<', '<='):
+            return True
+        return None
+
+def substitute(node, replace):
+    """A copy of node (or a list of nodes) where replace(n) is not None for the nodes n it replaces."""
+    if isinstance(node, list):
+        return [substitute(element, replace) for element in node]
+    if not isinstance(node, Node):
+        return node
+    replacement = replace(node)
+    if replacement is not None:
+        return locate(replacement, node)
+    copy = node.__class__.__new__(node.__class__)
+    for field, value in vars(node).items():
+        setattr(copy, field, substitute(value, replace))
+    return copy
+
+def rewrite(func, sort=False, checked=False):
+    """func, or a copy of it whose idiomatic loops are Algorithm nodes.
+
+    With sort, recognized sorting loops become std::sort; checked (debug) builds
+    keep the loops that read one list over the range of another.
+    """
+    body = IdiomRewriter(func, sort, checked).rewrite_block(func.body)
+    if body is func.body:
+        return func
+    return locate(FunctionDef(func.name, func.params, body), func)
+
+def begin(list_code, start):
+    return f"{list_code}.begin()" if start == 0 else f"{list_code}.begin() + {start}"
+
+def algorithm_code(algorithm, start, list_code, source_code, args, function=None):
+    """C++ code of an algorithm, given the code of its lists and arguments.
+
+    function is the lambda of a transform; the range always ends with the source list.
+    """
+    first, last = begin(source_code, start), f"{source_code}.end()"
+    if algorithm == 'find':
+        return f"int(std::find({first}, {last}, {args[0]}) - {source_code}.begin())"
+    if algorithm == 'accumulate':
+        return f"std::accumulate({first}, {last}, {args[0]})"
+    if algorithm in ('min_element', 'max_element'):
+        return f"std::{algorithm[:3]}({args[0]}, *std::{algorithm}({first}, {last}))"
+    if algorithm == 'fill':
+        return f"std::fill({first}, {last}, {args[0]})"
+    if algorithm == 'copy':
+        return f"std::copy({first}, {last}, {begin(list_code, start)})"
+    if algorithm == 'transform':
+        return f"std::transform({first}, {last}, {begin(list_code, start)}, {function})"
+    if algorithm == 'sort':
+        order = ", std::greater<int>()" if args[0] == 'true' else ""
+        return f"std::sort({first}, {last}{order})"
+    raise Exception(f"Unknown algorithm: {algorithm}")
@@ -0,0 +1,1442 @@
+"""Typed, block-structured SSA IR of function bodies: lowering, passes and C++ emission.
+
+lower_function() turns a FunctionDef over ints, bools and lists into a Function.
+An Instruction is also the SSA value it defines. Control flow stays structured, as
+in MLIR's scf dialect: if, for and while instructions own their blocks, and a value
+that differs between the paths reaching a join is a merge value (a result of the
+if, or a value carried by the loop) fed by the yields of the blocks. `a and b` is
+an instruction owning the block that computes b, so b is only evaluated when
+Python would evaluate it.
+
+    const    attr=value                  param    attr=name
+    copy     v                           binary   attr=op  left, right
+    unary    attr=op  v                  logical  attr=and|or  left; region yields right
+    load     list, index                 len      list
+    list     elements...                 call     attr=name  args...
+    store    list, index, value          swap     list, i, j
+    return   [value]
+    algorithm  attr=name  list, source, start, args...; see idioms.py. The block
+             of a transform yields the new item, computed from its index (the item)
+    if       cond; the then and else blocks yield one value per result (a phi)
+    for      start, end, step, inits...; the body yields the next value of each
+             carried value; for.index is the loop variable
+    while    inits...; the header yields the condition, the body the next values
+
+Functions using anything else (strings, floats, dicts, method calls, print, ...)
+raise Unsupported and keep the AST-based emission of codegen.py. A PassManager runs
+PASSES over a Function, timing each pass, and emit_body() writes the result as C++.
+"""
+import math
+import operator
+import time
+from collections import ChainMap
+from types import SimpleNamespace
+
+from ast_nodes import (
+    Number, Boolean, Variable, BinaryOp, UnaryOp, Assignment, IfStatement, WhileLoop, ForLoop,
+    RangeCall, FunctionDef, FunctionCall, Return, Import, ImportFrom, List, ListAccess,
+    ListAssignment, LenCall, Algorithm
+)
+from analysis import assigned_names
+import idioms
+
+# Marks the Python position of the following generated lines, see CodeGenerator.resolve_line_markers()
+LINE_MARKER = "//@line "
+
+# Deepest nesting of blocks lowered; deeper functions keep the AST emission, whose
+# expressions need no recursion, while the passes below recurse once per block
+MAX_BLOCK_DEPTH = 100
+
+ARITHMETIC = ('+', '-', '*', '//', '%')
+# Python operators the C++ one rounds differently for negative operands -> py_ helper
+DIVISIONS = {'//': 'floordiv', '%': 'mod'}
+# Operators strength_reduction() folds on two int literals
+FOLDED = {'+': operator.add, '-': operator.sub, '*': operator.mul, '//': operator.floordiv, '%': operator.mod}
+COMPARISONS = ('<', '>', '<=', '>=', '==', '!=')
+COMMUTATIVE = ('+', '*', '==', '!=')
+LOOPS = ('for', 'while')
+# Instructions only executed for their effect; the others define a value
+STATEMENTS = ('store', 'swap', 'return', 'if', 'for', 'while')
+C_TYPES = {'int': 'int', 'bool': 'bool'}
+ZERO = {'int': '0', 'bool': 'false'}
+
+class Unsupported(Exception):
+    """The function uses something the IR does not model."""
+
+class Instruction:
+    """An IR instruction, which is also the SSA value it defines."""
+
+    def __init__(self, op, args=(), type='int', attr=None, name=None, position=None):
+        self.op = op
+        self.args = list(args)
+        # 'int', 'bool', 'list' or 'void'
+        self.type = type
+        self.attr = attr
+        # The Python variable the value was assigned to, which names it in C++
+        self.name = name
+        # (line, column) of the statement it was lowered from
+        self.position = position
+        # Blocks of an if, for, while or logical
+        self.regions = []
+        # Merge values of an if or a loop
+        self.results = []
+        # The loop variable of a for
+        self.index = None
+        # The if or loop a merge value or loop variable belongs to
+        self.owner = None
+
+    def __repr__(self):
+        return f"Instruction({self.op}, {self.attr!r}, {self.name!r})"
+
+class Block:
+    """A straight-line list of instructions, and the values it passes to its owner."""
+
+    def __init__(self):
+        self.instructions = []
+        self.yields = []
+        # Every path through the block returns
+        self.terminated = False
+
+class Function:
+    def __init__(self, name, params, body, return_type, pure_functions):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.return_type = return_type
+        # Functions whose calls have no side effects, see consteval.pure_functions()
+        self.pure_functions = pure_functions
+
+def loop_inits(loop):
+    """The initial values of the values a loop carries."""
+    return loop.args[3:] if loop.op == 'for' else loop.args
+
+def set_loop_inits(loop, inits):
+    loop.args = loop.args[:3] + inits if loop.op == 'for' else inits
+
+def blocks(block):
+    """Yield block and every block nested in it."""
+    pending = [block]
+    while pending:
+        block = pending.pop()
+        yield block
+        for instruction in block.instructions:
+            pending.extend(reversed(instruction.regions))
+
+def instructions(block):
+    """Yield the instructions of block and its nested blocks in program order."""
+    pending = [iter(block.instructions)]
+    while pending:
+        for instruction in pending[-1]:
+            yield instruction
+            if instruction.regions:
+                pending.append(iter([nested for region in instruction.regions
+                                     for nested in region.instructions]))
+                break
+        else:
+            pending.pop()
+
+def replace_uses(function, mapping):
+    """Make every use of a key of mapping use its value instead (following chains)."""
+    def find(value):
+        while value in mapping:
+            value = mapping[value]
+        return value
+    for block in blocks(function.body):
+        block.yields = [find(value) for value in block.yields]
+        for instruction in block.instructions:
+            instruction.args = [find(arg) for arg in instruction.args]
+
+def use_counts(function):
+    counts = {}
+    for block in blocks(function.body):
+        for instruction in block.instructions:
+            for arg in instruction.args:
+                counts[arg] = counts.get(arg, 0) + 1
+        for value in block.yields:
+            counts[value] = counts.get(value, 0) + 1
+    return counts
+
+def writes_memory(instruction, pure_functions):
+    """Whether instruction (not counting its blocks) may change a list."""
+    if instruction.op == 'algorithm':
+        return instruction.attr in idioms.WRITING_ALGORITHMS
+    return instruction.op in ('store', 'swap') or (
+        instruction.op == 'call' and instruction.attr not in pure_functions)
+
+def has_writes(instruction, pure_functions):
+    """Whether running instruction, blocks included, may change a list."""
+    if writes_memory(instruction, pure_functions):
+        return True
+    return any(writes_memory(nested, pure_functions)
+               for region in instruction.regions for nested in instructions(region))
+
+def constant(value):
+    """The integer a const instruction holds, or None."""
+    if value.op == 'const' and value.type == 'int':
+        return value.attr
+    return None
+
+def lower_bounds(function):
+    """Map the int values with a proven lower bound to it."""
+    bounds = {}
+    for instruction in instructions(function.body):
+        op = instruction.op
+        args = [bounds[arg] if arg in bounds else constant(arg) for arg in instruction.args]
+        if op == 'const':
+            bound = int(instruction.attr)
+        elif op in ('len', 'list'):
+            bound = 0
+        elif op == 'copy':
+            bound = args[0]
+        elif op == 'binary' and instruction.attr in COMPARISONS:
+            bound = 0
+        elif op == 'algorithm' and instruction.attr == 'find':
+            bound = args[2]
+        elif op == 'binary':
+            bound = binary_lower_bound(instruction.attr, args[0], args[1], constant(instruction.args[1]))
+        else:
+            bound = None
+        if op == 'for':
+            step = constant(instruction.args[2])
+            if step is not None and step > 0 and args[0] is not None:
+                bounds[instruction.index] = args[0]
+        if bound is not None:
+            bounds[instruction] = bound
+    return bounds
+
+def binary_lower_bound(op, left, right, right_constant):
+    if op == '-' and right_constant is not None:
+        return None if left is None else left - right_constant
+    if (op == '%' and right is not None and right > 0) or (op == '&' and right is not None and right >= 0):
+        # Python's % takes the sign of the divisor; masking with a non-negative value clears the sign
+        return 0
+    if left is None or right is None:
+        return None
+    if op == '+':
+        return left + right
+    if op == '*' and left >= 0 and right >= 0:
+        return left * right
+    if op == '//' and left >= 0 and right > 0:
+        return 0
+    if op == '<<' and left >= 0:
+        return left
+    return None
+
+class Lowering:
+    """Lowers one FunctionDef to a Function, raising Unsupported for what the IR lacks."""
+
+    def __init__(self, codegen, func):
+        self.codegen = codegen
+        self.func = func
+        # The block instructions are appended to
+        self.block = None
+        self.depth = 0
+        self.position = None
+
+    def lower(self):
+        func = self.func
+        params = []
+        env = {}
+        for name in func.params:
+            is_list = name == 'arr' or (self.codegen.list_analysis.templates
+                                        and self.codegen.is_container_param(func, name))
+            param = Instruction('param', type='list' if is_list else 'int', attr=name, name=name)
+            params.append(param)
+            env[name] = param
+        body = Block()
+        self.lower_block(func.body, body, env)
+        return Function(func.name, params, body, self.codegen.function_types[func.name], self.codegen.pure_functions)
+
+    def emit(self, op, args=(), type='int', attr=None, name=None):
+        instruction = Instruction(op, args, type, attr, name, self.position)
+        self.block.instructions.append(instruction)
+        return instruction
+
+    def lower_block(self, statements, block, env):
+        """Lower statements into block; env maps names to their values and is updated."""
+        self.depth += 1
+        if self.depth > MAX_BLOCK_DEPTH:
+            raise Unsupported("too deeply nested")
+        outer = self.block
+        self.block = block
+        for stmt in statements:
+            if block.terminated:
+                # Unreachable after a return
+                break
+            self.lower_statement(stmt, env)
+        self.block = outer
+        self.depth -= 1
+
+    def locate(self, node):
+        if getattr(node, 'line', None) is not None:
+            self.position = (node.line, node.column)
+
+    def lower_statement(self, stmt, env):
+        if isinstance(stmt, list):
+            if len(stmt) > 1 and all(isinstance(item, (Assignment, ListAssignment)) for item in stmt):
+                # Tuple assignment: every value is computed before any target is assigned
+                self.locate(stmt[0])
+                values = [self.lower_value(item.value, env) for item in stmt]
+                for item, value in zip(stmt, values):
+                    self.assign(item, value, env)
+            else:
+                for item in stmt:
+                    self.lower_statement(item, env)
+            return
+        self.locate(stmt)
+        if isinstance(stmt, Assignment):
+            self.assign(stmt, self.lower_value(stmt.value, env), env)
+        elif isinstance(stmt, ListAssignment):
+            value = stmt.value
+            if (isinstance(value, BinaryOp) and isinstance(value.left, ListAccess)
+                    and value.left.index is stmt.index and value.op in ARITHMETIC):
+                # Augmented item assignment: the index is evaluated once
+                target = self.list_operand(stmt.list_expr, env)
+                index = self.scalar(self.lower_expression(stmt.index, env))
+                item = self.emit('load', [target, index])
+                updated = self.emit('binary', [item, self.scalar(self.lower_expression(value.right, env))],
+                                    attr=value.op)
+                self.emit('store', [target, index, updated], 'void')
+            else:
+                self.assign(stmt, self.lower_value(value, env), env)
+        elif isinstance(stmt, FunctionCall):
+            if stmt.name != 'len':
+                self.lower_expression(stmt, env)
+        elif isinstance(stmt, Algorithm):
+            self.lower_expression(stmt, env)
+        elif isinstance(stmt, Return):
+            args = [] if stmt.value is None else [self.scalar(self.lower_expression(stmt.value, env))]
+            self.emit('return', args, 'void')
+            self.block.terminated = True
+        elif isinstance(stmt, IfStatement):
+            self.lower_if(stmt, env)
+        elif isinstance(stmt, (WhileLoop, ForLoop)):
+            self.lower_loop(stmt, env)
+        elif isinstance(stmt, (Variable, Number, Boolean, FunctionDef, Import, ImportFrom)):
+            # Bare names and literals do nothing; nested functions and imports are not generated
+            pass
+        else:
+            raise Unsupported(type(stmt).__name__)
+
+    def lower_value(self, expr, env):
+        """Lower the value of an assignment, which may also be a list literal."""
+        if isinstance(expr, List):
+            elements = [self.scalar(self.lower_expression(element, env)) for element in expr.elements]
+            return self.emit('list', elements, 'list')
+        return self.lower_expression(expr, env)
+
+    def assign(self, stmt, value, env):
+        if isinstance(stmt, ListAssignment):
+            target = self.list_operand(stmt.list_expr, env)
+            index = self.scalar(self.lower_expression(stmt.index, env))
+            self.emit('store', [target, index, self.scalar(value)], 'void')
+            return
+        name = stmt.name.name if isinstance(stmt.name, Variable) else stmt.name
+        if value.type == 'list':
+            # A list bound to a second name would be copied in C++
+            if value.op != 'list' or value.name is not None:
+                raise Unsupported("list alias")
+            value.name = name
+        elif value.type == 'void':
+            raise Unsupported("void value")
+        elif value.op == 'const':
+            pass
+        elif value.name is None and value.op not in ('param', 'phi', 'carried', 'index'):
+            value.name = name
+        else:
+            value = self.emit('copy', [value], value.type, name=name)
+        env[name] = value
+
+    def lower_if(self, stmt, env):
+        condition = self.scalar(self.lower_expression(stmt.condition, env))
+        self.locate(stmt)
+        instruction = self.emit('if', [condition], 'void')
+        then, orelse = Block(), Block()
+        instruction.regions = [then, orelse]
+        then_env, else_env = dict(env), dict(env)
+        self.lower_block(stmt.body, then, then_env)
+        self.lower_block(stmt.else_body or [], orelse, else_env)
+        if then.terminated and orelse.terminated:
+            self.block.terminated = True
+            return
+        env.clear()
+        if then.terminated or orelse.terminated:
+            env.update(then_env if orelse.terminated else else_env)
+            return
+        # Names bound on one path only are unbound after the if
+        for name, value in then_env.items():
+            other = else_env.get(name)
+            if other is None:
+                continue
+            if other is not value:
+                if 'list' in (value.type, other.type):
+                    raise Unsupported("list merge")
+                result = Instruction('phi', type=value.type if value.type == other.type else 'int',
+                                     name=name, position=instruction.position)
+                result.owner = instruction
+                instruction.results.append(result)
+                then.yields.append(value)
+                orelse.yields.append(other)
+                value = result
+            env[name] = value
+
+    def lower_loop(self, stmt, env):
+        assigned = assigned_names(stmt.body)
+        if isinstance(stmt, ForLoop):
+            if not isinstance(stmt.iterable, RangeCall) or isinstance(stmt.iterable.end, List):
+                raise Unsupported("for over a non-range")
+            bounds = [stmt.iterable.start, stmt.iterable.end]
+            args = [self.scalar(self.lower_expression(bound, env)) for bound in bounds]
+            if stmt.iterable.step is None:
+                args.append(self.emit('const', attr=1))
+            else:
+                args.append(self.scalar(self.lower_expression(stmt.iterable.step, env)))
+            # Python rebinds the loop variable on every iteration
+            assigned.discard(stmt.var_name)
+        else:
+            args = []
+        self.locate(stmt)
+        loop = self.emit('for' if isinstance(stmt, ForLoop) else 'while', args, 'void')
+        carried = [name for name in env if name in assigned]
+        inits = [env[name] for name in carried]
+        if any(value.type == 'list' for value in inits):
+            raise Unsupported("list rebound in a loop")
+        loop.args.extend(inits)
+        body_env = dict(env)
+        for name in carried:
+            value = Instruction('carried', type=env[name].type, name=name, position=loop.position)
+            value.owner = loop
+            loop.results.append(value)
+            body_env[name] = value
+        if isinstance(stmt, ForLoop):
+            loop.index = Instruction('index', name=stmt.var_name, position=loop.position)
+            loop.index.owner = loop
+            body_env[stmt.var_name] = loop.index
+        else:
+            header = Block()
+            loop.regions.append(header)
+            outer = self.block
+            self.block = header
+            header.yields = [self.scalar(self.lower_expression(stmt.condition, body_env))]
+            self.block = outer
+        body = Block()
+        loop.regions.append(body)
+        self.lower_block(stmt.body, body, body_env)
+        for name, value in zip(carried, loop.results):
+            if body.terminated:
+                body.yields.append(value)
+            elif name not in body_env or body_env[name].type == 'list':
+                raise Unsupported("loop-carried name unbound")
+            else:
+                body.yields.append(body_env[name])
+            env[name] = value
+        if isinstance(stmt, ForLoop):
+            env.pop(stmt.var_name, None)
+
+    def scalar(self, value):
+        if value.type not in ('int', 'bool'):
+            raise Unsupported(f"{value.type} operand")
+        return value
+
+    def list_operand(self, expr, env):
+        if not isinstance(expr, Variable) or expr.name not in env or env[expr.name].type != 'list':
+            raise Unsupported("indexing a non-list")
+        return env[expr.name]
+
+    def operands(self, expr):
+        """The subexpressions of expr lowered before it."""
+        if isinstance(expr, (Number, Boolean, Variable, LenCall)):
+            return []
+        if isinstance(expr, BinaryOp) and expr.op in ARITHMETIC + COMPARISONS:
+            return [expr.left, expr.right]
+        if isinstance(expr, UnaryOp) and expr.operator in ('-', '+'):
+            return [expr.operand]
+        if isinstance(expr, ListAccess):
+            return [expr.index]
+        if isinstance(expr, Algorithm):
+            return list(expr.args)
+        if isinstance(expr, FunctionCall):
+            if expr.name == 'len':
+                return []
+            if expr.name in self.codegen.function_types:
+                return list(expr.args)
+        raise Unsupported(type(expr).__name__)
+
+    def lower_expression(self, expr, env):
+        """Lower expr into the current block and return its value.
+
+        An explicit stack instead of recursion, like analysis.post_order(); the right
+        operand of and/or is lowered into the block of its logical instruction.
+        """
+        values = []
+        pending = [('visit', expr, None)]
+        while pending:
+            action, node, extra = pending.pop()
+            if action == 'visit':
+                if isinstance(node, BinaryOp) and node.op in ('and', 'or'):
+                    pending.append(('right', node, None))
+                    pending.append(('visit', node.left, None))
+                    continue
+                operands = self.operands(node)
+                pending.append(('build', node, len(operands)))
+                pending.extend(('visit', operand, None) for operand in reversed(operands))
+            elif action == 'build':
+                args = values[len(values) - extra:]
+                del values[len(values) - extra:]
+                values.append(self.build(node, args, env))
+            elif action == 'right':
+                left = self.scalar(values.pop())
+                region = Block()
+                self.depth += 1
+                if self.depth > MAX_BLOCK_DEPTH:
+                    raise Unsupported("too deeply nested")
+                pending.append(('close', node, (left, region, self.block)))
+                self.block = region
+                pending.append(('visit', node.right, None))
+            else:
+                left, region, outer = extra
+                region.yields = [self.scalar(values.pop())]
+                self.block = outer
+                self.depth -= 1
+                logical = self.emit('logical', [left], 'bool', attr=node.op)
+                logical.regions = [region]
+                values.append(logical)
+        return values.pop()
+
+    def build(self, expr, args, env):
+        if isinstance(expr, Number):
+            if type(expr.value) is not int:
+                raise Unsupported("non-int number")
+            return self.emit('const', attr=expr.value)
+        if isinstance(expr, Boolean):
+            return self.emit('const', type='bool', attr=expr.value)
+        if isinstance(expr, Variable):
+            if expr.name not in env:
+                raise Unsupported(f"unbound name {expr.name}")
+            return env[expr.name]
+        if isinstance(expr, BinaryOp):
+            left, right = map(self.scalar, args)
+            return self.emit('binary', [left, right], 'bool' if expr.op in COMPARISONS else 'int', attr=expr.op)
+        if isinstance(expr, UnaryOp):
+            return self.emit('unary', [self.scalar(args[0])], attr=expr.operator)
+        if isinstance(expr, ListAccess):
+            return self.emit('load', [self.list_operand(expr.list_expr, env), self.scalar(args[0])])
+        if isinstance(expr, LenCall):
+            return self.emit('len', [self.list_operand(expr.arg, env)])
+        if isinstance(expr, Algorithm):
+            return self.build_algorithm(expr, args, env)
+        if expr.name == 'len':
+            if len(expr.args) != 1:
+                raise Unsupported("len() arity")
+            return self.emit('len', [self.list_operand(expr.args[0], env)])
+        for arg in args:
+            if arg.type == 'list' and arg.op not in ('param', 'list'):
+                raise Unsupported("list argument")
+            if arg.type == 'void':
+                raise Unsupported("void argument")
+        if self.codegen.function_types[expr.name] not in ('int', 'bool', 'void'):
+            raise Unsupported(f"{self.codegen.function_types[expr.name]} call")
+        return self.emit('call', args, self.codegen.function_types[expr.name], attr=expr.name)
+
+    def build_algorithm(self, expr, args, env):
+        target = self.list_operand(expr.list_expr, env)
+        source = target if expr.source is None else self.list_operand(expr.source, env)
+        start = self.emit('const', attr=expr.start)
+        writes = expr.name in idioms.WRITING_ALGORITHMS
+        instruction = Instruction('algorithm', [target, source, start] + [self.scalar(arg) for arg in args],
+                                  'void' if writes else 'int', expr.name, position=self.position)
+        if expr.expr is not None:
+            # The function of a transform: a block computing the new item from the item
+            region = Block()
+            item = Instruction('item', name=expr.item, position=self.position)
+            item.owner = instruction
+            instruction.index = item
+            instruction.regions = [region]
+            outer = self.block
+            self.block = region
+            region.yields = [self.scalar(self.lower_expression(expr.expr, dict(env, **{expr.item: item})))]
+            self.block = outer
+        self.block.instructions.append(instruction)
+        return instruction
+
+def lower_function(codegen, func):
+    """Lower func to a Function; raises Unsupported when the IR cannot express it."""
+    return Lowering(codegen, func).lower()
+
+def copy_propagation(function):
+    """Replace copies, and merge values every path agrees on, by the value itself."""
+    while True:
+        mapping = {}
+        for instruction in instructions(function.body):
+            if instruction.op == 'copy':
+                mapping[instruction] = instruction.args[0]
+            elif instruction.op == 'if':
+                then, orelse = instruction.regions
+                for result, value, other in zip(instruction.results, then.yields, orelse.yields):
+                    if value is other:
+                        mapping[result] = value
+            elif instruction.op in LOOPS:
+                body = instruction.regions[-1]
+                for carried, init, value in zip(instruction.results, loop_inits(instruction), body.yields):
+                    if value is carried or value is init:
+                        mapping[carried] = init
+        if not mapping:
+            return
+        replace_uses(function, mapping)
+        for block in blocks(function.body):
+            block.instructions = [instruction for instruction in block.instructions
+                                  if instruction not in mapping]
+            for instruction in block.instructions:
+                if instruction.results:
+                    drop_results(instruction, mapping)
+
+def drop_results(instruction, dropped):
+    """Remove the merge values of instruction that are in dropped, with their incoming values."""
+    keep = [i for i, result in enumerate(instruction.results) if result not in dropped]
+    if len(keep) == len(instruction.results):
+        return
+    instruction.results = [instruction.results[i] for i in keep]
+    if instruction.op == 'if':
+        for region in instruction.regions:
+            region.yields = [region.yields[i] for i in keep]
+    else:
+        inits = loop_inits(instruction)
+        set_loop_inits(instruction, [inits[i] for i in keep])
+        body = instruction.regions[-1]
+        body.yields = [body.yields[i] for i in keep]
+
+def value_key(instruction, epoch, pure_functions):
+    """What identifies the value of instruction, or None when it cannot be shared."""
+    op = instruction.op
+    ids = tuple(id(arg) for arg in instruction.args)
+    if op == 'const':
+        return (op, instruction.type, instruction.attr)
+    if op in ('binary', 'unary'):
+        if instruction.attr in COMMUTATIVE:
+            ids = tuple(sorted(ids))
+        return (op, instruction.attr, instruction.type, ids)
+    if op in ('load', 'len'):
+        # Lists may change between epochs
+        return (op, ids, epoch)
+    if op == 'call' and instruction.attr in pure_functions:
+        return (op, instruction.attr, ids)
+    return None
+
+def global_value_numbering(function):
+    """Common subexpression elimination over the dominator tree of the structured IR.
+
+    A block sees the values of the blocks enclosing it and of its earlier
+    instructions, which is exactly what dominates it. Loads and len() are keyed by a
+    memory epoch that changes at each store, impure call or loop that may write, so
+    they are only shared while no list can have changed.
+    """
+    mapping = {}
+    epochs = iter(range(1, 1 << 62))
+    pure_functions = function.pure_functions
+
+    def number(block, table, epoch):
+        """Number block, whose values are added to table; returns the epoch at its end."""
+        kept = []
+        for instruction in block.instructions:
+            instruction.args = [mapping.get(arg, arg) for arg in instruction.args]
+            key = value_key(instruction, epoch, pure_functions)
+            if key is not None:
+                if key in table:
+                    mapping[instruction] = table[key]
+                    continue
+                table[key] = instruction
+            kept.append(instruction)
+            if instruction.op in LOOPS:
+                # The body may run after it wrote, so no load before the loop is valid in it
+                inner = next(epochs)
+                scope = table.new_child()
+                if instruction.op == 'while':
+                    end = number(instruction.regions[0], scope, inner)
+                else:
+                    end = inner
+                if number(instruction.regions[-1], scope.new_child(), end) != inner or end != inner:
+                    epoch = next(epochs)
+            elif instruction.regions:
+                ends = [number(region, table.new_child(), epoch) for region in instruction.regions]
+                if any(end != epoch for end in ends) or writes_memory(instruction, pure_functions):
+                    epoch = next(epochs)
+            elif writes_memory(instruction, pure_functions):
+                epoch = next(epochs)
+        block.instructions = kept
+        block.yields = [mapping.get(value, value) for value in block.yields]
+        return epoch
+
+    number(function.body, ChainMap(), 0)
+    if mapping:
+        replace_uses(function, mapping)
+
+def power_of_two(value):
+    if value is None or value < 2 or value & (value - 1):
+        return None
+    return int(math.log2(value))
+
+def strength_reduction(function):
+    """Replace multiplications of loop variables by induction values, and cheapen operators.
+
+    In a for loop with a constant step, j * c becomes a value the loop carries,
+    starting at start * c and growing by step * c. Elsewhere, +, -, *, // and % of two
+    int literals are folded, x + 0, x - 0, x * 1 and x // 1 become x, x * 0 and x % 1
+    become 0, taking the remainder of a power of two becomes a mask, and for x proven
+    non-negative, multiplying by a power of two becomes a shift.
+    """
+    reduce_induction_variables(function)
+    bounds = lower_bounds(function)
+    mapping = {}
+    for instruction in instructions(function.body):
+        if instruction.op != 'binary' or instruction.type != 'int':
+            continue
+        left, right = instruction.args
+        if 'bool' in (left.type, right.type):
+            continue
+        op = instruction.attr
+        left_constant, right_constant = constant(left), constant(right)
+        if (left_constant is not None and right_constant is not None and op in FOLDED
+                and not (op in DIVISIONS and right_constant == 0)):
+            value = FOLDED[op](left_constant, right_constant)
+            if -2**31 <= value < 2**31:
+                instruction.op, instruction.args, instruction.attr = 'const', [], value
+                continue
+        if op == '+' and 0 in (left_constant, right_constant):
+            mapping[instruction] = right if left_constant == 0 else left
+        elif op == '-' and right_constant == 0:
+            mapping[instruction] = left
+        elif (op == '*' and 1 in (left_constant, right_constant)) or (op == '//' and right_constant == 1):
+            mapping[instruction] = right if left_constant == 1 else left
+        elif (op == '*' and 0 in (left_constant, right_constant)) or (op == '%' and right_constant == 1):
+            instruction.op, instruction.args, instruction.attr = 'const', [], 0
+        elif op == '*':
+            if power_of_two(left_constant) is not None:
+                left, right, right_constant = right, left, left_constant
+            shift = power_of_two(right_constant)
+            if shift is not None and bounds.get(left) is not None and bounds[left] >= 0:
+                instruction.attr = '<<'
+                instruction.args = [left, Instruction('const', attr=shift)]
+        elif op == '%' and power_of_two(right_constant) is not None:
+            # Python's remainder of a power of two is the two's complement low bits, whatever the sign
+            instruction.attr = '&'
+            instruction.args = [left, Instruction('const', attr=right_constant - 1)]
+    if mapping:
+        replace_uses(function, mapping)
+        for block in blocks(function.body):
+            block.instructions = [instruction for instruction in block.instructions
+                                  if instruction not in mapping]
+
+def reduce_induction_variables(function):
+    mapping = {}
+    for block in list(blocks(function.body)):
+        position = 0
+        while position < len(block.instructions):
+            loop = block.instructions[position]
+            position += 1
+            step = constant(loop.args[2]) if loop.op == 'for' else None
+            if step is None:
+                continue
+            products = {}
+            for instruction in instructions(loop.regions[0]):
+                if instruction.op != 'binary' or instruction.attr != '*':
+                    continue
+                left, right = instruction.args
+                if right is loop.index:
+                    left, right = right, left
+                factor = constant(right)
+                if left is loop.index and factor is not None and factor >= 2:
+                    products.setdefault(factor, []).append(instruction)
+            body = loop.regions[0]
+            for factor, uses in products.items():
+                start = loop.args[0]
+                if constant(start) is not None:
+                    init = Instruction('const', attr=constant(start) * factor)
+                else:
+                    init = Instruction('binary', [start, Instruction('const', attr=factor)], attr='*',
+                                       position=loop.position)
+                    block.instructions.insert(position - 1, init)
+                    position += 1
+                value = Instruction('carried', name=f"{loop.index.name}_x{factor}", position=loop.position)
+                value.owner = loop
+                loop.results.append(value)
+                loop.args.append(init)
+                if body.terminated:
+                    body.yields.append(value)
+                else:
+                    next_value = Instruction('binary', [value, Instruction('const', attr=step * factor)],
+                                             attr='+', position=loop.position)
+                    body.instructions.append(next_value)
+                    body.yields.append(next_value)
+                for product in uses:
+                    mapping[product] = value
+    if mapping:
+        replace_uses(function, mapping)
+        for block in blocks(function.body):
+            block.instructions = [instruction for instruction in block.instructions
+                                  if instruction not in mapping]
+
+def same_value(first, second):
+    """Whether two values are provably equal: the same value, or the same arithmetic on equal values."""
+    pending = [(first, second)]
+    while pending:
+        first, second = pending.pop()
+        if first is second:
+            continue
+        if first.op != second.op or first.attr != second.attr or first.type != second.type:
+            return False
+        if first.op not in ('const', 'binary', 'unary'):
+            return False
+        pending.extend(zip(first.args, second.args))
+    return True
+
+def recognize_swaps(function):
+    """Turn a[i], a[j] = a[j], a[i] (two loads, then two crossed stores) into a swap."""
+    counts = use_counts(function)
+    pure_functions = function.pure_functions
+    for block in blocks(function.body):
+        items = block.instructions
+        positions = {instruction: i for i, instruction in enumerate(items)}
+        removed = set()
+        for k in range(len(items) - 1):
+            first = items[k]
+            if first.op != 'store' or first in removed:
+                continue
+            # Only arithmetic, such as the second index, may separate the stores
+            m = k + 1
+            while m < len(items) and items[m].op in ('const', 'binary', 'unary', 'copy'):
+                m += 1
+            if m == len(items) or items[m].op != 'store':
+                continue
+            second = items[m]
+            target, i, value = first.args
+            if second.args[0] is not target:
+                continue
+            j, other = second.args[1], second.args[2]
+            if not (value.op == 'load' and value.args[0] is target and same_value(value.args[1], j)
+                    and other.op == 'load' and other.args[0] is target and same_value(other.args[1], i)):
+                continue
+            if value not in positions or other not in positions:
+                continue
+            start = min(positions[value], positions[other])
+            if any(has_writes(items[p], pure_functions) for p in range(start, k)):
+                continue
+            # At the second store, where both indexes are defined
+            second.op = 'swap'
+            second.args = [target, i, j]
+            removed.add(first)
+            # Loads that other instructions read (as CSE may have arranged) stay
+            removed.update(load for load in (value, other) if counts.get(load) == 1)
+        if removed:
+            block.instructions = [instruction for instruction in items if instruction not in removed]
+
+def eliminate_dead_code(function):
+    """Remove values nothing uses and that have no effect, and unused if results."""
+    pure_functions = function.pure_functions
+    while True:
+        counts = use_counts(function)
+        changed = False
+        for block in blocks(function.body):
+            kept = []
+            for instruction in block.instructions:
+                if instruction.results and instruction.op == 'if':
+                    unused = {result for result in instruction.results if not counts.get(result)}
+                    if unused:
+                        drop_results(instruction, unused)
+                        changed = True
+                if instruction.op in STATEMENTS or counts.get(instruction) or has_writes(instruction, pure_functions):
+                    kept.append(instruction)
+                else:
+                    changed = True
+            block.instructions = kept
+        if not changed:
+            return
+
+def verify(function, after):
+    """Check that every value is defined where it is used and that merges are well formed."""
+    def fail(message):
+        raise Exception(f"Invalid IR in {function.name} after {after}: {message}")
+
+    def check(block, defined):
+        for instruction in block.instructions:
+            for arg in instruction.args:
+                if arg not in defined and arg.op != 'const':
+                    fail(f"{instruction!r} uses undefined {arg!r}")
+            defined.add(instruction)
+            inner = set(defined)
+            if instruction.op == 'if':
+                for region in instruction.regions:
+                    check(region, set(inner))
+                    if not region.terminated and len(region.yields) != len(instruction.results):
+                        fail("if yields do not match its results")
+                defined.update(instruction.results)
+            elif instruction.op in LOOPS:
+                inner.update(instruction.results)
+                if instruction.index is not None:
+                    inner.add(instruction.index)
+                for region in instruction.regions:
+                    check(region, inner)
+                    inner = set(inner)
+                if len(loop_inits(instruction)) != len(instruction.results):
+                    fail("loop inits do not match its carried values")
+                if len(instruction.regions[-1].yields) != len(instruction.results):
+                    fail("loop yields do not match its carried values")
+                defined.update(instruction.results)
+            else:
+                if instruction.index is not None:
+                    inner.add(instruction.index)
+                for region in instruction.regions:
+                    check(region, set(inner))
+        for value in block.yields:
+            if value not in defined and value.op != 'const':
+                fail(f"yield of undefined {value!r}")
+
+    check(function.body, set(function.params))
+
+def dump(function):
+    """The IR of function as text, for debugging."""
+    numbers = {}
+
+    def name(value):
+        if value.op == 'const':
+            return repr(value.attr)
+        if value not in numbers:
+            numbers[value] = len(numbers)
+        return f"%{numbers[value]}"
+
+    lines = [f"func {function.name}({', '.join(f'{name(p)}: {p.type}' for p in function.params)}) -> {function.return_type}"]
+
+    def write(block, indent):
+        for instruction in block.instructions:
+            if instruction.op == 'const':
+                continue
+            results = [name(result) for result in instruction.results]
+            if instruction.index is not None:
+                results.insert(0, name(instruction.index))
+            target = f"{', '.join(results)} = " if results else (
+                "" if instruction.op in STATEMENTS else f"{name(instruction)} = ")
+            attr = "" if instruction.attr is None else f" {instruction.attr}"
+            hint = f"  # {instruction.name}" if instruction.name else ""
+            lines.append(f"{indent}{target}{instruction.op}{attr} {', '.join(map(name, instruction.args))} : {instruction.type}{hint}")
+            for region in instruction.regions:
+                write(region, indent + "    ")
+                lines.append(f"{indent}    yield {', '.join(map(name, region.yields))}")
+
+    write(function.body, "    ")
+    return "\n".join(lines)
+
+class PassManager:
+    """Runs a pipeline of passes over IR functions and times every pass."""
+
+    def __init__(self, passes=None, verify=False):
+        # (name, function taking a Function) pairs, run in order
+        self.passes = list(PASSES if passes is None else passes)
+        # Verify the IR after every pass; slower, for debugging passes
+        self.verify = verify
+
+    def run(self, function):
+        """Run every pass over function; returns {pass name: seconds spent}."""
+        timings = {}
+        if self.verify:
+            verify(function, "lowering")
+        for name, run in self.passes:
+            start = time.perf_counter()
+            run(function)
+            timings[name] = time.perf_counter() - start
+            if self.verify:
+                verify(function, name)
+        return timings
+
+PASSES = [
+    ("copy-propagation", copy_propagation),
+    # Before GVN shares the loads of a swap with other readers in other blocks
+    ("swap-recognition", recognize_swaps),
+    ("gvn", global_value_numbering),
+    ("strength-reduction", strength_reduction),
+    ("dce", eliminate_dead_code),
+]
+
+class Emitter:
+    """Writes the body of a Function as C++ statements.
+
+    Each value becomes an expression inlined into its single user, or a local; merge
+    values are mutable locals assigned at the end of the blocks feeding them, and
+    share the local of the value they replace when that value is dead afterwards, so
+    i = i + 1 in a loop stays one variable.
+    """
+
+    def __init__(self, codegen, function):
+        self.codegen = codegen
+        self.function = function
+        self.pure_functions = function.pure_functions
+        self.bounds = lower_bounds(function)
+        # Program-order numbering: order of an instruction, end of its blocks, end of a block
+        self.order = {}
+        self.end = {}
+        self.block_end = {}
+        self.block_owner = {}
+        self.instruction_block = {}
+        # value -> [(user instruction, block)]; the user is None for a yield of the block
+        self.users = {}
+        self.counter = 0
+        self.number(function.body, None)
+        # instruction -> 'inline', 'value' (a local), 'statement' or 'dead'
+        self.status = {}
+        # inlined instruction -> (user, block) it is inlined into
+        self.consumer = {}
+        # logical instruction -> whether its block inlines entirely
+        self.simple = {}
+        self.plan(function.body)
+        self.var = {param: param.attr for param in function.params}
+        self.taken = {param.attr for param in function.params} | set(codegen.function_types)
+        self.texts = {}
+        # Operand texts of inlined binary operations, for compound assignments
+        self.operands = {}
+        self.temporary_count = 0
+        self.position = None
+
+    def number(self, block, owner):
+        self.block_owner[block] = owner
+        for instruction in block.instructions:
+            self.order[instruction] = self.counter
+            self.counter += 1
+            self.instruction_block[instruction] = block
+            for arg in instruction.args:
+                self.users.setdefault(arg, []).append((instruction, block))
+            if instruction.index is not None:
+                self.order[instruction.index] = self.order[instruction]
+            for region in instruction.regions:
+                self.number(region, instruction)
+            self.end[instruction] = self.counter
+            self.counter += 1
+            for result in instruction.results:
+                self.order[result] = self.order[instruction] if instruction.op in LOOPS else self.end[instruction]
+        self.block_end[block] = self.counter
+        self.counter += 1
+        for value in block.yields:
+            self.users.setdefault(value, []).append((None, block))
+
+    def kind(self, instruction):
+        op = instruction.op
+        if op in STATEMENTS or (op == 'algorithm' and instruction.type == 'void'):
+            return 'statement'
+        if op == 'algorithm':
+            return 'read'
+        if op in ('binary', 'unary', 'copy') or (op == 'call' and instruction.attr in self.pure_functions):
+            return 'pure'
+        if op in ('load', 'len'):
+            return 'read'
+        if op == 'logical' and self.simple[instruction]:
+            region = instruction.regions[0]
+            reads = any(self.kind(nested) == 'read' for nested in region.instructions)
+            return 'read' if reads else 'pure'
+        # Impure calls, lists and logical operations needing statements
+        return 'effect'
+
+    def plan(self, block):
+        """Decide how each instruction of block, and of the blocks nested in it, is emitted."""
+        for instruction in block.instructions:
+            for region in instruction.regions:
+                self.plan(region)
+            if instruction.op == 'logical':
+                self.simple[instruction] = all(self.status[nested] in ('inline', 'dead')
+                                               for nested in instruction.regions[0].instructions)
+        items = block.instructions
+        size = len(items)
+        writes = [0]
+        for instruction in items:
+            writes.append(writes[-1] + has_writes(instruction, self.pure_functions))
+        # Where in block each instruction is evaluated
+        anchor = {}
+        for position in range(size - 1, -1, -1):
+            instruction = items[position]
+            kind = self.kind(instruction)
+            users = self.users.get(instruction, [])
+            anchor[instruction] = position
+            if kind == 'statement':
+                self.status[instruction] = 'statement'
+            elif instruction.op == 'const':
+                self.status[instruction] = 'dead'
+            elif not users:
+                self.status[instruction] = 'statement' if kind == 'effect' and instruction.op != 'list' else 'dead'
+            elif self.inlines(instruction, kind, users, block, anchor, writes, position):
+                self.status[instruction] = 'inline'
+            else:
+                self.status[instruction] = 'value'
+
+    def inlines(self, instruction, kind, users, block, anchor, writes, position):
+        if kind not in ('pure', 'read') or len(users) != 1:
+            return False
+        user, user_block = users[0]
+        if user_block is not block:
+            return False
+        # A named value is kept as a local unless it only feeds a merge
+        if instruction.name is not None and user is not None:
+            return False
+        if user is None:
+            evaluated = len(block.instructions)
+        elif self.status[user] == 'dead':
+            return False
+        else:
+            evaluated = anchor[user]
+            if user.op == 'for' and user.args.index(instruction) in (1, 2) and (
+                    kind == 'read' or instruction.op == 'call'):
+                # range() evaluates its bounds once
+                return False
+        if kind == 'read' and writes[evaluated] - writes[position + 1]:
+            return False
+        anchor[instruction] = evaluated
+        self.consumer[instruction] = (user, block)
+        return True
+
+    def use_position(self, user, block):
+        """Program-order position at which a use is evaluated."""
+        while True:
+            if user is None:
+                owner = self.block_owner[block]
+                if owner is None or owner.op != 'logical':
+                    return self.block_end[block]
+                user, block = owner, self.instruction_block[owner]
+            if self.status.get(user) == 'inline':
+                user, block = self.consumer[user]
+                continue
+            return self.order[user]
+
+    def loop_of(self, block):
+        """The innermost loop enclosing block."""
+        owner = self.block_owner[block]
+        while owner is not None and owner.op not in LOOPS:
+            owner = self.block_owner[self.instruction_block[owner]]
+        return owner
+
+    def scope_loop(self, value):
+        """The innermost loop inside which value is defined."""
+        if value.op in ('carried', 'index'):
+            return value.owner
+        if value.op == 'param':
+            return None
+        if value.op == 'phi':
+            return self.loop_of(self.instruction_block[value.owner])
+        return self.loop_of(self.instruction_block[value])
+
+    def can_share(self, merge, value, start, limit=None):
+        """Whether merge can be stored in the local of value: same name, value dead from start on."""
+        if value not in self.var or value.op == 'index' or value.name != merge.name:
+            return False
+        if value.type not in C_TYPES or merge.type not in C_TYPES:
+            return False
+        for user, block in self.users.get(value, []):
+            position = self.use_position(user, block)
+            if position > start and (limit is None or position < limit):
+                return False
+        return True
+
+    def new_name(self, base=None):
+        if base is None:
+            while f"py_tmp{self.temporary_count}" in self.taken:
+                self.temporary_count += 1
+            base = f"py_tmp{self.temporary_count}"
+        name = base
+        suffix = 0
+        while name in self.taken:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        self.taken.add(name)
+        return name
+
+    def ref(self, value):
+        """(code, names of the locals it reads) of value at its use."""
+        if value.op == 'const':
+            if value.type == 'bool':
+                return ('true' if value.attr else 'false'), frozenset()
+            return str(value.attr), frozenset()
+        if value in self.var:
+            return self.var[value], frozenset([self.var[value]])
+        return self.texts.pop(value)
+
+    def subscript(self, target, index):
+        receiver = self.var[target]
+        code, names = self.ref(index)
+        names |= {receiver}
+        if self.codegen.mode == "debug":
+            self.codegen.uses_list_helpers = True
+            return f"{receiver}.at(py_index({receiver}, {code}))", names
+        bound = self.bounds.get(index)
+        if bound is not None and bound >= 0:
+            return f"{receiver}[{code}]", names
+        self.codegen.uses_list_helpers = True
+        return f"{receiver}[py_index({receiver}, {code})]", names
+
+    def operator(self, instruction):
+        """The C++ operator of a binary instruction, or None when only a py_ helper rounds like Python.
+
+        // and % agree with C++'s / and % when the left operand is proven non-negative
+        and the right one positive, as for most index arithmetic.
+        """
+        op = instruction.attr
+        if op not in DIVISIONS:
+            return op
+        left, right = (self.bounds.get(arg, constant(arg)) for arg in instruction.args)
+        if left is None or left < 0 or right is None or right < 1:
+            return None
+        return '/' if op == '//' else op
+
+    def expression(self, instruction, indent):
+        """(code, names of the locals it reads) computing instruction."""
+        op = instruction.op
+        if op == 'load':
+            return self.subscript(*instruction.args)
+        if op == 'logical':
+            lines = self.emit_block(instruction.regions[0], indent)
+            assert not lines
+            left, left_names = self.ref(instruction.args[0])
+            right, right_names = self.ref(instruction.regions[0].yields[0])
+            return f"({left} {instruction.attr} {right})", left_names | right_names
+        if op == 'call':
+            folded = self.fold(instruction)
+            if folded is not None:
+                return folded, frozenset()
+        if op == 'algorithm':
+            return self.algorithm(instruction, indent)
+        refs = [self.ref(arg) for arg in instruction.args]
+        codes = [code for code, _ in refs]
+        names = frozenset().union(*[names for _, names in refs])
+        if op == 'binary':
+            self.operands[instruction] = refs
+            operator = self.operator(instruction)
+            if operator is None:
+                self.codegen.uses_arithmetic_helpers = True
+                return f"py_{DIVISIONS[instruction.attr]}({codes[0]}, {codes[1]})", names
+            return f"({codes[0]} {operator} {codes[1]})", names
+        if op == 'unary':
+            operand = codes[0]
+            if operand.startswith(('+', '-')):
+                # - -x must not become the decrement --x
+                operand = f"({operand})"
+            return f"{instruction.attr}{operand}", names
+        if op == 'copy':
+            return codes[0], names
+        if op == 'len':
+            return f"(long long){codes[0]}.size()", names
+        if op == 'list':
+            return f"{{{', '.join(codes)}}}", names
+        if op == 'call':
+            return f"{instruction.attr}({', '.join(codes)})", names
+        raise Exception(f"Cannot emit {op} as an expression")
+
+    def algorithm(self, instruction, indent):
+        target, source, start = instruction.args[:3]
+        refs = [self.ref(arg) for arg in instruction.args[3:]]
+        names = frozenset([self.var[target], self.var[source]]).union(*[names for _, names in refs])
+        function = None
+        if instruction.regions:
+            item = self.new_name(instruction.index.name)
+            self.var[instruction.index] = item
+            region = instruction.regions[0]
+            lines = self.emit_block(region, indent + "        ")
+            code, _ = self.ref(region.yields[0])
+            if lines:
+                body = "\n".join(lines + [f"{indent}        return {code};", f"{indent}    }}"])
+                function = f"[&](int {item}) {{\n{body}"
+            else:
+                function = f"[&](int {item}) {{ return {code}; }}"
+        code = idioms.algorithm_code(instruction.attr, constant(start), self.var[target], self.var[source],
+                                     [code for code, _ in refs], function)
+        return code, names
+
+    def fold(self, call):
+        """The folded code of a pure call with constant int arguments, see CodeGenerator.fold_call()."""
+        if not all(constant(arg) is not None for arg in call.args):
+            return None
+        return self.codegen.fold_call(FunctionCall(call.attr, [Number(constant(arg)) for arg in call.args]))
+
+    def marker(self, instruction):
+        if instruction.position is None or instruction.position == self.position:
+            return []
+        self.position = instruction.position
+        return [f"{LINE_MARKER}{instruction.position[0]}:{instruction.position[1]}"]
+
+    def assign(self, pairs, indent):
+        """Assign (local, value) pairs as one parallel assignment."""
+        entries = []
+        for target, value in pairs:
+            if self.var.get(value) == target:
+                continue
+            code, names = self.ref(value)
+            entries.append((target, code, names))
+        lines = []
+        while entries:
+            # First assign a local no other pending assignment still reads
+            for entry in entries:
+                if not any(entry[0] in names for other, _, names in entries if other != entry[0]):
+                    lines.append(f"{indent}{entry[0]} = {entry[1]};")
+                    entries.remove(entry)
+                    break
+            else:
+                # The locals read each other in a cycle: compute every value first
+                temporaries = []
+                for target, code, _ in entries:
+                    temporary = self.new_name()
+                    lines.append(f"{indent}auto {temporary} = {code};")
+                    temporaries.append(temporary)
+                lines.extend(f"{indent}{target} = {temporary};"
+                             for (target, _, _), temporary in zip(entries, temporaries))
+                entries = []
+        return lines
+
+    def emit_block(self, block, indent):
+        lines = []
+        for instruction in block.instructions:
+            status = self.status[instruction]
+            if status == 'dead':
+                continue
+            if status == 'inline':
+                self.texts[instruction] = self.expression(instruction, indent)
+                continue
+            lines.extend(self.marker(instruction))
+            if instruction.op == 'logical' and not self.simple[instruction]:
+                lines.extend(self.emit_logical(instruction, indent))
+            elif status == 'value':
+                name = self.new_name(instruction.name)
+                code, _ = self.expression(instruction, indent)
+                if instruction.op == 'list':
+                    lines.append(f"{indent}{self.codegen.list_type(instruction.name)} {name} = {code};")
+                else:
+                    lines.append(f"{indent}auto {name} = {code};")
+                self.var[instruction] = name
+            else:
+                lines.extend(self.emit_statement(instruction, indent))
+        return lines
+
+    def emit_statement(self, instruction, indent):
+        op = instruction.op
+        if op == 'store':
+            target, index, value = instruction.args
+            item = value.args[0] if value.op == 'binary' else None
+            if (item is not None and self.status.get(value) == 'inline' and value.attr in ARITHMETIC
+                    and self.operator(value) is not None
+                    and item.op == 'load' and self.status.get(item) == 'inline' and item.args == [target, index]):
+                # Augmented item assignment: the item is looked up once
+                self.texts.pop(value)
+                (code, _), (right, _) = self.operands.pop(value)
+                return [f"{indent}{code} {self.operator(value)}= {right};"]
+            value_code, _ = self.ref(value)
+            code, _ = self.subscript(target, index)
+            return [f"{indent}{code} = {value_code};"]
+        if op == 'swap':
+            target, i, j = instruction.args
+            first, _ = self.subscript(target, i)
+            second, _ = self.subscript(target, j)
+            return [f"{indent}swap({first}, {second});"]
+        if op == 'return':
+            if not instruction.args:
+                return [f"{indent}return;"]
+            return [f"{indent}return {self.ref(instruction.args[0])[0]};"]
+        if op in ('call', 'algorithm'):
+            return [f"{indent}{self.expression(instruction, indent)[0]};"]
+        if op == 'if':
+            return self.emit_if(instruction, indent)
+        return self.emit_loop(instruction, indent)
+
+    def emit_logical(self, instruction, indent):
+        """a and b whose b needs statements: a bool local assigned b only when a allows."""
+        name = self.new_name(instruction.name)
+        left, _ = self.ref(instruction.args[0])
+        test = name if instruction.attr == 'and' else f"!{name}"
+        region = instruction.regions[0]
+        lines = [f"{indent}bool {name} = {left};", f"{indent}if ({test}) {{"]
+        lines.extend(self.emit_block(region, indent + "    "))
+        lines.extend(self.assign([(name, region.yields[0])], indent + "    "))
+        lines.append(f"{indent}}}")
+        self.var[instruction] = name
+        return lines
+
+    def emit_if(self, instruction, indent):
+        lines = []
+        condition, _ = self.ref(instruction.args[0])
+        then, orelse = instruction.regions
+        loop = self.loop_of(self.instruction_block[instruction])
+        for i, result in enumerate(instruction.results):
+            for value in (then.yields[i], orelse.yields[i]):
+                # The local must hold value before the if and be dead after it
+                if value not in self.var or self.order.get(value, -1) > self.order[instruction]:
+                    continue
+                if self.scope_loop(value) is not loop:
+                    continue
+                limit = self.end[loop] if value.op == 'carried' and value.owner is loop else None
+                if self.can_share(result, value, self.end[instruction], limit):
+                    self.var[result] = self.var[value]
+                    break
+            else:
+                name = self.new_name(result.name)
+                lines.append(f"{indent}{C_TYPES.get(result.type, 'int')} {name} = {ZERO.get(result.type, '0')};")
+                self.var[result] = name
+        position = instruction.position or (None, None)
+        then_hint, else_hint = self.codegen.branch_hints(SimpleNamespace(line=position[0], column=position[1]))
+        inner = indent + "    "
+        results = [self.var[result] for result in instruction.results]
+        then_lines = self.emit_block(then, inner)
+        then_lines += self.assign(zip(results, then.yields), inner)
+        else_lines = self.emit_block(orelse, inner)
+        else_lines += self.assign(zip(results, orelse.yields), inner)
+        lines.append(f"{indent}if ({condition}){then_hint} {{")
+        lines.extend(then_lines)
+        lines.append(f"{indent}}}")
+        if else_lines:
+            lines.append(f"{indent}else{else_hint} {{")
+            lines.extend(else_lines)
+            lines.append(f"{indent}}}")
+        return lines
+
+    def emit_loop(self, loop, indent):
+        lines = []
+        outer = self.loop_of(self.instruction_block[loop])
+        for carried, init in zip(loop.results, loop_inits(loop)):
+            # The local of the initial value is reused when nothing reads it in or after the loop
+            limit = self.end[outer] if init.op == 'carried' and init.owner is outer else None
+            if (init in self.var and self.scope_loop(init) is outer
+                    and self.can_share(carried, init, self.order[loop], limit)):
+                self.var[carried] = self.var[init]
+            else:
+                name = self.new_name(carried.name)
+                code, _ = self.ref(init)
+                lines.append(f"{indent}{C_TYPES.get(carried.type, 'int')} {name} = {code};")
+                self.var[carried] = name
+        carried_names = {self.var[carried] for carried in loop.results}
+        inner = indent + "    "
+        body = loop.regions[-1]
+        if loop.op == 'for':
+            bounds = []
+            for value in loop.args[:3]:
+                code, names = self.ref(value)
+                if names & carried_names:
+                    # The loop assigns a local the bound reads; range() reads it once
+                    temporary = self.new_name()
+                    lines.append(f"{indent}const auto {temporary} = {code};")
+                    code = temporary
+                bounds.append(code)
+            start, end, step = bounds
+            index = self.new_name(loop.index.name)
+            self.var[loop.index] = index
+            step_value = constant(loop.args[2])
+            comparison = '>' if step_value is not None and step_value < 0 else '<'
+            increment = f"{index}++" if step_value == 1 else f"{index} += {step}"
+            lines.append(f"{indent}for (int {index} = {start}; {index} {comparison} {end}; {increment}) {{")
+        else:
+            header = loop.regions[0]
+            header_lines = self.emit_block(header, inner)
+            condition, _ = self.ref(header.yields[0])
+            if header_lines:
+                lines.append(f"{indent}while (true) {{")
+                lines.extend(header_lines)
+                lines.append(f"{inner}if (!{condition}) break;")
+            else:
+                lines.append(f"{indent}while ({condition}) {{")
+        lines.extend(self.emit_block(body, inner))
+        if not body.terminated:
+            lines.extend(self.assign([(self.var[carried], value) for carried, value in zip(loop.results, body.yields)], inner))
+        lines.append(f"{indent}}}")
+        return lines
+
+def emit_body(codegen, function):
+    """The C++ lines of the body of function, indented one level."""
+    return Emitter(codegen, function).emit_block(function.body, "    ")
@@ -40,8 +40,11 @@ class Lexer:
             ('AND', r'\band\b', TokenType.AND),
             ('OR', r'\bor\b', TokenType.OR),
             ('NOT', r'\bnot\b', TokenType.NOT),
+            ('IMPORT', r'\bimport\b', TokenType.IMPORT),
+            ('FROM', r'\bfrom\b', TokenType.FROM),
             
             # Identifiers and literals
+            ('FSTRING', r'[fF](?:"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\')', TokenType.FSTRING),
             ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*', TokenType.IDENTIFIER),
             ('FLOAT', r'\d*\.\d+', TokenType.FLOAT),
             ('NUMBER', r'\d+', TokenType.NUMBER),
@@ -51,6 +54,7 @@ class Lexer:
             ('PLUS_EQUALS', r'\+=', TokenType.PLUS_EQUALS),
             ('MINUS_EQUALS', r'-=', TokenType.MINUS_EQUALS),
             ('MULTIPLY_EQUALS', r'\*=', TokenType.MULTIPLY_EQUALS),
+            ('FLOOR_DIVIDE_EQUALS', r'//=', TokenType.FLOOR_DIVIDE_EQUALS),
             ('DIVIDE_EQUALS', r'/=', TokenType.DIVIDE_EQUALS),
             ('MODULO_EQUALS', r'%=', TokenType.MODULO_EQUALS),
             ('EQUALS_EQUALS', r'==', TokenType.EQUALS_EQUALS),
@@ -61,6 +65,7 @@ class Lexer:
             ('PLUS', r'\+', TokenType.PLUS),
             ('MINUS', r'-', TokenType.MINUS),
             ('MULTIPLY', r'\*', TokenType.MULTIPLY),
+            ('FLOOR_DIVIDE', r'//', TokenType.FLOOR_DIVIDE),
             ('DIVIDE', r'/', TokenType.DIVIDE),
             ('MODULO', r'%', TokenType.MODULO),
             ('GREATER', r'>', TokenType.GREATER),
@@ -76,6 +81,7 @@ class Lexer:
             ('COMMA', r',', TokenType.COMMA),
             ('COLON', r':', TokenType.COLON),
             ('SEMICOLON', r';', TokenType.SEMICOLON),
+            ('DOT', r'\.', TokenType.DOT),
             
             # Comments
             ('COMMENT', r'#.*', TokenType.COMMENT),
@@ -111,11 +117,13 @@ class Lexer:
                 token_value = float(token_value)
             elif token_type == 'STRING':
                 token_value = token_value[1:-1]  # Remove quotes
+            elif token_type == 'FSTRING':
+                token_value = token_value[2:-1]  # Remove prefix and quotes
             elif token_type == 'TRUE':
                 token_value = True
             elif token_type == 'FALSE':
                 token_value = False
-            elif token_type in ('PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE', 'MODULO', 
+            elif token_type in ('PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE', 'FLOOR_DIVIDE', 'MODULO', 
                               'EQUALS_EQUALS', 'NOT_EQUALS', 'GREATER_EQUALS', 
                               'LESS_EQUALS', 'GREATER', 'LESS', 'EQUALS'):
                 token_value = token_value  # Keep the operator symbol as the value
@@ -132,3 +140,159 @@ class Lexer:
 
         self.tokens.append(Token(TokenType.EOF, None, self.line, self.column))
         return self.tokens
+
+
+# Keyword spellings and the token type and value the regex backend gives them
+KEYWORDS = {
+    'print': (TokenType.PRINT, 'print'),
+    'if': (TokenType.IF, 'if'),
+    'else': (TokenType.ELSE, 'else'),
+    'while': (TokenType.WHILE, 'while'),
+    'for': (TokenType.FOR, 'for'),
+    'in': (TokenType.IN, 'in'),
+    'range': (TokenType.RANGE, 'range'),
+    'def': (TokenType.DEF, 'def'),
+    'return': (TokenType.RETURN, 'return'),
+    'True': (TokenType.TRUE, True),
+    'False': (TokenType.FALSE, False),
+    'and': (TokenType.AND, 'and'),
+    'or': (TokenType.OR, 'or'),
+    'not': (TokenType.NOT, 'not'),
+    'import': (TokenType.IMPORT, 'import'),
+    'from': (TokenType.FROM, 'from'),
+}
+
+# Operators and delimiters by first character, longest spelling first
+OPERATORS = {}
+for _text, _type in [
+    ('+=', TokenType.PLUS_EQUALS), ('-=', TokenType.MINUS_EQUALS), ('*=', TokenType.MULTIPLY_EQUALS),
+    ('//=', TokenType.FLOOR_DIVIDE_EQUALS), ('/=', TokenType.DIVIDE_EQUALS), ('//', TokenType.FLOOR_DIVIDE),
+    ('%=', TokenType.MODULO_EQUALS), ('==', TokenType.EQUALS_EQUALS),
+    ('!=', TokenType.NOT_EQUALS), ('>=', TokenType.GREATER_EQUALS), ('<=', TokenType.LESS_EQUALS),
+    ('=', TokenType.EQUALS), ('+', TokenType.PLUS), ('-', TokenType.MINUS), ('*', TokenType.MULTIPLY),
+    ('/', TokenType.DIVIDE), ('%', TokenType.MODULO), ('>', TokenType.GREATER), ('<', TokenType.LESS),
+    ('(', TokenType.LPAREN), (')', TokenType.RPAREN), ('{', TokenType.LBRACE), ('}', TokenType.RBRACE),
+    ('[', TokenType.LBRACKET), (']', TokenType.RBRACKET), (',', TokenType.COMMA), (':', TokenType.COLON),
+    (';', TokenType.SEMICOLON),
+]:
+    OPERATORS.setdefault(_text[0], []).append((_text, _type))
+
+IDENTIFIER_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+IDENTIFIER_REST = re.compile(r'[a-zA-Z0-9_]*')
+DIGITS = re.compile(r'\d*')
+BLANKS = re.compile(r'[ \t]*')
+
+def is_word_char(char):
+    """Mirror of the regex `\\w` class used by the keyword `\\b` anchors."""
+    return char.isalnum() or char == '_'
+
+class ScannerLexer(Lexer):
+    """Converts Python code into tokens with a hand-written, character-driven scanner.
+
+    Produces exactly the tokens of the regex Lexer: identifiers are matched once and
+    classified by KEYWORDS lookup, operators through the OPERATORS longest-match
+    table, and characters no rule matches are skipped without advancing the column.
+    """
+
+    def scan_string(self, source, start):
+        """Return the end of the quoted string starting at start, or -1 if it is unterminated."""
+        quote = source[start]
+        length = len(source)
+        pos = start + 1
+        while pos < length:
+            char = source[pos]
+            if char == quote:
+                return pos + 1
+            if char == '\\':
+                # An escape covers any character except a newline
+                if pos + 1 >= length or source[pos + 1] == '\n':
+                    return -1
+                pos += 2
+            else:
+                pos += 1
+        return -1
+
+    def tokenize(self):
+        """Main function to generate tokens from source code."""
+        source = self.source_code
+        length = len(source)
+        tokens = self.tokens
+        line = self.line
+        column = self.column
+        pos = 0
+        while pos < length:
+            char = source[pos]
+            if char == ' ' or char == '\t':
+                end = BLANKS.match(source, pos).end()
+                column += end - pos
+                pos = end
+            elif char == '\n':
+                line += 1
+                column = 1
+                pos += 1
+            elif char in IDENTIFIER_START:
+                if (char == 'f' or char == 'F') and pos + 1 < length and source[pos + 1] in '"\'':
+                    end = self.scan_string(source, pos + 1)
+                    if end != -1:
+                        tokens.append(Token(TokenType.FSTRING, source[pos + 2:end - 1], line, column))
+                        column += end - pos
+                        pos = end
+                        continue
+                end = IDENTIFIER_REST.match(source, pos + 1).end()
+                text = source[pos:end]
+                keyword = KEYWORDS.get(text)
+                if (keyword is not None
+                        and not (pos > 0 and is_word_char(source[pos - 1]))
+                        and not (end < length and is_word_char(source[end]))):
+                    tokens.append(Token(keyword[0], keyword[1], line, column))
+                else:
+                    tokens.append(Token(TokenType.IDENTIFIER, text, line, column))
+                column += end - pos
+                pos = end
+            elif char in OPERATORS:
+                for text, type_ in OPERATORS[char]:
+                    if source.startswith(text, pos):
+                        tokens.append(Token(type_, text, line, column))
+                        column += len(text)
+                        pos += len(text)
+                        break
+                else:
+                    pos += 1
+            elif char == '"' or char == "'":
+                end = self.scan_string(source, pos)
+                if end == -1:
+                    pos += 1
+                    continue
+                tokens.append(Token(TokenType.STRING, source[pos + 1:end - 1], line, column))
+                column += end - pos
+                pos = end
+            elif char == '#':
+                end = source.find('\n', pos)
+                if end == -1:
+                    end = length
+                column += end - pos
+                pos = end
+            elif char == '.' or char.isdecimal():
+                end = DIGITS.match(source, pos).end()
+                if end < length and source[end] == '.' and end + 1 < length and source[end + 1].isdecimal():
+                    end = DIGITS.match(source, end + 1).end()
+                    tokens.append(Token(TokenType.FLOAT, float(source[pos:end]), line, column))
+                elif end > pos:
+                    tokens.append(Token(TokenType.NUMBER, int(source[pos:end]), line, column))
+                else:
+                    end = pos + 1
+                    tokens.append(Token(TokenType.DOT, '.', line, column))
+                column += end - pos
+                pos = end
+            else:
+                pos += 1
+
+        self.line = line
+        self.column = column
+        tokens.append(Token(TokenType.EOF, None, line, column))
+        return tokens
+
+LEXER_BACKENDS = {
+    'regex': Lexer,
+    'scanner': ScannerLexer,
+}
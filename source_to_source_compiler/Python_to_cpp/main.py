@@ -1,40 +1,96 @@
-from lexer import Lexer
+from lexer import LEXER_BACKENDS
 from parser import Parser
+from frontends import FRONTENDS, parse_source
 from codegen import CodeGenerator
-from ast_nodes import Program
+from modules import ModuleGraph, build_modules
+from outputs import write_if_changed, write_depfile
+import argparse
+import json
+import os
 import sys
 from pprint import pprint
 
-def transpile_python_to_cpp(input_file, output_file):
+def transpile(source, source_file="input.py", lexer="regex", frontend="hand", **options):
+    """Transpile Python source to C++ without progress output.
+
+    Returns the C++ code and its source map; frontend names a FRONTENDS entry, lexer a
+    LEXER_BACKENDS entry, and the other options are passed to CodeGenerator.
+    """
+    ast = parse_source(source, frontend, lexer, source_file)
+    codegen = CodeGenerator(source_file=source_file, **options)
+    return codegen.generate(ast), codegen.source_map
+
+def transpile_python_to_cpp(input_file, output_file, line_directives=False, source_map=False,
+                            instrument=False, lexer="regex", depfile=None, flat_int_maps=False, mode="release",
+                            const_eval_budget=100000, codegen_workers=1, use_ir=True, pass_timings=False,
+                            std_sort=False, frontend="hand", parallel_calls=False, task_cutoff=1000, task_depth=4):
     try:
         # Read Python code
         with open(input_file, "r") as f:
             code = f.read()
 
-        # Tokenize
-        print("Tokenizing Python code...")
-        lexer = Lexer(code)
-        tokens = lexer.tokenize()
-        print("Tokenization successful!")
+        if frontend == "hand":
+            # Tokenize
+            print("Tokenizing Python code...")
+            tokens = LEXER_BACKENDS[lexer](code).tokenize()
+            print("Tokenization successful!")
 
-        # Parse
-        print("\nParsing tokens into AST...")
-        parser = Parser(tokens)
-        ast = parser.parse()
+            # Parse
+            print("\nParsing tokens into AST...")
+            parser = Parser(tokens)
+            ast = parser.parse()
+        else:
+            print(f"Parsing Python code with the {frontend} frontend...")
+            ast = parse_source(code, frontend, lexer, input_file)
         print("\nParsed AST:")
-        pprint(ast)
+        try:
+            pprint(ast)
+        except RecursionError:
+            # The node reprs recurse; parsing and codegen do not
+            print("(too deeply nested to print)")
         print("Parsing successful!")
 
         # Generate C++ code
         print("\nGenerating C++ code...")
-        codegen = CodeGenerator()
+        codegen = CodeGenerator(
+            source_file=os.path.relpath(input_file, os.path.dirname(os.path.abspath(output_file))).replace(os.sep, "/"),
+            generated_file=os.path.basename(output_file),
+            line_directives=line_directives,
+            instrument=instrument,
+            flat_int_maps=flat_int_maps,
+            mode=mode,
+            const_eval_budget=const_eval_budget,
+            workers=codegen_workers,
+            use_ir=use_ir,
+            std_sort=std_sort,
+            parallel_calls=parallel_calls,
+            task_cutoff=task_cutoff,
+            task_depth=task_depth,
+        )
         cpp_code = codegen.generate(ast)
         print("Code generation successful!")
+        if pass_timings:
+            print("\nIR pass timings:")
+            for name, seconds in codegen.pass_timings.items():
+                print(f"  {name:20} {seconds * 1000:8.3f} ms")
+
+        # Save the C++ code, keeping the old file (and its mtime) when nothing changed
+        if write_if_changed(output_file, cpp_code):
+            print(f"\nC++ code has been written to {output_file}")
+        else:
+            print(f"\n{output_file} is up to date")
+
+        # Save the Python-to-C++ line mapping next to the output
+        if source_map:
+            write_if_changed(output_file + ".map", json.dumps(codegen.source_map, indent=1))
+            print(f"Source map has been written to {output_file}.map")
 
-        # Save the C++ code
-        with open(output_file, "w") as f:
-            f.write(cpp_code)
-        print(f"\nC++ code has been written to {output_file}")
+        # Record the Python files the output was generated from
+        if depfile:
+            graph = ModuleGraph(input_file, lexer, frontend)
+            dependencies = list(graph.paths.values())
+            write_depfile(depfile, [output_file], dependencies)
+            print(f"Dependencies have been written to {depfile}")
 
         # Print the generated C++ code
         print("\nGenerated C++ Code:\n")
@@ -48,27 +104,70 @@ def transpile_python_to_cpp(input_file, output_file):
         sys.exit(1)
 
 def main():
-    # Example 1: Bubble Sort
-    # from bubble_sort import main as bubble_sort_main
-    # bubble_sort_main()
-
-    # Example 2: Linear Search
-    # from linear_search import main as linear_search_main
-    # linear_search_main()
-
-    # Example 3: Factorial
-    # from factorial import main as factorial_main
-    # factorial_main()
-
-    # Example 4: Fibonacci
-    from fibonacci import main as fibonacci_main
-    fibonacci_main()
-
-    # quicksort example
-    from my import main as quicksort_main
-    quicksort_main()
+    arg_parser = argparse.ArgumentParser(description="Transpile a Python file to C++.")
+    arg_parser.add_argument("input_file", nargs="?", default="my.py")
+    arg_parser.add_argument("output_file", nargs="?", default="output.cpp")
+    arg_parser.add_argument("--line-directives", action="store_true",
+                            help="emit #line directives pointing back at the Python source")
+    arg_parser.add_argument("--source-map", action="store_true",
+                            help="write a JSON source map to <output_file>.map")
+    arg_parser.add_argument("--instrument", action="store_true",
+                            help="count calls, loop iterations and time per Python function and loop; "
+                                 "the counts are written to py_profile.json at exit")
+    arg_parser.add_argument("--lexer", choices=sorted(LEXER_BACKENDS), default="regex",
+                            help="lexer backend (default: regex)")
+    arg_parser.add_argument("--frontend", choices=sorted(FRONTENDS), default="hand",
+                            help="hand: the hand-written lexer and parser; cpython: CPython's ast.parse(), "
+                                 "converted to the same AST (default: hand)")
+    arg_parser.add_argument("--mode", choices=("release", "debug"), default="release",
+                            help="debug bounds-checks every list index like Python's IndexError; "
+                                 "release indexes directly (default)")
+    arg_parser.add_argument("--const-eval-budget", type=int, default=100000, metavar="STEPS",
+                            help="fold calls of pure functions with constant arguments at transpile time, "
+                                 "spending at most STEPS evaluation steps per call (0 disables)")
+    arg_parser.add_argument("--codegen-workers", type=int, default=1, metavar="N",
+                            help="generate function definitions in N processes; the output does not depend on N")
+    arg_parser.add_argument("--no-ir", dest="use_ir", action="store_false",
+                            help="emit function bodies straight from the AST instead of the optimized SSA IR")
+    arg_parser.add_argument("--pass-timings", action="store_true",
+                            help="print the time spent in each IR pass")
+    arg_parser.add_argument("--std-sort", action="store_true",
+                            help="replace recognized bubble and insertion sorts by std::sort")
+    arg_parser.add_argument("--parallel-calls", action="store_true",
+                            help="run independent recursive calls, such as quick_sort's two halves, as std::async "
+                                 "tasks (link with -pthread)")
+    arg_parser.add_argument("--task-cutoff", type=int, default=1000, metavar="ITEMS",
+                            help="with --parallel-calls, run calls covering fewer list items in order (default: 1000)")
+    arg_parser.add_argument("--task-depth", type=int, default=4, metavar="N",
+                            help="with --parallel-calls, spawn no tasks below N nested task groups, "
+                                 "at most 2**N tasks for two calls per group (default: 4)")
+    arg_parser.add_argument("--flat-int-maps", action="store_true",
+                            help="store dicts with int keys in an open-addressing flat hash map")
+    arg_parser.add_argument("--depfile", nargs="?", const="", metavar="PATH",
+                            help="write a make/ninja depfile listing the Python files the output depends on "
+                                 "(default path: <output_file>.d)")
+    arg_parser.add_argument("--modules", metavar="OUTPUT_DIR",
+                            help="also transpile every imported module, writing one header/source pair "
+                                 "per module and a Makefile to OUTPUT_DIR (see modules.py)")
+    args = arg_parser.parse_args()
+    if args.modules:
+        try:
+            graph = build_modules(args.input_file, args.modules, lexer=args.lexer,
+                                  depfile=args.depfile is not None, frontend=args.frontend)
+        except Exception as e:
+            print(f"Error during transpilation: {str(e)}")
+            sys.exit(1)
+        print(f"\n{len(graph.paths)} modules have been written to {args.modules}")
+        return
+    transpile_python_to_cpp(args.input_file, args.output_file,
+                            line_directives=args.line_directives, source_map=args.source_map,
+                            instrument=args.instrument, lexer=args.lexer,
+                            depfile=args.output_file + ".d" if args.depfile == "" else args.depfile,
+                            flat_int_maps=args.flat_int_maps, mode=args.mode,
+                            const_eval_budget=args.const_eval_budget, codegen_workers=args.codegen_workers,
+                            use_ir=args.use_ir, pass_timings=args.pass_timings, std_sort=args.std_sort,
+                            frontend=args.frontend, parallel_calls=args.parallel_calls,
+                            task_cutoff=args.task_cutoff, task_depth=args.task_depth)
 
 if __name__ == "__main__":
-    input_file = "my.py"
-    output_file = "output.cpp"
-    transpile_python_to_cpp(input_file, output_file)
\ No newline at end of file
+    main()
@@ -0,0 +1,192 @@
+"""Multi-module transpilation driven by the import graph.
+
+Usage:
+    python modules.py entry.py output_dir [--jobs N] [--lexer regex|scanner] [--frontend hand|cpython] [--depfile]
+
+Starting from the entry file, every `import m` / `from m import f` is resolved to
+m.py next to the importing file, building the module dependency graph. Modules are
+then transpiled in topological waves: all modules of a wave run in parallel in a
+process pool, and each gets the return types of the functions of the modules it
+imports. Every module becomes a header/translation-unit pair (m.h, m.cpp) sharing
+py_runtime.h, and a Makefile builds the program with one object per module, so
+`make -j` compiles modules in parallel and only recompiles what changed. Each file
+is parsed once, while building the graph; workers receive its AST in the compact
+ast_format encoding instead of parsing the file again.
+
+Imported names are not namespaced: all modules share one global namespace, as
+`from m import f` calls appear unqualified in the generated C++, and so do the
+`m.f(...)` calls of an `import m`.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import LEXER_BACKENDS
+from frontends import FRONTENDS, parse_source
+from codegen import CodeGenerator
+from ast_nodes import Import, ImportFrom, IfStatement, WhileLoop, ForLoop
+from outputs import write_if_changed, write_depfile
+import ast_format
+
+def parse_file(path, lexer="regex", frontend="hand"):
+    with open(path) as f:
+        source = f.read()
+    return parse_source(source, frontend, lexer, path)
+
+def find_imports(statements):
+    """Return the names of the modules imported anywhere in statements, in source order."""
+    modules = []
+    for stmt in statements:
+        if isinstance(stmt, list):
+            found = find_imports(stmt)
+        elif isinstance(stmt, Import):
+            found = stmt.modules
+        elif isinstance(stmt, ImportFrom):
+            found = [stmt.module]
+        elif isinstance(stmt, IfStatement):
+            found = find_imports(stmt.body) + find_imports(stmt.else_body or [])
+        elif isinstance(stmt, (WhileLoop, ForLoop)):
+            found = find_imports(stmt.body)
+        elif hasattr(stmt, 'body'):
+            found = find_imports(stmt.body)
+        else:
+            found = []
+        modules.extend(module for module in found if module not in modules)
+    return modules
+
+class ModuleGraph:
+    """The modules reachable from an entry file and their imports."""
+
+    def __init__(self, entry_file, lexer="regex", frontend="hand"):
+        self.lexer = lexer
+        self.frontend = frontend
+        self.entry = self.module_name(entry_file)
+        self.paths = {}
+        self.imports = {}
+        self.asts = {}
+        self.discover(os.path.abspath(entry_file))
+
+    @staticmethod
+    def module_name(path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def discover(self, entry_path):
+        pending = [entry_path]
+        while pending:
+            path = pending.pop()
+            name = self.module_name(path)
+            if name in self.paths:
+                continue
+            self.paths[name] = path
+            self.asts[name] = parse_file(path, self.lexer, self.frontend)
+            self.imports[name] = find_imports(self.asts[name].statements)
+            for module in self.imports[name]:
+                module_path = os.path.join(os.path.dirname(path), f"{module}.py")
+                if not os.path.exists(module_path):
+                    raise Exception(f"Cannot find module '{module}' imported by {path}")
+                pending.append(module_path)
+
+    def waves(self):
+        """Group modules into waves whose imports are all in earlier waves."""
+        remaining = {name: set(deps) for name, deps in self.imports.items()}
+        done = set()
+        waves = []
+        while remaining:
+            wave = sorted(name for name, deps in remaining.items() if deps <= done)
+            if not wave:
+                raise Exception(f"Import cycle between modules: {', '.join(sorted(remaining))}")
+            waves.append(wave)
+            done.update(wave)
+            for name in wave:
+                del remaining[name]
+        return waves
+
+def transpile_module(encoded_ast, path, name, imports, is_entry, external_functions):
+    """Worker entry point: transpile one module, given its serialized AST, into its header and translation unit."""
+    ast = ast_format.loads(encoded_ast)
+    codegen = CodeGenerator(
+        source_file=os.path.basename(path),
+        generated_file=f"{name}.cpp",
+        external_functions=external_functions,
+    )
+    header, source = codegen.generate_module(ast, name, imports, is_entry)
+    own_functions = {fn: type_ for fn, type_ in codegen.function_types.items() if fn not in external_functions}
+    return header, source, own_functions
+
+def generate_makefile(graph):
+    lines = [
+        "CXX ?= g++",
+        "CXXFLAGS ?= -std=c++17 -O2",
+        "",
+        f"OBJECTS = {' '.join(f'{name}.o' for name in sorted(graph.paths))}",
+        "",
+        f"{graph.entry}: $(OBJECTS)",
+        "\t$(CXX) $(CXXFLAGS) -o $@ $(OBJECTS)",
+        "",
+    ]
+    for name in sorted(graph.paths):
+        headers = " ".join(f"{module}.h" for module in graph.imports[name])
+        lines.append(f"{name}.o: {name}.cpp {name}.h {headers} py_runtime.h".replace("  ", " "))
+        lines.append(f"\t$(CXX) $(CXXFLAGS) -c {name}.cpp -o {name}.o")
+        lines.append("")
+    lines.append("clean:")
+    lines.append(f"\trm -f $(OBJECTS) {graph.entry}")
+    lines.append("")
+    lines.append(".PHONY: clean")
+    return "\n".join(lines) + "\n"
+
+def build_modules(entry_file, output_dir, jobs=None, lexer="regex", depfile=False, frontend="hand"):
+    """Transpile entry_file and every module it imports into output_dir.
+
+    Files whose content did not change are left untouched, so make only recompiles
+    the modules that did. With depfile, output_dir/<entry>.d lists every Python
+    module the generated sources were produced from.
+    """
+    graph = ModuleGraph(entry_file, lexer, frontend)
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    function_types = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for wave in graph.waves():
+            futures = {}
+            for name in wave:
+                external = {}
+                for module in graph.imports[name]:
+                    external.update(function_types[module])
+                futures[name] = pool.submit(transpile_module, ast_format.dumps(graph.asts[name]), graph.paths[name],
+                                            name, graph.imports[name], name == graph.entry, external)
+            for name, future in futures.items():
+                header, source, function_types[name] = future.result()
+                outputs[f"{name}.h"] = header
+                outputs[f"{name}.cpp"] = source
+            print(f"Transpiled {', '.join(wave)}")
+    outputs["py_runtime.h"] = CodeGenerator().generate_runtime_header()
+    outputs["Makefile"] = generate_makefile(graph)
+    written = [file_name for file_name, content in outputs.items()
+               if write_if_changed(os.path.join(output_dir, file_name), content)]
+    print(f"Updated {', '.join(written)}" if written else "All outputs are up to date")
+    if depfile:
+        targets = [os.path.join(output_dir, file_name) for file_name in outputs]
+        write_depfile(os.path.join(output_dir, f"{graph.entry}.d"), targets,
+                      list(graph.paths.values()))
+    return graph
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Transpile a Python program and its imported modules to C++.")
+    arg_parser.add_argument("entry_file")
+    arg_parser.add_argument("output_dir")
+    arg_parser.add_argument("--jobs", type=int, default=None, help="parallel transpile workers (default: CPU count)")
+    arg_parser.add_argument("--lexer", choices=sorted(LEXER_BACKENDS), default="regex")
+    arg_parser.add_argument("--frontend", choices=sorted(FRONTENDS), default="hand")
+    arg_parser.add_argument("--depfile", action="store_true", help="write output_dir/<entry>.d for make/ninja")
+    args = arg_parser.parse_args()
+    try:
+        graph = build_modules(args.entry_file, args.output_dir, args.jobs, args.lexer, args.depfile, args.frontend)
+    except Exception as e:
+        print(f"Error during transpilation: {str(e)}")
+        sys.exit(1)
+    print(f"\n{len(graph.paths)} modules have been written to {args.output_dir}; run make there to build {graph.entry}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,23 @@
 #include <bits/stdc++.h>
 using namespace std;
 
-void print_array(const vector<int>& arr) {
-    cout << '[';
+template <typename List>
+ostream& py_print_list(ostream& os, const List& arr) {
+    os << '[';
     for (size_t i = 0; i < arr.size(); ++i) {
-        cout << arr[i];
-        if (i < arr.size() - 1) cout << ", ";
+        if (i) os << ", ";
+        os << arr[i];
     }
-    cout << ']';
+    return os << ']';
 }
+ostream& operator<<(ostream& os, const vector<int>& arr) { return py_print_list(os, arr); }
+template <size_t N>
+ostream& operator<<(ostream& os, const array<int, N>& arr) { return py_print_list(os, arr); }
 
-int partition(vector<int>& arr, int low, int high);
-void quick_sort(vector<int>& arr, int low, int high);
+template <typename List> int partition(List& arr, int low, int high);
+template <typename List> void quick_sort(List& arr, int low, int high);
 
-int partition(vector<int>& arr, int low, int high) {
+template <typename List> int partition(List& arr, int low, int high) {
     auto pivot = arr[high];
     auto i = (low - 1);
     for (int j = low; j < high; j++) {
@@ -26,7 +30,7 @@ int partition(vector<int>& arr, int low, int high) {
     return (i + 1);
 }
 
-void quick_sort(vector<int>& arr, int low, int high) {
+template <typename List> void quick_sort(List& arr, int low, int high) {
 if ((low < high)) {
     auto pi = partition(arr, low, high);
     quick_sort(arr, low, (pi - 1));
@@ -35,13 +39,12 @@ if ((low < high)) {
 }
 
 int main() {
-    vector<int> arr = {10, 7, 8, 9, 1, 5};
-    cout << "Unsorted array:" << " ";
-    print_array(arr);
-    cout << endl;
+    ios::sync_with_stdio(false);
+    cin.tie(nullptr);
+    array<int, 6> arr = {10, 7, 8, 9, 1, 5};
+    cout << "Unsorted array: " << arr << '\n';
     quick_sort(arr, 0, ((arr.size() - 1)));
-    cout << "Sorted array:" << " ";
-    print_array(arr);
-    cout << endl;
+    cout << "Sorted array: " << arr << '\n';
+    cout.flush();
     return 0;
 }
\ No newline at end of file
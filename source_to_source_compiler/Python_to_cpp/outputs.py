@@ -0,0 +1,61 @@
+"""Output writing that plays well with incremental builds.
+
+Generated files are only rewritten when their content changes, so an unchanged
+transpile keeps the old modification time and make/ninja skip the C++ compile.
+Depfiles record which Python files an output was generated from, in the format
+both make (-include) and ninja (depfile = ...) read.
+"""
+import os
+import stat
+import tempfile
+
+def write_if_changed(path, content):
+    """Write content to path unless it already holds exactly that; returns whether it was written.
+
+    The new content goes to a temporary file in the same directory that then replaces
+    path, so readers never see a partially written file. The file keeps the permissions
+    of the one it replaces, or gets those the umask gives a new file.
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    mode = file_mode(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        # mkstemp() creates the file readable by its owner only
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+def file_mode(path):
+    """The permission bits of path, or those open() would give a new file there."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def build_path(path):
+    """Spell path relative to the working directory when it is below it, as build files usually do."""
+    relative = os.path.relpath(path)
+    return path if relative.startswith(os.pardir) else relative
+
+def escape_dependency(path):
+    return path.replace(" ", "\\ ").replace("#", "\\#").replace("$", "$$")
+
+def depfile_content(targets, dependencies):
+    """Make-style rule saying that every target depends on every dependency."""
+    lines = [" ".join(escape_dependency(build_path(target)) for target in targets) + ":"]
+    lines.extend(f" {escape_dependency(build_path(dependency))}" for dependency in dependencies)
+    return " \\\n".join(lines) + "\n"
+
+def write_depfile(path, targets, dependencies):
+    return write_if_changed(path, depfile_content(targets, dependencies))
@@ -1,10 +1,39 @@
 from lexer import Lexer, TokenType
 from ast_nodes import (
-    Assignment, Variable, BinaryOp, Number, Print, Float, String, Boolean,
+    Node, Assignment, Variable, BinaryOp, Number, Print, Float, String, FormattedString, Boolean,
     UnaryOp, IfStatement, WhileLoop, ForLoop, RangeCall, FunctionDef, FunctionCall, Return, 
-    List, ListAccess, ListAssignment, LenCall, Program
+    List, Dict, Set, ListAccess, ListAssignment, MethodCall, Import, ImportFrom, Program
 )
 
+# Augmented assignment token -> binary operator it applies
+AUGMENTED_OPERATORS = {
+    TokenType.PLUS_EQUALS: '+',
+    TokenType.MINUS_EQUALS: '-',
+    TokenType.MULTIPLY_EQUALS: '*',
+    TokenType.DIVIDE_EQUALS: '/',
+    TokenType.FLOOR_DIVIDE_EQUALS: '//',
+    TokenType.MODULO_EQUALS: '%',
+}
+
+# Binary operator token -> precedence; and binds tighter than or, as in Python
+BINARY_PRECEDENCE = {
+    TokenType.OR: 1,
+    TokenType.AND: 2,
+    TokenType.GREATER: 3, TokenType.LESS: 3, TokenType.GREATER_EQUALS: 3, TokenType.LESS_EQUALS: 3,
+    TokenType.EQUALS_EQUALS: 3, TokenType.NOT_EQUALS: 3, TokenType.IN: 3, TokenType.NOT: 3,
+    TokenType.PLUS: 4, TokenType.MINUS: 4,
+    TokenType.MULTIPLY: 5, TokenType.DIVIDE: 5, TokenType.FLOOR_DIVIDE: 5, TokenType.MODULO: 5,
+}
+
+# Bracket frame of the expression parser -> token closing it
+CLOSING = {
+    'paren': TokenType.RPAREN,
+    'call': TokenType.RPAREN,
+    'subscript': TokenType.RBRACKET,
+    'list': TokenType.RBRACKET,
+    'braces': TokenType.RBRACE,
+}
+
 class Parser:
     """Parses tokens into an Abstract Syntax Tree (AST)."""
     
@@ -13,6 +42,16 @@ class Parser:
         self.current_token_index = 0
         self.current_token = self.tokens[self.current_token_index]
 
+    def locate(self, node, token):
+        """Record the position of token on node (or on each node of a list) unless already set."""
+        if isinstance(node, list):
+            for item in node:
+                self.locate(item, token)
+        elif isinstance(node, Node) and node.line is None:
+            node.line = token.line
+            node.column = token.column
+        return node
+
     def eat(self, token_type):
         """Consume a token if it matches the expected type."""
         if self.current_token.type == token_type:
@@ -38,6 +77,10 @@ class Parser:
             token = self.current_token
             self.eat(TokenType.STRING)
             return String(token.value)
+        elif self.current_token.type == TokenType.FSTRING:
+            token = self.current_token
+            self.eat(TokenType.FSTRING)
+            return self.parse_formatted_string(token)
         elif self.current_token.type in (TokenType.TRUE, TokenType.FALSE):
             token = self.current_token
             self.eat(token.type)
@@ -52,138 +95,257 @@ class Parser:
         return Variable(token.value)
 
     def parse_expression(self):
-        """Parse expressions with proper operator precedence."""
-        print(f"Parsing expression at token: {self.current_token}")
-        # Handle expressions that start with operators
-        if self.current_token and self.current_token.type in (TokenType.PLUS, TokenType.MINUS):
-            operator = self.current_token.value
-            self.eat(self.current_token.type)
-            operand = self.parse_expression()
-            return UnaryOp(operator, operand)
-        expr = self.parse_logical()
-        return expr
-
-    def parse_comparison(self):
-        """Parse comparison operators."""
-        print(f"Parsing comparison at token: {self.current_token}")
-        left = self.parse_term()
-
-        while self.current_token and self.current_token.type in (
-            TokenType.GREATER, TokenType.LESS, TokenType.GREATER_EQUALS,
-            TokenType.LESS_EQUALS, TokenType.EQUALS_EQUALS, TokenType.NOT_EQUALS
-        ):
-            operator = self.current_token.value
-            self.eat(self.current_token.type)
-            right = self.parse_term()
-            left = BinaryOp(left, operator, right)
-
-        return left
-
-    def parse_term(self):
-        """Parse addition and subtraction."""
-        print(f"Parsing term at token: {self.current_token}")
-        left = self.parse_factor()
-
-        while self.current_token and self.current_token.type in (TokenType.PLUS, TokenType.MINUS):
-            operator = self.current_token.value
-            print(f"Found operator {operator} at token: {self.current_token}")
-            self.eat(self.current_token.type)
-            right = self.parse_factor()
-            
-            # Handle string concatenation
-            if operator == '+':
-                # If either operand is a string or str() call, treat as string concatenation
-                if isinstance(left, String) or isinstance(right, String) or \
-                   (isinstance(left, FunctionCall) and left.name == 'str') or \
-                   (isinstance(right, FunctionCall) and right.name == 'str'):
-                    # Convert non-string operands to strings
-                    if not isinstance(left, String) and not (isinstance(left, FunctionCall) and left.name == 'str'):
-                        left = FunctionCall('str', [left])
-                    if not isinstance(right, String) and not (isinstance(right, FunctionCall) and right.name == 'str'):
-                        right = FunctionCall('str', [right])
-            
-            left = BinaryOp(left, operator, right)
-
-        return left
+        """Parse an expression with operator precedence, using explicit stacks.
 
-    def parse_factor(self):
-        """Parse multiplication and division."""
-        print(f"Parsing factor at token: {self.current_token}")
-        left = self.parse_primary()
-
-        while self.current_token and self.current_token.type in (TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO):
-            operator = self.current_token.value
-            self.eat(self.current_token.type)
-            right = self.parse_primary()
-            left = BinaryOp(left, operator, right)
+        Operands and pending operators are kept on stacks (shunting-yard) and brackets
+        (parentheses, calls, subscripts, list, dict and set literals) are frames on the
+        operator stack, so the nesting depth of the input is not limited by recursion.
+        Returns None, consuming nothing, when the current token cannot start an expression.
+        """
+        operands = []
+        operators = []
+        expect_operand = True
+        while True:
+            token = self.current_token
+            if expect_operand:
+                if token.type in (TokenType.PLUS, TokenType.MINUS):
+                    operators.append(('unary', token.value, token))
+                    self.eat(token.type)
+                    continue
+                if token.type in (TokenType.RBRACKET, TokenType.RBRACE) and operators and operators[-1][0] in ('list', 'braces'):
+                    # Trailing comma before the closing bracket
+                    self.close_frame(operands, operators)
+                    expect_operand = False
+                    continue
+                expect_operand = self.parse_operand(operands, operators)
+                if expect_operand is None:
+                    if not operands and not operators:
+                        return None
+                    raise SyntaxError(f"Expected an expression, but got {token.type} at line {token.line}, column {token.column}")
+                continue
+            if token.type in BINARY_PRECEDENCE:
+                precedence = BINARY_PRECEDENCE[token.type]
+                self.reduce(operands, operators, precedence)
+                if token.type == TokenType.NOT:
+                    # Membership test 'not in'
+                    self.eat(TokenType.NOT)
+                    self.eat(TokenType.IN)
+                    operator = 'not in'
+                else:
+                    operator = 'in' if token.type == TokenType.IN else token.value
+                    self.eat(token.type)
+                operators.append(('binary', operator, precedence))
+                expect_operand = True
+                continue
+            self.reduce(operands, operators, 0)
+            if not operators:
+                # Whatever follows belongs to the enclosing statement
+                break
+            frame = operators[-1]
+            if token.type == TokenType.COMMA and frame[0] in ('call', 'list', 'braces'):
+                self.eat(TokenType.COMMA)
+                self.add_to_frame(operands, frame)
+                expect_operand = True
+            elif token.type == TokenType.COLON and frame[0] == 'braces' and frame[2] is None:
+                # The operand is a dict key; its value follows
+                if len(frame[1]) != len(frame[4]):
+                    raise SyntaxError(f"Unexpected ':' in a set literal at line {token.line}, column {token.column}")
+                self.eat(TokenType.COLON)
+                frame[2], _ = operands.pop()
+                expect_operand = True
+            elif token.type == CLOSING[frame[0]]:
+                self.add_to_frame(operands, frame)
+                self.close_frame(operands, operators)
+            else:
+                # Reports the missing closing bracket
+                self.eat(CLOSING[frame[0]])
+        node, _ = operands.pop()
+        return node
 
-        return left
+    def parse_operand(self, operands, operators):
+        """Parse the operand at the current token, or open the bracket frame it starts.
 
-    def parse_primary(self):
-        """Parse a primary expression."""
-        print(f"parse_primary: current token = {self.current_token}")
-        if not self.current_token:
-            return None
-            
+        Returns whether an operand is still expected, which is the case after an opened
+        bracket, or None when the token cannot start an operand.
+        """
         token = self.current_token
-
         if token.type == TokenType.NUMBER:
             self.eat(TokenType.NUMBER)
-            return Number(token.value)
+            node = Number(token.value)
         elif token.type == TokenType.FLOAT:
             self.eat(TokenType.FLOAT)
-            return Float(token.value)
+            node = Float(token.value)
         elif token.type == TokenType.STRING:
             self.eat(TokenType.STRING)
-            return String(token.value)
+            node = String(token.value)
+            if self.current_token.type == TokenType.DOT:
+                # Method call on a literal, such as ", ".join(parts)
+                self.eat(TokenType.DOT)
+                method = self.current_token.value
+                self.eat(TokenType.IDENTIFIER)
+                self.eat(TokenType.LPAREN)
+                frame = ['call', [], (self.locate(node, token), method), token]
+                return self.open_frame(operands, operators, frame, TokenType.RPAREN)
+        elif token.type == TokenType.FSTRING:
+            self.eat(TokenType.FSTRING)
+            node = self.parse_formatted_string(token)
         elif token.type == TokenType.TRUE:
             self.eat(TokenType.TRUE)
-            return Boolean(True)
+            node = Boolean(True)
         elif token.type == TokenType.FALSE:
             self.eat(TokenType.FALSE)
-            return Boolean(False)
+            node = Boolean(False)
         elif token.type == TokenType.IDENTIFIER:
             name = token.value
             self.eat(TokenType.IDENTIFIER)
-            
-            # Check for function call
-            if self.current_token and self.current_token.type == TokenType.LPAREN:
-                return self.parse_function_call(name)
-            
-            # Check for list access
-            elif self.current_token and self.current_token.type == TokenType.LBRACKET:
+            if self.current_token.type == TokenType.LPAREN:
+                # Function call
+                self.eat(TokenType.LPAREN)
+                return self.open_frame(operands, operators, ['call', [], name, token], TokenType.RPAREN)
+            elif self.current_token.type == TokenType.DOT:
+                # Method call
+                self.eat(TokenType.DOT)
+                method = self.current_token.value
+                self.eat(TokenType.IDENTIFIER)
+                self.eat(TokenType.LPAREN)
+                frame = ['call', [], (Variable(name), method), token]
+                return self.open_frame(operands, operators, frame, TokenType.RPAREN)
+            elif self.current_token.type == TokenType.LBRACKET:
+                # List access
                 self.eat(TokenType.LBRACKET)
-                index = self.parse_expression()
-                self.eat(TokenType.RBRACKET)
-                return ListAccess(Variable(name), index)
-            
-            return Variable(name)
+                operators.append(['subscript', [], Variable(name), token])
+                return True
+            node = Variable(name)
         elif token.type == TokenType.LPAREN:
             self.eat(TokenType.LPAREN)
-            expr = self.parse_expression()
-            self.eat(TokenType.RPAREN)
-            return expr
+            operators.append(['paren', [], None, token])
+            return True
         elif token.type == TokenType.LBRACKET:
             self.eat(TokenType.LBRACKET)
-            elements = []
-            if self.current_token and self.current_token.type != TokenType.RBRACKET:
-                while True:
-                    elements.append(self.parse_expression())
-                    if not self.current_token or self.current_token.type == TokenType.RBRACKET:
-                        break
-                    self.eat(TokenType.COMMA)
-            self.eat(TokenType.RBRACKET)
-            return List(elements)
-        elif token.type in (TokenType.PLUS, TokenType.MINUS):
-            # Handle unary operators
-            operator = token.value
-            self.eat(token.type)
-            operand = self.parse_primary()
-            return UnaryOp(operator, operand)
+            return self.open_frame(operands, operators, ['list', [], None, token], TokenType.RBRACKET)
+        elif token.type == TokenType.LBRACE:
+            # Dict or set literal; the frame holds the keys or elements, the key awaiting its value and the values
+            self.eat(TokenType.LBRACE)
+            return self.open_frame(operands, operators, ['braces', [], None, token, []], TokenType.RBRACE)
         else:
-            # If we encounter an operator here, it's likely part of a larger expression
-            # Let the caller handle it
             return None
+        operands.append((self.locate(node, token), token))
+        return False
+
+    def open_frame(self, operands, operators, frame, closing):
+        """Push a bracket frame; returns whether an operand is expected inside it."""
+        operators.append(frame)
+        if self.current_token.type == closing:
+            # Empty brackets, e.g. f() or []
+            self.close_frame(operands, operators)
+            return False
+        return True
+
+    def add_to_frame(self, operands, frame):
+        """Move the operand completed inside a bracket frame into it."""
+        node, _ = operands.pop()
+        if frame[0] == 'braces' and frame[2] is not None:
+            frame[1].append(frame[2])
+            frame[4].append(node)
+            frame[2] = None
+        elif frame[0] == 'braces' and frame[4]:
+            raise SyntaxError(f"Expected ':' after a dict key at line {self.current_token.line}, column {self.current_token.column}")
+        else:
+            frame[1].append(node)
+
+    def close_frame(self, operands, operators):
+        """Eat the closing bracket of the innermost frame and push the operand it forms."""
+        frame = operators.pop()
+        kind, items, extra, token = frame[:4]
+        self.eat(CLOSING[kind])
+        if kind == 'paren':
+            node = items[0]
+        elif kind == 'call' and isinstance(extra, tuple):
+            node = MethodCall(extra[0], extra[1], items)
+        elif kind == 'call':
+            node = FunctionCall(extra, items)
+        elif kind == 'subscript':
+            node = ListAccess(extra, items[0])
+        elif kind == 'list':
+            node = List(items)
+        elif items and not frame[4]:
+            node = Set(items)
+        else:
+            node = Dict(items, frame[4])
+        operands.append((self.locate(node, token), token))
+
+    def reduce(self, operands, operators, precedence):
+        """Apply the pending operators that bind at least as tightly as precedence."""
+        while operators and (operators[-1][0] == 'unary'
+                             or (operators[-1][0] == 'binary' and operators[-1][2] >= precedence)):
+            kind, operator, detail = operators.pop()
+            if kind == 'unary':
+                operand, _ = operands.pop()
+                operands.append((self.locate(UnaryOp(operator, operand), detail), detail))
+                continue
+            right, _ = operands.pop()
+            left, start = operands.pop()
+            # Handle string concatenation
+            if operator == '+':
+                # If either operand is a string or str() call, treat as string concatenation
+                if isinstance(left, String) or isinstance(right, String) or \
+                   (isinstance(left, FunctionCall) and left.name == 'str') or \
+                   (isinstance(right, FunctionCall) and right.name == 'str'):
+                    # Convert non-string operands to strings
+                    if not isinstance(left, String) and not (isinstance(left, FunctionCall) and left.name == 'str'):
+                        left = FunctionCall('str', [left])
+                    if not isinstance(right, String) and not (isinstance(right, FunctionCall) and right.name == 'str'):
+                        right = FunctionCall('str', [right])
+            operands.append((self.locate(BinaryOp(left, operator, right), start), start))
+
+    def parse_formatted_string(self, token):
+        """Split an f-string token into literal String parts and parsed expressions."""
+        text = token.value
+        parts = []
+        literal = ""
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char in "{}" and text[i:i + 2] == char * 2:
+                # Escaped brace
+                literal += char
+                i += 2
+            elif char == "{":
+                depth = 1
+                j = i + 1
+                while j < len(text) and depth:
+                    if text[j] in "([{":
+                        depth += 1
+                    elif text[j] in ")]}":
+                        depth -= 1
+                    j += 1
+                if depth:
+                    raise SyntaxError(f"Unterminated '{{' in f-string at line {token.line}, column {token.column}")
+                source = text[i + 1:j - 1]
+                if not source.strip() or ":" in source or "!" in source.replace("!=", ""):
+                    raise SyntaxError(f"Unsupported f-string replacement field '{{{source}}}' at line {token.line}, column {token.column}")
+                if literal:
+                    parts.append(self.locate(String(literal), token))
+                    literal = ""
+                # Positions of the replacement field are rebased onto the f-string token
+                sub_tokens = Lexer(source.strip()).tokenize()
+                offset = token.column + 2 + i + 1 + len(source) - len(source.lstrip())
+                for sub_token in sub_tokens:
+                    sub_token.line = token.line
+                    sub_token.column += offset - 1
+                sub_parser = Parser(sub_tokens)
+                parts.append(sub_parser.parse_expression())
+                if sub_parser.current_token.type != TokenType.EOF:
+                    raise SyntaxError(f"Invalid expression '{{{source}}}' in f-string at line {token.line}, column {token.column}")
+                i = j
+            elif char == "}":
+                raise SyntaxError(f"Single '}}' in f-string at line {token.line}, column {token.column}")
+            else:
+                literal += char
+                i += 1
+        if literal:
+            parts.append(self.locate(String(literal), token))
+        return FormattedString(parts)
 
     def parse_function_call(self, name):
         """Parse a function call with its arguments."""
@@ -197,10 +359,23 @@ class Parser:
         self.eat(TokenType.RPAREN)
         return FunctionCall(name, args)
 
-    def parse_multiple_assignment(self):
-        """Parse multiple assignments like 'a, b = c, d' or 'arr[i], arr[j] = arr[j], arr[i]'."""
-        targets = []
+    def parse_method_call(self, receiver):
+        """Parse '.name(args)' after the receiver of a method call."""
+        self.eat(TokenType.DOT)
+        method = self.current_token.value
+        self.eat(TokenType.IDENTIFIER)
+        call = self.parse_function_call(method)
+        return MethodCall(receiver, method, call.args)
+
+    def parse_multiple_assignment(self, first_target):
+        """Parse multiple assignments like 'a, b = c, d' or 'arr[i], arr[j] = arr[j], arr[i]'.
+
+        first_target has already been parsed by the caller, which stopped at the comma.
+        The result is a list of assignments that take effect together.
+        """
+        targets = [first_target]
         values = []
+        self.eat(TokenType.COMMA)
         
         # Parse targets
         while True:
@@ -226,25 +401,15 @@ class Parser:
         
         # Parse values
         while True:
-            if self.current_token.type == TokenType.IDENTIFIER:
-                var_name = self.current_token.value
-                self.eat(TokenType.IDENTIFIER)
-                
-                # Check for list access
-                if self.current_token.type == TokenType.LBRACKET:
-                    self.eat(TokenType.LBRACKET)
-                    index = self.parse_expression()
-                    self.eat(TokenType.RBRACKET)
-                    values.append(ListAccess(Variable(var_name), index))
-                else:
-                    values.append(Variable(var_name))
-            else:
-                values.append(self.parse_expression())
+            values.append(self.parse_expression())
             
             if self.current_token.type != TokenType.COMMA:
                 break
             self.eat(TokenType.COMMA)
         
+        if len(targets) != len(values):
+            raise SyntaxError(f"Cannot assign {len(values)} values to {len(targets)} targets at line {self.current_token.line}")
+
         # Create assignments
         statements = []
         for target, value in zip(targets, values):
@@ -269,6 +434,8 @@ class Parser:
             return self.parse_return()
         elif self.current_token.type == TokenType.PRINT:
             return self.parse_print()
+        elif self.current_token.type in (TokenType.IMPORT, TokenType.FROM):
+            return self.parse_import()
         elif self.current_token.type == TokenType.IDENTIFIER:
             var_name = self.current_token.value
             self.eat(TokenType.IDENTIFIER)
@@ -276,6 +443,14 @@ class Parser:
             # Check for function call
             if self.current_token.type == TokenType.LPAREN:
                 return self.parse_function_call(var_name)
+
+            # Check for method call
+            if self.current_token.type == TokenType.DOT:
+                return self.parse_method_call(Variable(var_name))
+
+            # Check for tuple assignment to names, e.g. a, b = b, a + b
+            if self.current_token.type == TokenType.COMMA:
+                return self.parse_multiple_assignment(Variable(var_name))
             
             # Check for list assignment
             if self.current_token.type == TokenType.LBRACKET:
@@ -286,29 +461,28 @@ class Parser:
                 # Check for tuple unpacking
                 if self.current_token.type == TokenType.COMMA:
                     # Handle tuple unpacking assignment
-                    return self.parse_multiple_assignment()
+                    return self.parse_multiple_assignment(ListAccess(Variable(var_name), index))
                 
+                # Augmented item assignment, e.g. counts[k] += 1
+                if self.current_token.type in AUGMENTED_OPERATORS:
+                    operator = AUGMENTED_OPERATORS[self.current_token.type]
+                    self.eat(self.current_token.type)
+                    value = self.parse_expression()
+                    item = ListAccess(Variable(var_name), index)
+                    return ListAssignment(Variable(var_name), index, BinaryOp(item, operator, value))
+
                 # Regular list assignment
                 self.eat(TokenType.EQUALS)
                 value = self.parse_expression()
                 return ListAssignment(Variable(var_name), index, value)
             
             # Check for augmented assignment
-            if self.current_token.type in (TokenType.PLUS_EQUALS, TokenType.MINUS_EQUALS, 
-                                         TokenType.MULTIPLY_EQUALS, TokenType.DIVIDE_EQUALS,
-                                         TokenType.MODULO_EQUALS):
-                operator = self.current_token.value
+            if self.current_token.type in AUGMENTED_OPERATORS:
+                operator = AUGMENTED_OPERATORS[self.current_token.type]
                 self.eat(self.current_token.type)
                 value = self.parse_expression()
                 # Convert augmented assignment to regular assignment with binary operation
-                op_map = {
-                    '+=': '+',
-                    '-=': '-',
-                    '*=': '*',
-                    '/=': '/',
-                    '%=': '%'
-                }
-                binary_op = BinaryOp(Variable(var_name), op_map[operator], value)
+                binary_op = BinaryOp(Variable(var_name), operator, value)
                 return Assignment(Variable(var_name), binary_op)
             
             # Regular assignment
@@ -319,7 +493,7 @@ class Parser:
             else:
                 # If no equals sign, treat as an expression
                 return Variable(var_name)
-        elif self.current_token.type in (TokenType.PLUS, TokenType.MINUS, TokenType.STRING, TokenType.NUMBER, TokenType.FLOAT, TokenType.TRUE, TokenType.FALSE):
+        elif self.current_token.type in (TokenType.PLUS, TokenType.MINUS, TokenType.STRING, TokenType.FSTRING, TokenType.NUMBER, TokenType.FLOAT, TokenType.TRUE, TokenType.FALSE):
             # Handle expressions that start with operators or literals
             return self.parse_expression()
         else:
@@ -327,13 +501,15 @@ class Parser:
 
     def parse_if(self):
         """Parse an if statement."""
+        if_column = self.current_token.column
         self.eat(TokenType.IF)
         condition = self.parse_logical()
         self.eat(TokenType.COLON)
         body = self.parse_block()
         
         else_body = None
-        if self.current_token.type == TokenType.ELSE:
+        # An else only belongs to this if when it is aligned with it
+        if self.current_token.type == TokenType.ELSE and self.current_token.column == if_column:
             self.eat(TokenType.ELSE)
             self.eat(TokenType.COLON)
             else_body = self.parse_block()
@@ -357,6 +533,7 @@ class Parser:
         
         # Handle range() function
         if self.current_token.type == TokenType.RANGE:
+            range_token = self.current_token
             self.eat(TokenType.RANGE)
             self.eat(TokenType.LPAREN)
             
@@ -380,7 +557,7 @@ class Parser:
                 step = None
             
             self.eat(TokenType.RPAREN)
-            iterable = RangeCall(start, end, step)
+            iterable = self.locate(RangeCall(start, end, step), range_token)
         else:
             iterable = self.parse_expression()
         
@@ -416,6 +593,29 @@ class Parser:
         expression = self.parse_expression()
         return Return(expression)
 
+    def parse_import(self):
+        """Parse 'import a, b' or 'from a import x, y'."""
+        if self.current_token.type == TokenType.FROM:
+            self.eat(TokenType.FROM)
+            module = self.current_token.value
+            self.eat(TokenType.IDENTIFIER)
+            self.eat(TokenType.IMPORT)
+            names = [self.current_token.value]
+            self.eat(TokenType.IDENTIFIER)
+            while self.current_token.type == TokenType.COMMA:
+                self.eat(TokenType.COMMA)
+                names.append(self.current_token.value)
+                self.eat(TokenType.IDENTIFIER)
+            return ImportFrom(module, names)
+        self.eat(TokenType.IMPORT)
+        modules = [self.current_token.value]
+        self.eat(TokenType.IDENTIFIER)
+        while self.current_token.type == TokenType.COMMA:
+            self.eat(TokenType.COMMA)
+            modules.append(self.current_token.value)
+            self.eat(TokenType.IDENTIFIER)
+        return Import(modules)
+
     def parse_print(self):
         """Parse a print statement."""
         self.eat(TokenType.PRINT)
@@ -434,35 +634,41 @@ class Parser:
         return Print(expressions)
 
     def parse_block(self):
-        """Parse a block of statements."""
+        """Parse a block of statements.
+
+        The lexer does not emit indentation tokens, so the block extent is taken from
+        token positions: a body on the header line ends with that line, and an indented
+        body ends at the first statement that is not aligned with its first statement.
+        """
         statements = []
+        header_line = self.tokens[self.current_token_index - 1].line
+        block_line = self.current_token.line
+        block_column = self.current_token.column
         while self.current_token and self.current_token.type not in (TokenType.EOF, TokenType.ELSE):
             # Only parse statements, not function definitions, in blocks
             if self.current_token.type == TokenType.DEF:
                 # Skip nested function definitions (treat as top-level only)
                 break
-            statements.append(self.parse_statement())
+            if block_line == header_line:
+                if self.current_token.line != header_line:
+                    break
+            elif self.current_token.column != block_column:
+                break
+            token = self.current_token
+            statements.append(self.locate(self.parse_statement(), token))
         return statements
 
     def parse_logical(self):
-        """Parse logical operators (and, or)."""
-        print(f"Parsing logical at token: {self.current_token}")
-        left = self.parse_comparison()
-
-        while self.current_token and self.current_token.type in (TokenType.AND, TokenType.OR):
-            operator = self.current_token.value
-            self.eat(self.current_token.type)
-            right = self.parse_comparison()
-            left = BinaryOp(left, operator, right)
-
-        return left
+        """Parse a condition; and/or are the lowest-precedence operators of parse_expression."""
+        return self.parse_expression()
 
     def parse(self):
         """Parse multiple statements into an AST list."""
         statements = []
         while self.current_token and self.current_token.type != TokenType.EOF:
-            if self.current_token.type == TokenType.DEF:
-                statements.append(self.parse_function_def())
+            token = self.current_token
+            if token.type == TokenType.DEF:
+                statements.append(self.locate(self.parse_function_def(), token))
             else:
-                statements.append(self.parse_statement())
+                statements.append(self.locate(self.parse_statement(), token))
         return Program(statements)
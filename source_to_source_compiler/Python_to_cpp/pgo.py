@@ -0,0 +1,149 @@
+"""Profile-guided build of a transpiled Python program.
+
+Usage:
+    python pgo.py input.py output_binary [--train-input FILE] [--cache-dir DIR] [--cxx g++]
+
+The pipeline runs the user's training input three times against one cache entry:
+  1. an --instrument build records how often each Python if statement is taken,
+  2. the program is transpiled again with [[likely]]/[[unlikely]] on the hot branches
+     and built with -fprofile-generate to collect the compiler's own profile,
+  3. the same source is rebuilt with -fprofile-use into the final binary.
+
+Cache entries are keyed by the Python source and the compiler command, and record
+which training input produced them, so a later build with the same inputs reuses
+every artifact and a changed training input only re-runs the profiling steps.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from main import transpile
+from outputs import write_if_changed
+
+CXX_FLAGS = ["-std=c++20"]
+
+def load_branch_profile(path):
+    """Read the branch counters of an instrumented run as {(line, column): (evaluated, taken)}."""
+    with open(path) as f:
+        sites = json.load(f)["sites"]
+    return {
+        (site["line"], site["column"]): (site["calls"], site["taken"])
+        for site in sites if site["kind"] == "branch"
+    }
+
+def file_digest(path):
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class PGOBuild:
+    """One cache entry of the profile-guided pipeline."""
+
+    def __init__(self, input_file, cache_dir, cxx, train_input):
+        with open(input_file) as f:
+            self.source = f.read()
+        self.source_file = os.path.basename(input_file)
+        self.cxx = cxx
+        self.train_input = train_input
+        key = hashlib.sha256("\0".join([self.source, cxx] + CXX_FLAGS).encode()).hexdigest()[:16]
+        self.directory = os.path.abspath(os.path.join(cache_dir, key))
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest_path = self.path("manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def is_fresh(self, step, *artifacts):
+        """A step is reusable if it ran on the current training input and its artifacts exist."""
+        return (self.manifest.get(step) == file_digest(self.train_input)
+                and all(os.path.exists(self.path(name)) for name in artifacts))
+
+    def mark_done(self, step):
+        self.manifest[step] = file_digest(self.train_input)
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+
+    def write(self, name, content):
+        """Write an artifact only when it changed; returns its path and whether it was rewritten."""
+        path = self.path(name)
+        return path, write_if_changed(path, content)
+
+    def compile(self, source, binary, *flags):
+        # Compile and link separately so the -fprofile-* data file is named after
+        # the object file, which is the same in the generate and use builds.
+        obj = os.path.splitext(source)[0] + ".o"
+        self.run([self.cxx, *CXX_FLAGS, *flags, "-c", source, "-o", obj])
+        self.run([self.cxx, *flags, obj, "-o", binary])
+
+    def train(self, binary, env=None):
+        stdin = open(self.train_input, "rb") if self.train_input else subprocess.DEVNULL
+        try:
+            self.run([binary], stdin=stdin, stdout=subprocess.DEVNULL, env=env)
+        finally:
+            if self.train_input:
+                stdin.close()
+
+    def run(self, command, **kwargs):
+        print(" ".join(command))
+        subprocess.run(command, check=True, cwd=self.directory, **kwargs)
+
+    def build(self, output_binary):
+        # Step 1: branch frequencies per Python if statement
+        if not self.is_fresh("branches", "branches.json"):
+            print("Collecting branch profile...")
+            source, _ = self.write("instrumented.cpp", transpile(self.source, self.source_file, instrument=True)[0])
+            binary = self.path("instrumented")
+            self.compile(source, binary, "-O1")
+            env = dict(os.environ, PY_PROFILE_OUTPUT=self.path("branches.json"))
+            self.train(binary, env=env)
+            self.mark_done("branches")
+
+        # Step 2: hinted source, profiled by the compiler
+        branch_profile = load_branch_profile(self.path("branches.json"))
+        source, changed = self.write("program.cpp", transpile(self.source, self.source_file, branch_profile=branch_profile)[0])
+        profile_dir = self.path("gcda")
+        generate = [f"-fprofile-generate={profile_dir}"]
+        if changed or not self.is_fresh("gcda", "gcda"):
+            print("Collecting compiler profile...")
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            binary = self.path("program-generate")
+            self.compile(source, binary, "-O2", *generate)
+            self.train(binary)
+            # A new compiler profile invalidates the final binary
+            self.manifest.pop("program", None)
+            self.mark_done("gcda")
+
+        # Step 3: final optimized build
+        binary = self.path("program")
+        if not self.is_fresh("program", "program"):
+            print("Building with profile...")
+            self.compile(source, binary, "-O2", f"-fprofile-use={profile_dir}", "-fprofile-correction")
+            self.mark_done("program")
+        shutil.copy2(binary, output_binary)
+        print(f"\nProfile-guided binary has been written to {output_binary}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Build a transpiled Python file with profile-guided optimization.")
+    arg_parser.add_argument("input_file")
+    arg_parser.add_argument("output_binary")
+    arg_parser.add_argument("--train-input", help="file fed to the program's stdin during training runs")
+    arg_parser.add_argument("--cache-dir", default=".pgo_cache")
+    arg_parser.add_argument("--cxx", default="g++")
+    args = arg_parser.parse_args()
+    try:
+        PGOBuild(args.input_file, args.cache_dir, args.cxx, args.train_input).build(args.output_binary)
+    except subprocess.CalledProcessError as e:
+        print(f"Error during profile-guided build: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
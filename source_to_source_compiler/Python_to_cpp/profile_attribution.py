@@ -0,0 +1,83 @@
+"""Re-attribute a perf report or gprof listing of generated C++ to the original Python lines.
+
+Usage:
+    python profile_attribution.py output.cpp.map report.txt
+    perf report --stdio --sort srcline | python profile_attribution.py output.cpp.map
+
+Report lines that mention a generated source location (output.cpp:42) are mapped
+through the source map written by `main.py --source-map`; lines that only name a
+symbol are attributed to the Python `def` of that function. The first percentage
+on each line is summed per Python location to give a hotspot summary.
+"""
+import json
+import re
+import sys
+
+PERCENT = re.compile(r"^\s*(\d+(?:\.\d+)?)%?\s")
+
+class SourceMap:
+    """Lookup tables built from a JSON source map."""
+
+    def __init__(self, data):
+        self.source = data["source"]
+        self.generated = data["generated"]
+        self.lines = {cpp_line: py_line for cpp_line, py_line, _ in data["mappings"]}
+        self.functions = data["functions"]
+        self.location_pattern = re.compile(rf"(?<![\w.-]){re.escape(self.generated)}:(\d+)")
+        names = sorted(self.functions, key=len, reverse=True)
+        # Instantiated templates are named with their arguments, as in f<std::array<int, 6ul> >(...)
+        self.symbol_pattern = re.compile(
+            rf"(?<![\w:])({'|'.join(map(re.escape, names))})(?:<[^()]*>)?(?=\(|\s|$)") if names else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def attribute(self, line):
+        """Return the Python line a report line refers to, or None."""
+        match = self.location_pattern.search(line)
+        if match:
+            return self.lines.get(int(match.group(1)))
+        if self.symbol_pattern:
+            match = self.symbol_pattern.search(line)
+            if match:
+                return self.functions[match.group(1)]
+        return None
+
+def attribute_report(source_map, report_lines):
+    """Annotate report lines and total their percentages per Python line."""
+    annotated = []
+    totals = {}
+    for line in report_lines:
+        line = line.rstrip("\n")
+        py_line = source_map.attribute(line)
+        if py_line is None:
+            annotated.append(line)
+            continue
+        annotated.append(f"{line}    <- {source_map.source}:{py_line}")
+        match = PERCENT.match(line)
+        if match:
+            totals[py_line] = totals.get(py_line, 0.0) + float(match.group(1))
+    return annotated, totals
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+    source_map = SourceMap.load(sys.argv[1])
+    if len(sys.argv) == 3:
+        with open(sys.argv[2]) as f:
+            report_lines = f.readlines()
+    else:
+        report_lines = sys.stdin.readlines()
+
+    annotated, totals = attribute_report(source_map, report_lines)
+    print("\n".join(annotated))
+    if totals:
+        print(f"\nPython hotspots ({source_map.source}):")
+        for py_line, percent in sorted(totals.items(), key=lambda item: -item[1]):
+            print(f"{percent:8.2f}%  line {py_line}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Seeded generator of synthetic programs in the subset the transpiler supports.
+
+Usage:
+    python program_generator.py LINES [--seed N] [--depth N] [--expression-size N] [--list-size N]
+
+A program is a series of functions over ints followed by a main() that calls each
+of them once and prints the result. Every function binds its locals and a list at
+its top level, then runs nested range() loops and if/else statements that only
+reassign them, so every name is declared in the generated C++ before it is used.
+Values are kept small with `% 1009`, list indices are constants below the list size, and
+a function only calls one of the "leaf" functions (every tenth one, which call
+nothing), so the programs also run quickly under CPython and the evaluator.
+"""
+import argparse
+import random
+
+OPERATORS = ['+', '-', '*']
+COMPARISONS = ['<', '>', '<=', '>=', '==', '!=']
+LEAF_EVERY = 10
+
+class ProgramGenerator:
+    """Builds programs from a seed; the same seed and options give the same source."""
+
+    def __init__(self, seed=0, depth=3, expression_size=4, list_size=5, statements=4):
+        self.rng = random.Random(seed)
+        # Maximum nesting of loops and ifs inside a function body
+        self.depth = depth
+        # Binary operators per generated expression
+        self.expression_size = expression_size
+        self.list_size = list_size
+        # Statements per block
+        self.statements = statements
+
+    def generate(self, lines):
+        """Source of a program of at least the given number of lines."""
+        output = []
+        index = 0
+        while len(output) < lines:
+            output.extend(self.function(index))
+            output.append("")
+            index += 1
+        output.append("def main():")
+        for i in range(index):
+            output.append(f"    print(\"f{i}\", f{i}({i % 7}, {i % 5 + 1}))")
+        output.append("")
+        output.append('if __name__ == "__main__":')
+        output.append("    main()")
+        return "\n".join(output) + "\n"
+
+    def function(self, index):
+        self.names = ["a", "b"]
+        lines = [f"def f{index}(a, b):"]
+        elements = ", ".join(str(self.rng.randint(0, 99)) for _ in range(self.list_size))
+        lines.append(f"    values = [{elements}]")
+        for k in range(self.rng.randint(1, 3)):
+            lines.append(f"    x{k} = {self.expression()} % 1009")
+            self.names.append(f"x{k}")
+        if index % LEAF_EVERY:
+            callee = self.rng.randrange(0, index, LEAF_EVERY)
+            lines.append(f"    x0 = (x0 + f{callee}({self.expression(1)} % 1009, b)) % 1009")
+        lines.extend(self.block(1, 0))
+        lines.append(f"    return {self.expression()}")
+        return lines
+
+    def block(self, indent, depth):
+        prefix = "    " * indent
+        lines = []
+        for _ in range(self.rng.randint(1, self.statements)):
+            kind = self.rng.random() if depth < self.depth else 0
+            # Loop variables are read but never reassigned
+            target = self.rng.choice([name for name in self.names if name.startswith("x")])
+            if kind < 0.5:
+                lines.append(f"{prefix}{target} = {self.expression()} % 1009")
+            elif kind < 0.6:
+                lines.append(f"{prefix}values[{self.rng.randrange(self.list_size)}] = {self.expression()} % 1009")
+            elif kind < 0.8:
+                variable = f"i{depth}"
+                lines.append(f"{prefix}for {variable} in range({self.rng.randint(1, 4)}):")
+                self.names.append(variable)
+                lines.extend(self.block(indent + 1, depth + 1))
+                self.names.remove(variable)
+            else:
+                lines.append(f"{prefix}if {self.condition()}:")
+                lines.extend(self.block(indent + 1, depth + 1))
+                if self.rng.random() < 0.5:
+                    lines.append(f"{prefix}else:")
+                    lines.extend(self.block(indent + 1, depth + 1))
+        return lines
+
+    def condition(self):
+        comparison = f"{self.expression(1)} {self.rng.choice(COMPARISONS)} {self.expression(1)}"
+        if self.rng.random() < 0.3:
+            other = f"{self.expression(1)} {self.rng.choice(COMPARISONS)} {self.expression(1)}"
+            comparison = f"{comparison} {self.rng.choice(['and', 'or'])} {other}"
+        return comparison
+
+    def expression(self, size=None):
+        """A parenthesized int expression with size binary operators."""
+        size = self.expression_size if size is None else size
+        if size == 0:
+            return self.operand()
+        left = self.rng.randint(0, size - 1)
+        return f"({self.expression(left)} {self.rng.choice(OPERATORS)} {self.expression(size - 1 - left)})"
+
+    def operand(self):
+        choice = self.rng.random()
+        if choice < 0.5:
+            return self.rng.choice(self.names)
+        if choice < 0.8:
+            return str(self.rng.randint(0, 9))
+        if choice < 0.95:
+            return f"values[{self.rng.randrange(self.list_size)}]"
+        return "len(values)"
+
+def nested_program(depth):
+    """A program whose expressions nest depth levels deep.
+
+    It has a parenthesized sum, nested calls, repeated unary minus, nested list
+    indexing and an and/or chain, each depth levels deep, as machine-generated code
+    can; the transpiler must handle them without hitting the recursion limit.
+    """
+    lines = [
+        "def wrap(x):",
+        "    return x",
+        "",
+        "def nested(x):",
+        "    total = " + "(" * depth + "x" + " + 1)" * depth,
+        "    total = " + "wrap(" * depth + "total" + ")" * depth,
+        "    total = " + "-" * (2 * depth) + "total",
+        "    values = [0]",
+        "    total = total + " + "values[" * depth + "0" + "]" * depth,
+        "    if " + " and ".join(["total > 0"] * depth) + " or x == 0:",
+        "        total = total + 1",
+        "    return total",
+        "",
+        "def main():",
+        "    print(nested(1))",
+    ]
+    return "\n".join(lines) + "\n"
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("lines", type=int)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--depth", type=int, default=3)
+    arg_parser.add_argument("--expression-size", type=int, default=4)
+    arg_parser.add_argument("--list-size", type=int, default=5)
+    args = arg_parser.parse_args()
+    generator = ProgramGenerator(args.seed, args.depth, args.expression_size, args.list_size)
+    print(generator.generate(args.lines), end="")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Long-running transpile server speaking JSON lines.
+
+Usage:
+    python server.py [--socket PATH] [--workers N]
+
+Without --socket, requests are read from stdin and answered on stdout. Each request
+is one JSON object per line:
+
+    {"id": 1, "path": "my.py", "options": {"output": "out.cpp", "line_directives": true}}
+
+and gets one response line, in completion order:
+
+    {"id": 1, "ok": true, "path": "my.py", "cpp": "...", "source_map": {...}}
+    {"id": 1, "ok": false, "error": "..."}
+
+Options are passed to CodeGenerator, except "output" (write the C++ there if it
+changed, answering "written" instead of "cpp") and "source_map" (include the source map).
+Transpiling runs in a pool of worker processes that import the pipeline once,
+and results are cached by file path, modification time and options.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from main import transpile
+from outputs import write_if_changed
+
+CACHE_SIZE = 256
+SERVER_OPTIONS = ("output", "source_map")
+
+def warm_up():
+    """Load the lexer, parser and code generator (and compile the token regex) in a worker."""
+    transpile("def main():\n    print(1)\n")
+
+def transpile_file(path, options):
+    """Worker entry point: transpile one file with a fresh CodeGenerator."""
+    with open(path) as f:
+        source = f.read()
+    codegen_options = {key: value for key, value in options.items() if key not in SERVER_OPTIONS}
+    cpp_code, source_map = transpile(source, os.path.basename(path), **codegen_options)
+    return cpp_code, source_map
+
+class TranspileServer:
+    """Dispatches JSON-line requests to a worker pool and caches the results."""
+
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+        self.cache = OrderedDict()
+
+    async def handle_request(self, line):
+        request = {}
+        try:
+            request = json.loads(line)
+            path = request["path"]
+            options = request.get("options", {})
+            cpp_code, source_map = await self.transpile(path, options)
+            response = {"ok": True, "path": path}
+            if "output" in options:
+                response["written"] = write_if_changed(options["output"], cpp_code)
+            else:
+                response["cpp"] = cpp_code
+            if options.get("source_map"):
+                response["source_map"] = source_map
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        return json.dumps(response) + "\n"
+
+    async def transpile(self, path, options):
+        stat = os.stat(path)
+        codegen_options = {key: value for key, value in options.items() if key not in SERVER_OPTIONS}
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, json.dumps(codegen_options, sort_keys=True))
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.pool, transpile_file, path, options)
+        self.cache[key] = result
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return result
+
+    async def serve_stream(self, reader, write):
+        """Answer every request line from reader concurrently, writing responses as they finish."""
+        pending = set()
+
+        async def respond(line):
+            await write(await self.handle_request(line))
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(respond(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def serve_stdin(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        async def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        await self.serve_stream(reader, write)
+
+    async def serve_socket(self, path):
+        async def handle_client(reader, writer):
+            async def write(text):
+                writer.write(text.encode())
+                await writer.drain()
+
+            try:
+                await self.serve_stream(reader, write)
+            finally:
+                writer.close()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(handle_client, path=path)
+        print(f"Transpile server listening on {path}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve transpile requests as JSON lines.")
+    arg_parser.add_argument("--socket", help="listen on this Unix domain socket instead of stdin")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = arg_parser.parse_args()
+
+    server = TranspileServer(args.workers)
+    try:
+        if args.socket:
+            asyncio.run(server.serve_socket(args.socket))
+        else:
+            asyncio.run(server.serve_stdin())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,830 @@
+"""Task parallelism for divide-and-conquer recursion.
+
+quick_sort recurses on two disjoint parts of its list:
+
+    quick_sort(arr, low, pi - 1)
+    quick_sort(arr, pi + 1, high)
+
+TaskAnalysis summarizes every function by the elements of its list parameters it may
+index, as bounds relative to its int parameters (quick_sort: arr[low..high], written),
+and proves such bounds with difference constraints x - y <= c between the int
+variables of a function: if conditions, range() loops and assignments of a name plus
+a constant add constraints, `(a + b) // 2` lies between a and b when a <= b, and a
+counter incremented at most once per iteration of a range() loop grows no faster than
+the loop variable. A summary may assume one int parameter is at most another
+(partition needs low <= high), for the callers that prove it.
+
+Consecutive recursive calls of a function that prints nothing and only calls such
+functions and builtins form a TaskGroup (see ast_nodes.py) when no call assigns a
+name another one reads and, for every list they share, both calls only read it or
+index provably disjoint ranges. Those ranges hold as Python indices: the group is
+guarded by their lower ends being non-negative, so that no index wraps around.
+`return f(n - 1) + f(n - 2)` first stores the results of the two calls.
+"""
+from itertools import count, permutations
+
+from ast_nodes import (
+    Number, Variable, BinaryOp, UnaryOp, Assignment, IfStatement, WhileLoop, ForLoop, RangeCall,
+    FunctionDef, FunctionCall, MethodCall, Return, Print, List, ListAccess, ListAssignment, LenCall,
+    TaskGroup
+)
+from analysis import walk, assigned_names
+
+# The constant 0 and the index of an access, as variables of the constraints
+ZERO = ''
+INDEX = ' index'
+# Builtins that neither print nor change anything but their result
+HARMLESS_BUILTINS = {'len', 'abs', 'min', 'max', 'sum', 'int', 'float', 'str', 'bool', 'range', 'sorted', 'list'}
+NEGATED = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+# Operators combining the results of two calls, which are then computed by two tasks
+COMBINING = ('+', '-', '*')
+
+class Differences:
+    """Constraints x - y <= c between int variables, closed under transitivity."""
+
+    def __init__(self):
+        self.bounds = {}
+        self.names = {ZERO}
+        # No execution reaches this point, e.g. after a return
+        self.infeasible = False
+
+    def copy(self):
+        other = Differences()
+        other.bounds = dict(self.bounds)
+        other.names = set(self.names)
+        other.infeasible = self.infeasible
+        return other
+
+    def get(self, x, y):
+        """The least known c with x - y <= c, or None."""
+        return 0 if x == y else self.bounds.get((x, y))
+
+    def add(self, x, y, c):
+        """Assume x - y <= c."""
+        if self.infeasible:
+            return
+        known = self.get(x, y)
+        if known is not None and known <= c:
+            return
+        self.names.update((x, y))
+        # The paths u -> x -> y -> v through the new constraint
+        tails = [(u, self.get(u, x)) for u in self.names]
+        heads = [(v, self.get(y, v)) for v in self.names]
+        updates = {}
+        for u, to_x in tails:
+            if to_x is None:
+                continue
+            for v, from_y in heads:
+                if from_y is None:
+                    continue
+                length = to_x + c + from_y
+                if u == v:
+                    if length < 0:
+                        self.infeasible = True
+                        return
+                elif self.get(u, v) is None or length < self.get(u, v):
+                    updates[u, v] = length
+        self.bounds.update(updates)
+
+    def add_equal(self, x, y, c):
+        """Assume x - y == c."""
+        self.add(x, y, c)
+        self.add(y, x, -c)
+
+    def forget(self, name):
+        """Drop the constraints on name, which is assigned."""
+        if name in self.names:
+            self.names.discard(name)
+            self.bounds = {pair: c for pair, c in self.bounds.items() if name not in pair}
+
+    def forget_upper(self, name):
+        """Drop the upper bounds of name, which grows."""
+        self.bounds = {pair: c for pair, c in self.bounds.items() if pair[0] != name}
+
+    def shift(self, name, c):
+        """Update the constraints for name += c."""
+        self.bounds = {(x, y): k + (c if x == name else 0) - (c if y == name else 0)
+                       for (x, y), k in self.bounds.items()}
+
+def unreachable():
+    state = Differences()
+    state.infeasible = True
+    return state
+
+def join(first, second):
+    """The constraints holding after either of two paths."""
+    if first.infeasible:
+        return second.copy()
+    if second.infeasible:
+        return first.copy()
+    state = Differences()
+    state.names = first.names | second.names
+    state.bounds = {pair: max(c, second.bounds[pair]) for pair, c in first.bounds.items() if pair in second.bounds}
+    return state
+
+def affine(expr):
+    """expr as (name, c) standing for name + c, with name ZERO for a constant; or None."""
+    if isinstance(expr, Number) and isinstance(expr.value, int):
+        return ZERO, expr.value
+    if isinstance(expr, Variable):
+        return expr.name, 0
+    if isinstance(expr, UnaryOp) and expr.operator == '-' and isinstance(expr.operand, Number):
+        return ZERO, -expr.operand.value
+    if isinstance(expr, BinaryOp) and expr.op in ('+', '-'):
+        left, right = affine(expr.left), affine(expr.right)
+        if left is None or right is None:
+            return None
+        if expr.op == '-':
+            return (left[0], left[1] - right[1]) if right[0] == ZERO else None
+        if right[0] == ZERO:
+            return left[0], left[1] + right[1]
+        if left[0] == ZERO:
+            return right[0], left[1] + right[1]
+    return None
+
+def difference(expr):
+    """expr as (x, y, c) standing for x - y + c, with ZERO for a missing name; or None."""
+    value = affine(expr)
+    if value is not None:
+        return value[0], ZERO, value[1]
+    if isinstance(expr, BinaryOp) and expr.op == '-':
+        left, right = affine(expr.left), affine(expr.right)
+        if left is not None and right is not None:
+            return left[0], right[0], left[1] - right[1]
+    return None
+
+def expression(name, c):
+    """The AST of name + c."""
+    if name == ZERO:
+        return Number(c)
+    if c == 0:
+        return Variable(name)
+    return BinaryOp(Variable(name), '+' if c > 0 else '-', Number(abs(c)))
+
+def assume(state, condition, holds):
+    """Add the constraints following from condition being holds (True or False)."""
+    if isinstance(condition, UnaryOp) and condition.operator == 'not':
+        return assume(state, condition.operand, not holds)
+    if not isinstance(condition, BinaryOp):
+        return state
+    if condition.op in ('and', 'or'):
+        # Both operands hold for a true and, and neither for a false or
+        if (condition.op == 'and') == holds:
+            assume(state, condition.left, holds)
+            assume(state, condition.right, holds)
+        return state
+    if condition.op not in NEGATED:
+        return state
+    left, right = difference(condition.left), difference(condition.right)
+    if left is None or right is None:
+        return state
+    # left - right is x - y + c when the other names cancel out or are ZERO
+    added = [name for name in (left[0], right[1]) if name != ZERO]
+    subtracted = [name for name in (left[1], right[0]) if name != ZERO]
+    for name in list(added):
+        if name in subtracted:
+            added.remove(name)
+            subtracted.remove(name)
+    if len(added) > 1 or len(subtracted) > 1:
+        return state
+    x, y, c = (added or [ZERO])[0], (subtracted or [ZERO])[0], left[2] - right[2]
+    op = condition.op if holds else NEGATED[condition.op]
+    if op in ('<', '<=', '=='):
+        state.add(x, y, -c - (op == '<'))
+    if op in ('>', '>=', '=='):
+        state.add(y, x, c - (op == '>'))
+    return state
+
+def target_name(assignment):
+    return assignment.name.name if isinstance(assignment.name, Variable) else assignment.name
+
+def assignments(body, nested=False):
+    """Yield (assignment, whether it is in a loop nested in body) for the assignments in body."""
+    for stmt in body:
+        if isinstance(stmt, list):
+            yield from ((item, nested) for item in stmt if isinstance(item, Assignment))
+        elif isinstance(stmt, Assignment):
+            yield stmt, nested
+        elif isinstance(stmt, IfStatement):
+            yield from assignments(stmt.body, nested)
+            yield from assignments(stmt.else_body or [], nested)
+        elif isinstance(stmt, (WhileLoop, ForLoop)):
+            yield from assignments(stmt.body, True)
+
+def counters(body):
+    """The names body assigns only by one `name += 1` outside nested loops."""
+    found = {}
+    for assignment, nested in assignments(body):
+        name = target_name(assignment)
+        value = assignment.value
+        increment = (not nested and isinstance(value, BinaryOp) and value.op == '+'
+                     and affine(value) == (name, 1))
+        found[name] = increment and name not in found
+    loop_names = {node.var_name for node, _ in walk(body) if isinstance(node, ForLoop)}
+    return {name for name, increment in found.items() if increment and name not in loop_names}
+
+def index_constraints(index):
+    """The constraints on INDEX for an access at index: none when it is not affine."""
+    value = affine(index)
+    if value is None:
+        return []
+    return [(INDEX, value[0], value[1]), (value[0], INDEX, -value[1])]
+
+def merge_bounds(bounds, lower, upper):
+    """Widen the (lower, upper) offsets bounds, or None, by another pair of them."""
+    if bounds is None:
+        return lower, upper
+    return ({p: min(offset, lower[p]) for p, offset in bounds[0].items() if p in lower},
+            {p: max(offset, upper[p]) for p, offset in bounds[1].items() if p in upper})
+
+class Footprint:
+    """The elements of a list parameter calls of a function may index.
+
+    lower and upper map int parameters (or ZERO) to offsets: every index i satisfies
+    i >= p + lower[p] and i <= p + upper[p]. Both are None when no element is
+    indexed; an empty dict leaves that side unbounded.
+    """
+    def __init__(self, lower, upper, writes):
+        self.lower = lower
+        self.upper = upper
+        self.writes = writes
+
+class Summary:
+    """What calls of a function access and return, assuming its precondition."""
+    def __init__(self, precondition, footprints, returns):
+        # (p, q) assumes the int parameter p is at most q; None assumes nothing
+        self.precondition = precondition
+        # List parameter -> Footprint, or None when the list may be resized or leaked
+        self.footprints = footprints
+        # (lower, upper) offsets bounding the returned int like a Footprint's, or None
+        self.returns = returns
+
+class Run:
+    """One pass of the constraint analysis over the body of func, from the entry state."""
+
+    def __init__(self, analysis, func, entry):
+        self.analysis = analysis
+        self.func = func
+        self.lists = analysis.lists[func.name]
+        # List parameter -> (state, constraints on INDEX, writes) per access of its elements
+        self.accesses = {name: [] for name in self.lists}
+        # (state, call) for the calls of func itself
+        self.recursive = []
+        # (state, value) for the return statements
+        self.returns = []
+        # id() of a statement -> state before it
+        self.states = {}
+        self.block(func.body, entry)
+
+    def record(self, name, state, constraints, writes):
+        if not state.infeasible:
+            self.accesses[name].append((state.copy(), constraints, writes))
+
+    def block(self, body, state):
+        for stmt in body:
+            if isinstance(stmt, (Assignment, Return, FunctionCall)):
+                self.states[id(stmt)] = state.copy()
+            state = self.statement(stmt, state)
+        return state
+
+    def statement(self, stmt, state):
+        if isinstance(stmt, list):
+            # Tuple assignment: every value is computed before any target is assigned
+            for item in stmt:
+                self.expression(item.value, state)
+                if isinstance(item, ListAssignment):
+                    self.store(item, state)
+            for item in stmt:
+                if isinstance(item, Assignment):
+                    state.forget(target_name(item))
+            return state
+        if isinstance(stmt, Assignment):
+            self.expression(stmt.value, state)
+            self.assign(target_name(stmt), stmt.value, state)
+            return state
+        if isinstance(stmt, ListAssignment):
+            self.expression(stmt.value, state)
+            self.store(stmt, state)
+            return state
+        if isinstance(stmt, IfStatement):
+            self.expression(stmt.condition, state)
+            taken = self.block(stmt.body, assume(state.copy(), stmt.condition, True))
+            return join(taken, self.block(stmt.else_body or [], assume(state, stmt.condition, False)))
+        if isinstance(stmt, WhileLoop):
+            for name in assigned_names(stmt.body):
+                state.forget(name)
+            self.expression(stmt.condition, state)
+            self.block(stmt.body, assume(state.copy(), stmt.condition, True))
+            return assume(state, stmt.condition, False)
+        if isinstance(stmt, ForLoop):
+            return self.for_loop(stmt, state)
+        if isinstance(stmt, Return):
+            if stmt.value is not None:
+                self.expression(stmt.value, state)
+            if not state.infeasible:
+                self.returns.append((state.copy(), stmt.value))
+            return unreachable()
+        if isinstance(stmt, FunctionDef):
+            return state
+        self.expression(stmt, state)
+        return state
+
+    def for_loop(self, loop, state):
+        """The state after loop, from the state before it.
+
+        The body starts from the facts on the names it does not assign, plus bounds
+        on the loop variable and the counters for a range() with affine bounds.
+        """
+        iterable = loop.iterable
+        name = loop.var_name
+        assigned = assigned_names(loop.body)
+        bounds = None
+        if isinstance(iterable, RangeCall):
+            for bound in (iterable.start, iterable.end, iterable.step):
+                if bound is not None:
+                    self.expression(bound, state)
+            step = iterable.step
+            if step is None or (isinstance(step, Number) and isinstance(step.value, int) and step.value > 0):
+                start, end = affine(iterable.start), affine(iterable.end)
+                if start is not None and end is not None and name not in assigned:
+                    bounds = start, end
+        else:
+            self.expression(iterable, state)
+        grown = counters(loop.body) if bounds is not None and iterable.step is None else set()
+        entry = state.copy()
+        for assigned_name in (assigned - grown) | {name}:
+            entry.forget(assigned_name)
+        if bounds is None:
+            exit = join(entry, self.block(loop.body, entry.copy()))
+            exit.forget(name)
+            return exit
+        (start, start_c), (end, end_c) = bounds
+        for counter in grown:
+            # counter - name never exceeds its value before the loop minus the start
+            before = state.get(counter, start)
+            entry.forget_upper(counter)
+            if before is not None:
+                entry.add(counter, name, before - start_c)
+        entry.add(start, name, -start_c)
+        entry.add(name, end, end_c - 1)
+        last = self.block(loop.body, entry)
+        # After the last iteration name == end - 1; without one, end <= start
+        last.add_equal(name, end, end_c - 1)
+        skipped = state.copy()
+        skipped.add(end, start, start_c - end_c)
+        exit = join(skipped, last)
+        exit.forget(name)
+        return exit
+
+    def assign(self, name, value, state):
+        target = affine(value)
+        if target is not None and target[0] == name:
+            state.shift(name, target[1])
+            return
+        facts = []
+        if target is not None:
+            facts = [(name, target[0], target[1]), (target[0], name, -target[1])]
+        elif (isinstance(value, BinaryOp) and value.op == '//' and isinstance(value.right, Number)
+              and value.right.value == 2 and isinstance(value.left, BinaryOp) and value.left.op == '+'):
+            # A midpoint (a + b) // 2 lies between a and b when a <= b
+            low, high = affine(value.left.left), affine(value.left.right)
+            if low is not None and high is not None:
+                gap = state.get(low[0], high[0])
+                if gap is not None and gap <= high[1] - low[1]:
+                    facts = [(low[0], name, -low[1]), (name, high[0], high[1])]
+        elif isinstance(value, FunctionCall) and value.name in self.analysis.functions and value.name != self.func.name:
+            summary = self.analysis.applicable(value, state)
+            if summary is not None and summary.returns is not None:
+                lower, upper = summary.returns
+                callee = self.analysis.functions[value.name]
+                facts = ([(y, name, -(c + offset)) for y, c, offset in bind(lower, callee, value.args)]
+                         + [(name, y, c + offset) for y, c, offset in bind(upper, callee, value.args)])
+        state.forget(name)
+        for x, y, c in facts:
+            # A fact relating the old value of name to the new one no longer holds
+            if x != y:
+                state.add(x, y, c)
+
+    def store(self, assignment, state):
+        """Record the element write of a ListAssignment."""
+        self.expression(assignment.index, state)
+        target = assignment.list_expr
+        if isinstance(target, Variable):
+            if target.name in self.lists:
+                self.record(target.name, state, index_constraints(assignment.index), True)
+            return
+        # An item of a nested list: its whole outer list counts as written
+        for node, _ in walk(target):
+            if isinstance(node, Variable) and node.name in self.lists:
+                self.record(node.name, state, [], True)
+
+    def expression(self, expr, state):
+        """Record the element accesses and calls in expr."""
+        for node, parent in walk(expr):
+            if isinstance(node, ListAccess):
+                if isinstance(node.list_expr, Variable) and node.list_expr.name in self.lists:
+                    self.record(node.list_expr.name, state, index_constraints(node.index), False)
+            elif isinstance(node, FunctionCall):
+                self.call(node, state)
+            elif isinstance(node, Variable) and node.name in self.lists:
+                if isinstance(parent, ListAccess) and parent.list_expr is node:
+                    continue
+                if isinstance(parent, (FunctionCall, LenCall)):
+                    continue
+                # Iterated, printed, searched or receiving a method call: any element
+                self.record(node.name, state, [], isinstance(parent, MethodCall))
+
+    def call(self, call, state):
+        """Record the elements of the lists passed to call that it may access."""
+        callee = self.analysis.functions.get(call.name)
+        if callee is self.func:
+            if not state.infeasible:
+                self.recursive.append((state.copy(), call))
+            return
+        summary = self.analysis.applicable(call, state) if callee is not None else None
+        for position, arg in enumerate(call.args):
+            if not (isinstance(arg, Variable) and arg.name in self.lists):
+                continue
+            if callee is None:
+                if call.name != 'len':
+                    self.record(arg.name, state, [], call.name not in HARMLESS_BUILTINS)
+                continue
+            footprint = None
+            if summary is not None and position < len(callee.params):
+                footprint = summary.footprints.get(callee.params[position])
+            if footprint is None:
+                self.record(arg.name, state, [], True)
+            elif footprint.lower is not None:
+                self.record(arg.name, state, footprint_constraints(footprint, callee, call.args), footprint.writes)
+
+def bind(offsets, callee, args):
+    """(y, c, offset) for each parameter p in offsets whose argument is y + c."""
+    bound = []
+    for param, offset in offsets.items():
+        value = (ZERO, 0)
+        if param != ZERO:
+            position = callee.params.index(param)
+            value = affine(args[position]) if position < len(args) else None
+        if value is not None:
+            bound.append((value[0], value[1], offset))
+    return bound
+
+def footprint_constraints(footprint, callee, args):
+    """The constraints on INDEX for the elements a call with args indexes."""
+    return ([(y, INDEX, -(c + offset)) for y, c, offset in bind(footprint.lower, callee, args)]
+            + [(INDEX, y, c + offset) for y, c, offset in bind(footprint.upper, callee, args)])
+
+class TaskAnalysis:
+    """Finds the independent recursive calls of a module's functions, see the module docstring.
+
+    lists maps each function to its list parameters: arr and the parameters
+    is_container(func, param) accepts, plus those passed on as such; safe_params are
+    the parameters ListEscapeAnalysis proved are never resized or leaked.
+    """
+
+    def __init__(self, function_defs, safe_params, is_container):
+        self.functions = {func.name: func for func in function_defs}
+        self.safe_params = safe_params
+        self.lists = {func.name: {param for param in func.params if param == 'arr' or is_container(func, param)}
+                      for func in function_defs}
+        changed = True
+        while changed:
+            changed = False
+            for func in function_defs:
+                for node, _ in walk(func.body):
+                    callee = self.functions.get(node.name) if isinstance(node, FunctionCall) else None
+                    if callee is None:
+                        continue
+                    for param, arg in zip(callee.params, node.args):
+                        if (param in self.lists[callee.name] and isinstance(arg, Variable)
+                                and arg.name in func.params and arg.name not in self.lists[func.name]):
+                            self.lists[func.name].add(arg.name)
+                            changed = True
+        self.harmless = self.harmless_functions(function_defs)
+        # Function name -> (unconditional Summary, Summary with a precondition or None)
+        self.summaries = {}
+        self.pending = set()
+        # Function name -> {id() of a statement: (statements replaced, replacement)}
+        self.replacements = {}
+        for func in function_defs:
+            if func.name in self.harmless and func.name != 'main':
+                replacements = {}
+                run = Run(self, func, Differences())
+                self.find_groups(func, func.body, run, replacements, count())
+                if replacements:
+                    self.replacements[func.name] = replacements
+        # Functions with task groups; they are not constexpr
+        self.parallel_functions = set(self.replacements)
+
+    def harmless_functions(self, function_defs):
+        """Functions that print nothing and call only builtins and such functions."""
+        harmless = set(self.functions)
+        changed = True
+        while changed:
+            changed = False
+            for func in function_defs:
+                if func.name in harmless and not self.is_harmless(func, harmless):
+                    harmless.discard(func.name)
+                    changed = True
+        return harmless
+
+    def is_harmless(self, func, harmless):
+        local_names = assigned_names(func.body) - set(func.params)
+        for node, _ in walk(func.body):
+            if isinstance(node, Print):
+                return False
+            if isinstance(node, FunctionCall) and node.name not in harmless and node.name not in HARMLESS_BUILTINS:
+                return False
+            # Methods of modules, or of lists the caller may share
+            if isinstance(node, MethodCall) and not (isinstance(node.receiver, Variable) and node.receiver.name in local_names):
+                return False
+        return True
+
+    def summary(self, name):
+        """(unconditional, conditional) Summary of function name, or None while it is computed."""
+        if name in self.summaries:
+            return self.summaries[name]
+        if name in self.pending:
+            return None
+        self.pending.add(name)
+        func = self.functions[name]
+        anchors = self.anchors(func)
+        unconditional = self.summarize(func, None, anchors)
+        conditional = None
+        if any(footprint is not None and footprint.lower is not None and not (footprint.lower and footprint.upper)
+               for footprint in unconditional.footprints.values()):
+            for precondition in permutations(anchors[1:], 2):
+                candidate = self.summarize(func, precondition, anchors)
+                if all(footprint is None or footprint.lower is None or (footprint.lower and footprint.upper)
+                       for footprint in candidate.footprints.values()):
+                    conditional = candidate
+                    break
+        self.pending.discard(name)
+        self.summaries[name] = unconditional, conditional
+        return self.summaries[name]
+
+    def applicable(self, call, state):
+        """The best Summary of call's function whose precondition holds in state, or None."""
+        summaries = self.summary(call.name)
+        if summaries is None:
+            return None
+        unconditional, conditional = summaries
+        if conditional is not None:
+            callee = self.functions[call.name]
+            bound = bind(dict.fromkeys(conditional.precondition, 0), callee, call.args)
+            if len(bound) == 2:
+                (low, low_c, _), (high, high_c, _) = bound
+                gap = state.get(low, high)
+                if gap is not None and gap <= high_c - low_c:
+                    return conditional
+        return unconditional
+
+    def anchors(self, func):
+        """ZERO and the int parameters func never assigns, which bounds are relative to."""
+        assigned = assigned_names(func.body)
+        return [ZERO] + [param for param in func.params if param not in self.lists[func.name] and param not in assigned]
+
+    def summarize(self, func, precondition, anchors):
+        entry = Differences()
+        if precondition is not None:
+            entry.add(precondition[0], precondition[1], 0)
+        run = Run(self, func, entry)
+        footprints = {name: self.footprint(func, run, name, anchors) for name in self.lists[func.name]}
+        returns = None
+        for state, value in run.returns:
+            target = affine(value) if value is not None else None
+            if target is None:
+                returns = None
+                break
+            y, c = target
+            returns = merge_bounds(
+                returns,
+                {p: c - state.get(p, y) for p in anchors if state.get(p, y) is not None},
+                {p: c + state.get(y, p) for p in anchors if state.get(y, p) is not None})
+        return Summary(precondition, footprints, returns)
+
+    def footprint(self, func, run, name, anchors):
+        """The Footprint of func on its list parameter name, given run."""
+        if name not in self.safe_params[func.name]:
+            return None
+        calls = []
+        for state, call in run.recursive:
+            positions = [position for position, arg in enumerate(call.args)
+                         if isinstance(arg, Variable) and arg.name == name]
+            # Passed on as another parameter, the list is indexed by other bounds
+            if any(position >= len(func.params) or func.params[position] != name for position in positions):
+                return None
+            if positions:
+                calls.append((state, call))
+        accesses = run.accesses[name]
+        writes = any(writes for _, _, writes in accesses)
+        bounds = self.index_bounds(accesses, anchors)
+        if bounds is None:
+            # Recursive calls index nothing either
+            return Footprint(None, None, False)
+        # The recursive calls must stay within the bounds; narrow them until they do
+        while True:
+            footprint = Footprint(*bounds, writes)
+            for state, call in calls:
+                found = self.index_bounds([(state, footprint_constraints(footprint, func, call.args), writes)], anchors)
+                if found is not None:
+                    bounds = ({p: offset for p, offset in bounds[0].items() if found[0].get(p, offset - 1) >= offset},
+                              {p: offset for p, offset in bounds[1].items() if found[1].get(p, offset + 1) <= offset})
+            if bounds == (footprint.lower, footprint.upper):
+                return footprint
+
+    def index_bounds(self, accesses, anchors):
+        """(lower, upper) offsets from anchors bounding the indices of accesses, or None for none."""
+        bounds = None
+        for state, constraints, _ in accesses:
+            state = state.copy()
+            for x, y, c in constraints:
+                state.add(x, y, c)
+            if state.infeasible:
+                continue
+            bounds = merge_bounds(
+                bounds,
+                {p: -state.get(p, INDEX) for p in anchors if state.get(p, INDEX) is not None},
+                {p: state.get(INDEX, p) for p in anchors if state.get(INDEX, p) is not None})
+        return bounds
+
+    def find_groups(self, func, body, run, replacements, temporaries):
+        """Record the TaskGroups replacing runs of statements of body and its if statements."""
+        position = 0
+        while position < len(body):
+            stmt = body[position]
+            if isinstance(stmt, IfStatement):
+                self.find_groups(func, stmt.body, run, replacements, temporaries)
+                self.find_groups(func, stmt.else_body or [], run, replacements, temporaries)
+            state = run.states.get(id(stmt))
+            if state is None or state.infeasible:
+                position += 1
+                continue
+            value = stmt.value if isinstance(stmt, (Assignment, Return)) else None
+            if (isinstance(value, BinaryOp) and value.op in COMBINING
+                    and self.is_recursive(func, value.left) and self.is_recursive(func, value.right)):
+                # Compute both operands into temporaries, each by a task
+                names = [f"py_result{next(temporaries)}" for _ in range(2)]
+                members = [(operand, name, Assignment(Variable(name), operand))
+                           for operand, name in zip((value.left, value.right), names)]
+                for operand, _, assignment in members:
+                    assignment.line, assignment.column = operand.line, operand.column
+                group = self.group(func, state, members)
+                if group is not None:
+                    combined = BinaryOp(Variable(names[0]), value.op, Variable(names[1]))
+                    combined.line, combined.column = value.line, value.column
+                    rest = Return(combined) if isinstance(stmt, Return) else Assignment(stmt.name, combined)
+                    rest.line, rest.column = stmt.line, stmt.column
+                    replacements[id(stmt)] = 1, [group, rest]
+                position += 1
+                continue
+            members = []
+            for candidate in body[position:]:
+                member = self.member(func, candidate)
+                if member is None or any(self.independent(func, state, other, member) is None for other in members):
+                    break
+                members.append(member)
+            group = self.group(func, state, members) if len(members) > 1 else None
+            if group is not None:
+                replacements[id(stmt)] = len(members), [group]
+                position += len(members)
+            else:
+                position += 1
+
+    def is_recursive(self, func, expr):
+        return isinstance(expr, FunctionCall) and expr.name == func.name
+
+    def member(self, func, stmt):
+        """(call, assigned name or None, stmt) for a statement calling func, or None."""
+        if self.is_recursive(func, stmt):
+            return stmt, None, stmt
+        if (isinstance(stmt, Assignment) and isinstance(stmt.name, Variable)
+                and self.is_recursive(func, stmt.value)):
+            return stmt.value, stmt.name.name, stmt
+        return None
+
+    def group(self, func, state, members):
+        """The TaskGroup running members in parallel, or None when they may interfere."""
+        guards = []
+        for position, member in enumerate(members):
+            for other in members[:position]:
+                found = self.independent(func, state, other, member)
+                if found is None:
+                    return None
+                guards.extend(guard for guard in found if guard not in guards)
+        # A guard is redundant when another one is at most as large
+        needed = []
+        for y, c in guards:
+            if not any(state.get(z, y) is not None and state.get(z, y) <= c - d for z, d in needed):
+                needed.append((y, c))
+        sizes = [self.size(func, state, call) for call, _, _ in members[:-1]]
+        return TaskGroup([stmt for _, _, stmt in members], sizes, [expression(*guard) for guard in needed])
+
+    def independent(self, func, state, first, second):
+        """The (name, c) whose name + c must be non-negative for two calls to run in parallel, or None."""
+        (first_call, first_target, _), (second_call, second_target, _) = first, second
+        first_reads = {node.name for node, _ in walk(first_call.args) if isinstance(node, Variable)}
+        second_reads = {node.name for node, _ in walk(second_call.args) if isinstance(node, Variable)}
+        if first_target is not None and (first_target == second_target or first_target in second_reads):
+            return None
+        if second_target is not None and second_target in first_reads:
+            return None
+        if len(first_call.args) != len(func.params) or len(second_call.args) != len(func.params):
+            return None
+        first_summary, second_summary = self.applicable(first_call, state), self.applicable(second_call, state)
+        guards = []
+        for param, arg in zip(func.params, first_call.args):
+            if param not in self.lists[func.name] or isinstance(arg, List):
+                continue
+            if not isinstance(arg, Variable):
+                return None
+            for other_param, other in zip(func.params, second_call.args):
+                if other_param not in self.lists[func.name] or isinstance(other, List):
+                    continue
+                if not isinstance(other, Variable):
+                    return None
+                found = self.disjoint(func, state, (first_summary.footprints[param], first_call),
+                                      (second_summary.footprints[other_param], second_call))
+                if found is None:
+                    return None
+                guards.extend(found)
+        return guards
+
+    def disjoint(self, func, state, first, second):
+        """The guards under which two calls' Footprints on a list they may share do not interfere, or None."""
+        (first, first_call), (second, second_call) = first, second
+        if first is None or second is None:
+            return None
+        if first.lower is None or second.lower is None or not (first.writes or second.writes):
+            return []
+        for (low, low_call), (high, high_call) in (((first, first_call), (second, second_call)),
+                                                   ((second, second_call), (first, first_call))):
+            # Every index of the low call is below every index of the high one
+            for y, c, offset in bind(low.upper, func, low_call.args):
+                for z, d, other_offset in bind(high.lower, func, high_call.args):
+                    gap = state.get(y, z)
+                    if gap is not None and gap <= d + other_offset - c - offset - 1:
+                        low_guards = self.guards(func, state, low, low_call)
+                        high_guards = self.guards(func, state, high, high_call)
+                        if low_guards is None or high_guards is None:
+                            return None
+                        return low_guards + high_guards
+        return None
+
+    def guards(self, func, state, footprint, call):
+        """[] when no index of call is negative, [(name, c)] when name + c >= 0 ensures it, or None."""
+        lower = bind(footprint.lower, func, call.args)
+        if not lower:
+            return None
+        for y, c, offset in lower:
+            known = state.get(ZERO, y)
+            if known is not None and known <= c + offset:
+                return []
+        y, c, offset = lower[0]
+        return [(y, c + offset)]
+
+    def size(self, func, state, call):
+        """The number of elements a call indexes at most, as an AST, or None."""
+        summary = self.applicable(call, state)
+        for param, footprint in summary.footprints.items():
+            if footprint is None or not footprint.lower or not footprint.upper:
+                continue
+            lower, upper = bind(footprint.lower, func, call.args), bind(footprint.upper, func, call.args)
+            if not lower or not upper:
+                continue
+            (low, low_c, low_offset), (high, high_c, high_offset) = lower[0], upper[0]
+            c = high_c + high_offset - low_c - low_offset + 1
+            if low == high:
+                return Number(c)
+            if low == ZERO:
+                return expression(high, c)
+            return BinaryOp(expression(high, c), '-', Variable(low))
+        return None
+
+    def rewrite(self, func):
+        """func with its runs of independent recursive calls replaced by TaskGroups."""
+        replacements = self.replacements.get(func.name)
+        if not replacements:
+            return func
+        rewritten = FunctionDef(func.name, func.params, self.rewrite_block(func.body, replacements))
+        rewritten.line, rewritten.column = func.line, func.column
+        return rewritten
+
+    def rewrite_block(self, body, replacements):
+        result = []
+        position = 0
+        while position < len(body):
+            stmt = body[position]
+            if id(stmt) in replacements:
+                replaced, replacement = replacements[id(stmt)]
+                result.extend(replacement)
+                position += replaced
+                continue
+            if isinstance(stmt, IfStatement):
+                else_body = self.rewrite_block(stmt.else_body, replacements) if stmt.else_body else stmt.else_body
+                rewritten = IfStatement(stmt.condition, self.rewrite_block(stmt.body, replacements), else_body)
+                rewritten.line, rewritten.column = stmt.line, stmt.column
+                stmt = rewritten
+            result.append(stmt)
+            position += 1
+        return result
@@ -0,0 +1,31 @@
+"""Helpers shared by the tests: run a program under CPython and as transpiled C++."""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import transpile
+
+@pytest.fixture
+def run_python():
+    def run(source):
+        return subprocess.run([sys.executable, "-c", source], check=True, capture_output=True, text=True).stdout
+    return run
+
+@pytest.fixture
+def run_cpp(tmp_path):
+    """Transpile, compile with g++ and run a program; returns what it prints."""
+    if shutil.which("g++") is None:
+        pytest.skip("g++ is not installed")
+    def run(source, **options):
+        code, _ = transpile(source, source_file="test.py", **options)
+        cpp = tmp_path / "test.cpp"
+        binary = tmp_path / "test"
+        cpp.write_text(code)
+        subprocess.run(["g++", "-std=c++17", "-pthread", str(cpp), "-o", str(binary)], check=True)
+        return subprocess.run([str(binary)], check=True, capture_output=True, text=True).stdout
+    return run
@@ -0,0 +1,85 @@
+import glob
+import io
+import os
+
+import pytest
+
+import ast_format
+from ast_format import FormatError
+from ast_nodes import Node, Program, Assignment, BinaryOp, Number, Variable
+from lexer import Lexer
+from parser import Parser
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Test")
+EXAMPLES = sorted(glob.glob(os.path.join(TEST_DIR, "*.py")))
+
+def parse(source):
+    return Parser(Lexer(source).tokenize()).parse()
+
+def assert_same_tree(expected, actual):
+    """Compare two trees field by field, including positions and which nodes are shared."""
+    # Iterative, so the deeply nested trees do not hit the recursion limit
+    copies = {}
+    pending = [(expected, actual)]
+    while pending:
+        expected, actual = pending.pop()
+        assert type(actual) is type(expected)
+        if isinstance(expected, list):
+            assert len(actual) == len(expected)
+            pending.extend(zip(expected, actual))
+        elif isinstance(expected, Node):
+            # A node reached twice must decode to the same node both times, and only then
+            assert copies.setdefault(id(expected), actual) is actual
+            assert vars(actual).keys() == vars(expected).keys()
+            pending.extend((vars(expected)[name], vars(actual)[name]) for name in vars(expected))
+        else:
+            assert actual == expected
+    assert len(set(map(id, copies.values()))) == len(copies)
+
+def round_trips(program):
+    yield ast_format.loads(ast_format.dumps(program))
+    stream = io.BytesIO()
+    ast_format.dump(program, stream)
+    stream.seek(0)
+    yield ast_format.load(stream)
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=os.path.basename)
+def test_examples_round_trip(path):
+    with open(path) as f:
+        program = parse(f.read())
+    for decoded in round_trips(program):
+        assert_same_tree(program, decoded)
+
+def test_deeply_nested_expression_round_trips():
+    value = Number(0)
+    for i in range(20000):
+        value = BinaryOp(value, "+", Variable(f"x{i % 7}"))
+    program = Program([Assignment(Variable("total"), value)])
+    for decoded in round_trips(program):
+        assert_same_tree(program, decoded)
+
+def test_augmented_item_assignment_keeps_its_shared_index():
+    program = parse("a = [1, 2]\ni = 0\na[i] += 1\n")
+    update = program.statements[-1]
+    assert update.index is update.value.left.index
+    for decoded in round_trips(program):
+        assert_same_tree(program, decoded)
+        update = decoded.statements[-1]
+        assert update.index is update.value.left.index
+
+ENCODED = ast_format.dumps(parse("x = 1\nprint(x + 2)\n"))
+BODY = ENCODED[len(ast_format.header()):]
+
+@pytest.mark.parametrize("data, message", [
+    (b"NOTAST" + BODY, "Not a serialized AST"),
+    (bytes(ast_format.MAGIC) + bytes([ast_format.VERSION + 1]) + BODY, "Unsupported AST format version"),
+    (ENCODED[:-4], "Truncated"),
+    (ENCODED + b"\0", "Trailing data"),
+], ids=["magic", "version", "truncated", "trailing"])
+def test_malformed_input_raises_format_error(data, message):
+    with pytest.raises(FormatError, match=message):
+        ast_format.loads(data)
+    if message != "Trailing data":
+        # The stream reader stops at the end of the program
+        with pytest.raises(FormatError, match=message):
+            ast_format.load(io.BytesIO(data))
@@ -0,0 +1,47 @@
+RETURNED_CONTAINERS = """
+def build(n):
+    out = []
+    for i in range(n):
+        out.append(i * i)
+    return out
+
+def names(n):
+    out = []
+    for i in range(n):
+        out.append("n" + str(i))
+    return out
+
+def counts(n):
+    d = {}
+    for i in range(n):
+        d[i % 3] = d.get(i % 3, 0) + 1
+    return d
+
+def evens(n):
+    s = set()
+    for i in range(n):
+        s.add(i - i % 2)
+    return s
+
+def main():
+    xs = build(5)
+    last = xs.pop()
+    print(len(xs), last, xs[1])
+    ns = names(3)
+    print(len(ns), ns.pop())
+    c = counts(10)
+    print(c[0], c[2], len(c))
+    e = evens(7)
+    print(len(e))
+    if 4 in e and 5 not in e:
+        print("members")
+
+if __name__ == "__main__":
+    main()
+"""
+
+def test_returned_containers(run_cpp, run_python):
+    assert run_cpp(RETURNED_CONTAINERS) == run_python(RETURNED_CONTAINERS)
+
+def test_returned_containers_in_debug_mode(run_cpp, run_python):
+    assert run_cpp(RETURNED_CONTAINERS, mode="debug") == run_python(RETURNED_CONTAINERS)
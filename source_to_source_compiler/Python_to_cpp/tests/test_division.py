@@ -0,0 +1,78 @@
+import pytest
+
+NEGATIVE_LEN = """
+def shift(arr, b):
+    return (len(arr) - b) // 2
+
+def main():
+    xs = [1, 2, 3]
+    b = 11
+    print((len(xs) - b) // 2, (len(xs) - b) % 5, len(xs) - b, -len(xs) // 2)
+    if len(xs) - b < 0:
+        print("negative")
+    if (len(xs) - b) / 16 == -0.5:
+        print("exact")
+    print(shift(xs, b), shift(xs, 1))
+
+if __name__ == "__main__":
+    main()
+"""
+
+@pytest.mark.parametrize("mode", ["release", "debug"])
+def test_negative_operands_from_len(run_cpp, run_python, mode):
+    assert run_cpp(NEGATIVE_LEN, mode=mode) == run_python(NEGATIVE_LEN)
+
+@pytest.mark.parametrize("use_ir", [True, False])
+def test_negative_operands_from_len_in_functions(run_cpp, run_python, use_ir):
+    assert run_cpp(NEGATIVE_LEN, use_ir=use_ir) == run_python(NEGATIVE_LEN)
+
+TRUE_DIVISION_RESULTS = """
+def half(n):
+    return n / 2
+
+def quarter(n):
+    return half(n) / 2
+
+def average(arr):
+    total = 0
+    for i in range(len(arr)):
+        total = total + arr[i]
+    return total / len(arr)
+
+def main():
+    arr = [1, 2, 4]
+    print(half(5), quarter(5))
+    if average(arr) * 3 == 7:
+        print("average")
+
+if __name__ == "__main__":
+    main()
+"""
+
+@pytest.mark.parametrize("use_ir", [True, False])
+def test_functions_returning_true_division(run_cpp, run_python, use_ir):
+    assert run_cpp(TRUE_DIVISION_RESULTS, use_ir=use_ir) == run_python(TRUE_DIVISION_RESULTS)
+
+LOCAL_BECOMING_DOUBLE = """
+def halves(n):
+    x = 0
+    for i in range(n):
+        x = x + i / 2
+    return x
+
+def main():
+    if halves(4) == 3.0:
+        print("exact")
+
+if __name__ == "__main__":
+    main()
+"""
+
+def test_local_becoming_double(run_cpp, run_python):
+    assert run_cpp(LOCAL_BECOMING_DOUBLE) == run_python(LOCAL_BECOMING_DOUBLE)
+
+def test_mixed_return_types_are_rejected():
+    from main import transpile
+    source = "def f(n):\n    if n > 1:\n        return [n]\n    return 0\n"
+    with pytest.raises(Exception, match="returns values of different types"):
+        transpile(source)
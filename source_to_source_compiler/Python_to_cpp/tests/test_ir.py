@@ -0,0 +1,66 @@
+import pytest
+
+CONDITIONAL_INDEX = """
+def last_match(arr, t):
+    r = -1
+    for i in range(len(arr)):
+        if arr[i] == t:
+            r = i
+    return r
+
+def match_or_keep(arr, t):
+    r = 0
+    for i in range(len(arr)):
+        if arr[i] == t:
+            r = i
+        else:
+            r = r + 1
+    return r
+
+def main():
+    arr = [3, 1, 4, 1, 5]
+    print(last_match(arr, 1), last_match(arr, 9), match_or_keep(arr, 4), match_or_keep(arr, 7))
+
+if __name__ == "__main__":
+    main()
+"""
+
+@pytest.mark.parametrize("use_ir", [True, False])
+def test_loop_index_assigned_in_branch(run_cpp, run_python, use_ir):
+    assert run_cpp(CONDITIONAL_INDEX, use_ir=use_ir) == run_python(CONDITIONAL_INDEX)
+
+FALLBACK = """
+def stripes(n):
+    s = ""
+    for i in range(n):
+        if i % 2 == 0:
+            s = s + "x"
+    print(s)
+
+def total(n):
+    t = 0
+    for i in range(n):
+        t = t + i
+    return t
+
+def main():
+    stripes(5)
+    print(total(4))
+
+if __name__ == "__main__":
+    main()
+"""
+
+def body(code, signature):
+    lines = code.splitlines()
+    start = lines.index(next(line for line in lines if line.endswith(f"{signature} {{")))
+    return lines[start + 1:lines.index("}", start)]
+
+def test_ast_fallback_bodies_are_indented_like_ir_bodies():
+    from main import transpile
+    code, _ = transpile(FALLBACK)
+    # stripes builds a string, which the IR cannot express; total is emitted from the IR
+    for signature in ("void stripes(int n)", "int total(int n)"):
+        lines = body(code, signature)
+        assert lines and all(line.startswith("    ") for line in lines), lines
+    assert transpile(FALLBACK, workers=2)[0] == code
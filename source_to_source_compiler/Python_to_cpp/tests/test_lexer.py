@@ -0,0 +1,41 @@
+import glob
+import os
+
+import pytest
+
+from lexer import Lexer, ScannerLexer
+from program_generator import ProgramGenerator
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Test")
+EXAMPLES = sorted(glob.glob(os.path.join(TEST_DIR, "*.py")))
+
+def tokens(lexer_class, source):
+    return [(token.type, token.value, type(token.value), token.line, token.column)
+            for token in lexer_class(source).tokenize()]
+
+def assert_same_tokens(source):
+    assert tokens(ScannerLexer, source) == tokens(Lexer, source)
+
+def test_examples_exist():
+    assert EXAMPLES
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=os.path.basename)
+def test_scanner_matches_regex_on_examples(path):
+    with open(path) as f:
+        assert_same_tokens(f.read())
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scanner_matches_regex_on_generated_programs(seed):
+    assert_same_tokens(ProgramGenerator(seed=seed).generate(200))
+
+@pytest.mark.parametrize("source", [
+    "y = $2\n",
+    "x = a ? b : c\n",
+    "é = 1\nprint(é)\n",
+    "if a ! b:\n    pass\n",
+    "s = 'unterminated\nt = 1\n",
+    "` x = 1 `\r\n",
+], ids=repr)
+def test_scanner_matches_regex_on_invalid_characters(source):
+    # Neither backend raises: characters no rule matches are dropped, in the same way
+    assert_same_tokens(source)
@@ -0,0 +1,36 @@
+import shutil
+import subprocess
+
+import pytest
+
+from modules import build_modules
+
+HELPER = """
+def twice(n):
+    return n * 2
+"""
+
+APP = """
+import helper
+
+def quad(n):
+    return helper.twice(helper.twice(n))
+
+def main():
+    print(helper.twice(5), quad(3))
+
+if __name__ == "__main__":
+    main()
+"""
+
+@pytest.mark.parametrize("frontend", ["hand", "cpython"])
+def test_qualified_calls_of_an_imported_module(tmp_path, frontend):
+    if shutil.which("make") is None or shutil.which("g++") is None:
+        pytest.skip("make and g++ are needed to build the modules")
+    (tmp_path / "helper.py").write_text(HELPER)
+    (tmp_path / "app.py").write_text(APP)
+    output_dir = tmp_path / "build"
+    build_modules(str(tmp_path / "app.py"), str(output_dir), jobs=1, frontend=frontend)
+    subprocess.run(["make", "-s", "-C", str(output_dir)], check=True)
+    result = subprocess.run([str(output_dir / "app")], check=True, capture_output=True, text=True)
+    assert result.stdout == "10 12\n"
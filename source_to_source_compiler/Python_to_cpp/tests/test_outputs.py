@@ -0,0 +1,33 @@
+import os
+import stat
+
+import pytest
+
+from outputs import write_if_changed
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+@pytest.fixture
+def umask():
+    previous = os.umask(0o022)
+    yield 0o022
+    os.umask(previous)
+
+def test_new_files_follow_the_umask(tmp_path, umask):
+    path = tmp_path / "program.cpp"
+    assert write_if_changed(str(path), "int main() {}\n")
+    assert mode(path) == 0o666 & ~umask
+
+def test_rewritten_files_keep_their_mode(tmp_path, umask):
+    path = tmp_path / "Makefile"
+    path.write_text("all:\n")
+    os.chmod(path, 0o640)
+    assert write_if_changed(str(path), "all: program\n")
+    assert path.read_text() == "all: program\n"
+    assert mode(path) == 0o640
+
+def test_unchanged_files_are_not_written(tmp_path):
+    path = tmp_path / "program.d"
+    path.write_text("program: program.py\n")
+    assert not write_if_changed(str(path), "program: program.py\n")
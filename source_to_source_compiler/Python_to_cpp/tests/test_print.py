@@ -0,0 +1,34 @@
+import pytest
+
+BOOLEANS = """
+def even(n):
+    return n % 2 == 0
+
+def main():
+    x = 5
+    s = {1, 3}
+    ok = x > 3
+    print(x > 3, 3 in s, 4 not in s, True, False)
+    print(ok, even(4), even(3), f"flag={x < 2}")
+    print("x", x == 5, x)
+
+if __name__ == "__main__":
+    main()
+"""
+
+NEGATIONS = """
+def main():
+    x = 5
+    print(not x, not (x > 9))
+
+if __name__ == "__main__":
+    main()
+"""
+
+@pytest.mark.parametrize("mode", ["release", "debug"])
+def test_bools_print_like_python(run_cpp, run_python, mode):
+    assert run_cpp(BOOLEANS, mode=mode) == run_python(BOOLEANS)
+
+def test_negations_print_like_python(run_cpp, run_python):
+    # The hand-written parser has no unary not
+    assert run_cpp(NEGATIONS, frontend="cpython") == run_python(NEGATIONS)
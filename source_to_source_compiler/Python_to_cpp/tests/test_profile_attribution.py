@@ -0,0 +1,25 @@
+from profile_attribution import SourceMap, attribute_report
+
+SOURCE_MAP = {
+    "source": "sort.py",
+    "generated": "output.cpp",
+    "mappings": [[30, 12, 0]],
+    "functions": {"quick_sort": 7, "partition": 1, "main": 20},
+}
+
+def test_templated_symbols_are_attributed():
+    source_map = SourceMap(SOURCE_MAP)
+    report = [
+        "    61.50%  program  program  [.] quick_sort<std::array<int, 6ul> >(std::array<int, 6ul>&, int, int)\n",
+        "    30.00%  program  program  [.] partition<std::vector<int, std::allocator<int> > >\n",
+        "     8.50%  program  program  [.] main\n",
+    ]
+    annotated, totals = attribute_report(source_map, report)
+    assert annotated[0].endswith("<- sort.py:7")
+    assert annotated[1].endswith("<- sort.py:1")
+    assert totals == {7: 61.5, 1: 30.0, 20: 8.5}
+
+def test_other_symbols_are_not_attributed():
+    source_map = SourceMap(SOURCE_MAP)
+    assert source_map.attribute("  5.00%  program  libc.so.6  [.] std::quick_sort_helper<int>()") is None
+    assert source_map.attribute("  5.00%  program  program  [.] output.cpp:30") == 12
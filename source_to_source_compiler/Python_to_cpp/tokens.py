@@ -13,12 +13,15 @@ class TokenType(Enum):
     RETURN = 'RETURN'
     TRUE = 'TRUE'
     FALSE = 'FALSE'
+    IMPORT = 'IMPORT'
+    FROM = 'FROM'
     
     # Identifiers and literals
     IDENTIFIER = 'IDENTIFIER'
     NUMBER = 'NUMBER'
     FLOAT = 'FLOAT'
     STRING = 'STRING'
+    FSTRING = 'FSTRING'
     
     # Operators
     EQUALS = 'EQUALS'
@@ -26,11 +29,13 @@ class TokenType(Enum):
     MINUS_EQUALS = 'MINUS_EQUALS'
     MULTIPLY_EQUALS = 'MULTIPLY_EQUALS'
     DIVIDE_EQUALS = 'DIVIDE_EQUALS'
+    FLOOR_DIVIDE_EQUALS = 'FLOOR_DIVIDE_EQUALS'
     MODULO_EQUALS = 'MODULO_EQUALS'
     PLUS = 'PLUS'
     MINUS = 'MINUS'
     MULTIPLY = 'MULTIPLY'
     DIVIDE = 'DIVIDE'
+    FLOOR_DIVIDE = 'FLOOR_DIVIDE'
     MODULO = 'MODULO'
     GREATER = 'GREATER'
     LESS = 'LESS'
@@ -52,6 +57,7 @@ class TokenType(Enum):
     COMMA = 'COMMA'
     COLON = 'COLON'
     SEMICOLON = 'SEMICOLON'
+    DOT = 'DOT'
     
     # Special
     EOF = 'EOF'